@@ -1,17 +1,164 @@
-from flask import Flask, request, jsonify
-import google.generativeai as genai
+"""AI analysis service (Gemini) for the asteroid defense simulator.
+
+An async FastAPI app: requests to Gemini go through one pooled aiohttp
+session, model handles are cached per (API key, model name), and each API key
+gets its own concurrency limit. The requested model and the
+gemini-2.0-flash fallback are raced under a single deadline: the fallback
+starts as soon as the primary fails or has not answered within
+AI_FALLBACK_AFTER_SECONDS, and whichever succeeds first wins.
+
+/api/defense-analysis first scores the scenario with the local rule engine
+(defense_scoring.py); Gemini is an optional enrichment pass on top of that
+baseline ("enrich": false or no API key skips it, and a failed enrichment
+falls back to the baseline).
+
+Both endpoints also stream (Accept: text/event-stream or "stream": true):
+partial text is forwarded as Server-Sent Events while Gemini generates it,
+and /api/defense-analysis additionally emits each strategy section as soon
+as its JSON object is complete.
+
+GEMINI_API_BASE points the client at another Gemini-compatible endpoint,
+e.g. a local fake backend for tests.
+"""
+import asyncio
 import json
 import os
-from flask_cors import CORS
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.middleware.cors import CORSMiddleware
+
+import ai_cache
+import defense_scoring
+from json_stream import SectionParser
+
+GEMINI_API_BASE = os.environ.get("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+DEFAULT_MODEL = 'gemini-2.5-pro'
+FALLBACK_MODEL = 'gemini-2.0-flash'
+AI_MAX_CONCURRENCY_PER_KEY = int(os.environ.get("AI_MAX_CONCURRENCY_PER_KEY", "4"))
+AI_FALLBACK_AFTER_SECONDS = float(os.environ.get("AI_FALLBACK_AFTER_SECONDS", "20"))
+AI_REQUEST_DEADLINE_SECONDS = float(os.environ.get("AI_REQUEST_DEADLINE_SECONDS", "90"))
+AI_MODEL_CACHE_SIZE = int(os.environ.get("AI_MODEL_CACHE_SIZE", "256"))
+
+DEFAULT_SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
+app = FastAPI(title="Asteroid Defense AI API")
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+class GeminiError(Exception):
+    """Gemini returned an error or could not be reached"""
+
+
+class GeminiModel:
+    """One Gemini model bound to one API key, using the client's pooled session"""
+
+    def __init__(self, client: "GeminiClient", api_key: str, model_name: str):
+        self.client = client
+        self.api_key = api_key
+        self.model_name = model_name
+        self.url = f"{client.base_url}/models/{model_name}:generateContent"
+        self.stream_url = f"{client.base_url}/models/{model_name}:streamGenerateContent?alt=sse"
+
+    async def generate_content(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        session = await self.client.session()
+        async with session.post(self.url, json=body, headers={"x-goog-api-key": self.api_key}) as response:
+            await self._raise_for_status(response)
+            return await response.json()
+
+    async def stream_content(self, body: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the partial generateContent responses of a streamed (SSE) generation"""
+        session = await self.client.session()
+        async with session.post(self.stream_url, json=body, headers={"x-goog-api-key": self.api_key}) as response:
+            await self._raise_for_status(response)
+            async for line in response.content:
+                line = line.strip()
+                if line.startswith(b"data:") and line[5:].strip():
+                    yield json.loads(line[5:])
+
+    @staticmethod
+    async def _raise_for_status(response: aiohttp.ClientResponse):
+        if response.status != 200:
+            detail = await response.text()
+            try:
+                detail = json.loads(detail).get("error", {}).get("message", detail)
+            except (ValueError, AttributeError):
+                pass
+            raise GeminiError(f"{response.status}: {detail}")
+
+
+class GeminiClient:
+    """Pooled HTTP session, cached model handles and per-key concurrency limits"""
+
+    def __init__(
+        self,
+        base_url: str = GEMINI_API_BASE,
+        max_concurrency_per_key: int = AI_MAX_CONCURRENCY_PER_KEY,
+        model_cache_size: int = AI_MODEL_CACHE_SIZE,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency_per_key = max_concurrency_per_key
+        self.model_cache_size = model_cache_size
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._models: "OrderedDict[Tuple[str, str], GeminiModel]" = OrderedDict()
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=10)
+            )
+        return self._session
 
-app = Flask(__name__)
-CORS(app)
+    def model(self, api_key: str, model_name: str) -> GeminiModel:
+        """Cached model handle for (api_key, model_name)"""
+        key = (api_key, model_name)
+        model = self._models.get(key)
+        if model is None:
+            model = self._models[key] = GeminiModel(self, api_key, model_name)
+            if len(self._models) > self.model_cache_size:
+                self._models.popitem(last=False)
+        else:
+            self._models.move_to_end(key)
+        return model
+
+    def limit(self, api_key: str) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent Gemini calls made with one API key"""
+        semaphore = self._limits.get(api_key)
+        if semaphore is None:
+            semaphore = self._limits[api_key] = asyncio.Semaphore(self.max_concurrency_per_key)
+        return semaphore
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+gemini_client = GeminiClient()
+analysis_cache = ai_cache.AnalysisCache()
 
-def call_gemini(api_key, model, messages, generation=None, safety=None, expect_json=False):
-    """Call Google Gemini API with configurable model and generation params."""
-    genai.configure(api_key=api_key)
 
-    # Convert messages to Gemini format
+@app.on_event("shutdown")
+async def close_gemini_client():
+    await gemini_client.close()
+
+
+def build_prompt(messages: List[Dict[str, Any]]) -> str:
+    """Combine system and user messages into a single Gemini prompt"""
     system_prompt = ""
     user_prompt = ""
 
@@ -21,148 +168,301 @@ def call_gemini(api_key, model, messages, generation=None, safety=None, expect_j
         elif msg.get("role") == "user":
             user_prompt = msg.get("content", "")
 
-    # Combine system and user prompts
-    full_prompt = f"{system_prompt}\n\n{user_prompt}" if system_prompt else user_prompt
+    return f"{system_prompt}\n\n{user_prompt}" if system_prompt else user_prompt
+
 
-    # Resolve model and generation params
-    requested_model = model or 'gemini-2.5-pro'
+def build_request_body(prompt: str, generation=None, safety=None, expect_json=False) -> Dict[str, Any]:
+    """Gemini generateContent request body with the user-configurable generation params"""
     gen_cfg = generation or {}
-    temperature = gen_cfg.get('temperature', 0.7)
-    max_output_tokens = gen_cfg.get('max_output_tokens', 2000)
-    top_p = gen_cfg.get('top_p', 0.8)
-    top_k = gen_cfg.get('top_k', 40)
-    candidate_count = gen_cfg.get('candidate_count', 1)
-    stop_sequences = gen_cfg.get('stop_sequences', [])
-
-    # Prepare generation config
-    generation_config = genai.types.GenerationConfig(
-        max_output_tokens=max_output_tokens,
-        temperature=temperature,
-        candidate_count=candidate_count,
-        stop_sequences=stop_sequences,
-        top_p=top_p,
-        top_k=top_k,
-        # Some SDKs support explicit JSON MIME; include if requested
-        **({"response_mime_type": "application/json"} if expect_json else {})
-    )
+    generation_config = {
+        "maxOutputTokens": gen_cfg.get('max_output_tokens', 2000),
+        "temperature": gen_cfg.get('temperature', 0.7),
+        "candidateCount": gen_cfg.get('candidate_count', 1),
+        "stopSequences": gen_cfg.get('stop_sequences', []),
+        "topP": gen_cfg.get('top_p', 0.8),
+        "topK": gen_cfg.get('top_k', 40),
+    }
+    if expect_json:
+        generation_config["responseMimeType"] = "application/json"
 
-    safety_settings = safety if isinstance(safety, list) else [
-        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-    ]
+    return {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": generation_config,
+        "safetySettings": safety if isinstance(safety, list) else DEFAULT_SAFETY_SETTINGS,
+    }
 
-    def _generate_with(model_name):
-        model_instance = genai.GenerativeModel(model_name)
-        return model_instance.generate_content(
-            full_prompt,
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
+
+async def race_with_fallback(
+    attempt: Callable[[str], Awaitable[Any]],
+    model_name: str,
+    fallback_after: float = AI_FALLBACK_AFTER_SECONDS,
+    deadline: float = AI_REQUEST_DEADLINE_SECONDS,
+    discard: Optional[Callable[[Any], Awaitable[None]]] = None,
+) -> Any:
+    """Result of attempt(model_name), racing attempt(FALLBACK_MODEL) against a slow or failing primary.
+
+    discard(result) is awaited for a successful attempt that lost the race.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    use_fallback = model_name != FALLBACK_MODEL
+    primary = asyncio.ensure_future(attempt(model_name))
+    fallback = None
+    pending = {primary}
+    errors: Dict[str, BaseException] = {}
 
     try:
-        response = _generate_with(requested_model)
-    except Exception as e:
-        # fallback to a fast model if the requested one errors
-        try:
-            response = _generate_with('gemini-2.0-flash')
-        except Exception as e2:
-            raise Exception(f"Gemini API error with model {requested_model}: {str(e)}. Fallback also failed: {str(e2)}")
+        while pending:
+            remaining = start + deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"Gemini did not answer within {deadline:g}s")
+            wait_for = remaining
+            if use_fallback and fallback is None:
+                wait_for = max(0.0, min(remaining, start + fallback_after - loop.time()))
+
+            done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            winners = [task for task in done if task.exception() is None]
+            if winners:
+                if discard is not None:
+                    for task in winners[1:]:
+                        await discard(task.result())
+                return winners[0].result()
+            for task in done:
+                errors[model_name if task is primary else FALLBACK_MODEL] = task.exception()
+
+            if use_fallback and fallback is None and (primary.done() or loop.time() >= start + fallback_after):
+                fallback = asyncio.ensure_future(attempt(FALLBACK_MODEL))
+                pending.add(fallback)
+    finally:
+        for task in (primary, fallback):
+            if task is not None and not task.done():
+                task.cancel()
+
+    if not use_fallback:
+        raise GeminiError(f"Gemini API error with model {model_name}: {errors.get(model_name)}")
+    raise GeminiError(
+        f"Gemini API error with model {model_name}: {errors.get(model_name)}. "
+        f"Fallback also failed: {errors.get(FALLBACK_MODEL)}"
+    )
 
-    # Normalize response
-    content_text = getattr(response, 'text', None)
 
-    # Try to build text from candidates/parts when response.text is unavailable
-    if not content_text and hasattr(response, 'candidates'):
+async def generate_with_fallback(
+    client: GeminiClient,
+    api_key: str,
+    model_name: str,
+    body: Dict[str, Any],
+    fallback_after: float = AI_FALLBACK_AFTER_SECONDS,
+    deadline: float = AI_REQUEST_DEADLINE_SECONDS,
+) -> Tuple[Dict[str, Any], str]:
+    """Return (response, model used), racing the fallback model against a slow or failing primary"""
+    async def attempt(name):
+        async with client.limit(api_key):
+            return await client.model(api_key, name).generate_content(body), name
+
+    return await race_with_fallback(attempt, model_name, fallback_after, deadline)
+
+
+async def stream_with_fallback(
+    client: GeminiClient,
+    api_key: str,
+    model_name: str,
+    body: Dict[str, Any],
+    fallback_after: float = AI_FALLBACK_AFTER_SECONDS,
+    deadline: float = AI_REQUEST_DEADLINE_SECONDS,
+) -> AsyncIterator[Tuple[Dict[str, Any], str]]:
+    """Yield (partial response, model used).
+
+    The primary and fallback race for the first chunk exactly as in
+    generate_with_fallback; the model that delivers it streams the rest.
+    """
+    async def limited(name):
+        async with client.limit(api_key):
+            async for chunk in client.model(api_key, name).stream_content(body):
+                yield chunk
+
+    async def attempt(name):
+        stream = limited(name)
         try:
-            collected = []
-            for cand in (getattr(response, 'candidates', []) or []):
-                # finish_reason 2 indicates SAFETY; capture anyway
-                content = getattr(cand, 'content', None)
-                if content and hasattr(content, 'parts'):
-                    for part in (content.parts or []):
-                        # New SDK: part.text; Older SDKs: str(part)
-                        text_piece = getattr(part, 'text', None)
-                        if isinstance(text_piece, str) and text_piece.strip():
-                            collected.append(text_piece)
-                # Fallback: try cand.text directly if exists
-                cand_text = getattr(cand, 'text', None)
-                if isinstance(cand_text, str) and cand_text.strip():
-                    collected.append(cand_text)
-            if collected:
-                content_text = "\n".join(collected)
-        except Exception:
-            content_text = None
-
-    # If still no text, inspect prompt feedback/safety and return descriptive content
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except BaseException:
+            await stream.aclose()
+            raise
+        return stream, first, name
+
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + deadline
+    stream, first, used_model = await race_with_fallback(
+        attempt, model_name, fallback_after, deadline, discard=lambda result: result[0].aclose()
+    )
+    try:
+        if first is None:
+            return
+        yield first, used_model
+        while True:
+            remaining = stop_at - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"Gemini did not finish within {deadline:g}s")
+            try:
+                chunk = await asyncio.wait_for(stream.__anext__(), timeout=remaining)
+            except StopAsyncIteration:
+                return
+            yield chunk, used_model
+    finally:
+        await stream.aclose()
+
+
+def extract_text(response: Dict[str, Any]) -> Optional[str]:
+    """Text of all candidates in a generateContent response, or None if there is none"""
+    collected = []
+    for candidate in response.get("candidates") or []:
+        # finishReason SAFETY may still carry partial parts; capture anyway
+        parts = (candidate.get("content") or {}).get("parts") or []
+        text = "".join(part.get("text", "") for part in parts if isinstance(part.get("text"), str))
+        if text.strip():
+            collected.append(text)
+    return "\n".join(collected) if collected else None
+
+
+def approximate_usage(prompt: str, content_text: Optional[str]) -> Dict[str, int]:
+    """Approximate token counts (whitespace-separated words), as reported to clients"""
+    prompt_tokens = len(prompt.split()) if isinstance(prompt, str) else 0
+    completion_tokens = len(content_text.split()) if isinstance(content_text, str) else 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+async def call_gemini(api_key, model, messages, generation=None, safety=None, expect_json=False, client=None):
+    """Call Google Gemini API with configurable model and generation params."""
+    full_prompt = build_prompt(messages)
+    requested_model = model or DEFAULT_MODEL
+    body = build_request_body(full_prompt, generation, safety, expect_json)
+
+    response, used_model = await generate_with_fallback(client or gemini_client, api_key, requested_model, body)
+    return gemini_result(full_prompt, extract_text(response), used_model, response.get("promptFeedback"))
+
+
+async def stream_gemini(api_key, model, messages, generation=None, safety=None, expect_json=False, client=None):
+    """Streaming call_gemini: yields ("delta", {"text", "candidate"}) as text arrives, then ("result", result)"""
+    full_prompt = build_prompt(messages)
+    used_model = model or DEFAULT_MODEL
+    body = build_request_body(full_prompt, generation, safety, expect_json)
+
+    texts: Dict[int, List[str]] = {}
+    feedback = None
+    async for chunk, used_model in stream_with_fallback(client or gemini_client, api_key, used_model, body):
+        feedback = chunk.get("promptFeedback") or feedback
+        for position, candidate in enumerate(chunk.get("candidates") or []):
+            parts = (candidate.get("content") or {}).get("parts") or []
+            text = "".join(part.get("text", "") for part in parts if isinstance(part.get("text"), str))
+            if text:
+                index = candidate.get("index", position)
+                texts.setdefault(index, []).append(text)
+                yield "delta", {"text": text, "candidate": index}
+
+    # Join candidates the way extract_text does for a complete response
+    collected = [text for text in ("".join(texts[index]) for index in sorted(texts)) if text.strip()]
+    yield "result", gemini_result(full_prompt, "\n".join(collected) if collected else None, used_model, feedback)
+
+
+def gemini_result(full_prompt: str, content_text: Optional[str], used_model: str, feedback=None) -> Dict[str, Any]:
+    """Response body for a finished generation (diagnostics instead of content when there is no text)"""
+    # If there is no text, inspect prompt feedback/safety and return descriptive content
     if not content_text:
-        safety_info = None
-        finish_reason = None
-        try:
-            finish_reason = getattr(response, 'candidate', None)
-        except Exception:
-            finish_reason = None
-        try:
-            pf = getattr(response, 'prompt_feedback', None)
-            if pf and hasattr(pf, 'safety_ratings'):
-                safety_info = [
-                    {
-                        "category": getattr(r, 'category', None),
-                        "probability": getattr(r, 'probability', None),
-                        "blocked": getattr(r, 'blocked', None),
-                    }
-                    for r in (getattr(pf, 'safety_ratings', []) or [])
-                ]
-        except Exception:
-            safety_info = None
+        feedback = feedback or {}
+        safety_info = [
+            {
+                "category": rating.get("category"),
+                "probability": rating.get("probability"),
+                "blocked": rating.get("blocked"),
+            }
+            for rating in feedback.get("safetyRatings") or []
+        ]
 
         # Return a non-empty content string with diagnostic context to avoid 500s upstream
-        content_text = (
-            "Model returned no text. The response may have been blocked by safety filtering or contained no text parts."
-        )
-
         return {
-            "content": content_text,
-            "usage": {
-                "prompt_tokens": len(full_prompt.split()) if isinstance(full_prompt, str) else 0,
-                "completion_tokens": 0,
-                "total_tokens": len(full_prompt.split()) if isinstance(full_prompt, str) else 0,
-            },
+            "content": "Model returned no text. The response may have been blocked by safety filtering or contained no text parts.",
+            "usage": approximate_usage(full_prompt, None),
+            "model": used_model,
             "note": "no_text",
-            "safety": safety_info or [],
+            "safety": safety_info,
         }
 
     return {
         "content": content_text,
-        "usage": {
-            # SDKs vary; approximate token counts
-            "prompt_tokens": len(full_prompt.split()) if isinstance(full_prompt, str) else 0,
-            "completion_tokens": len(content_text.split()) if isinstance(content_text, str) else 0,
-            "total_tokens": (
-                (len(full_prompt.split()) if isinstance(full_prompt, str) else 0)
-                + (len(content_text.split()) if isinstance(content_text, str) else 0)
-            )
-        }
+        # SDKs vary; approximate token counts
+        "usage": approximate_usage(full_prompt, content_text),
+        "model": used_model,
     }
 
-@app.route('/api/ai-chat', methods=['POST'])
-def ai_chat():
+
+def error_response(message: str, status_code: int) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+def wants_stream(data: Dict[str, Any], request: Request) -> bool:
+    return bool(data.get('stream')) or "text/event-stream" in request.headers.get("accept", "")
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+def sse_response(events: AsyncIterator[bytes]) -> StreamingResponse:
+    """Stream SSE frames; failures after the response has started become an "error" event"""
+    async def guarded():
+        try:
+            async for frame in events:
+                yield frame
+        except asyncio.TimeoutError as e:
+            yield sse_event("error", {"error": str(e) or "Gemini request timed out", "status": 504})
+        except Exception as e:
+            yield sse_event("error", {"error": str(e), "status": 500})
+
+    return StreamingResponse(
+        guarded(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def chat_events(api_key: str, model: str, messages: List[Dict[str, Any]], data: Dict[str, Any]) -> AsyncIterator[bytes]:
+    """"delta" events with partial text, then "done" with the same body as the non-streaming response"""
+    async for kind, payload in stream_gemini(
+        api_key,
+        model,
+        messages,
+        generation=data.get('generation'),
+        safety=data.get('safety'),
+        expect_json=True
+    ):
+        yield sse_event("delta" if kind == "delta" else "done", payload)
+
+
+@app.post('/api/ai-chat')
+async def ai_chat(request: Request):
     try:
-        data = request.get_json()
+        data = await request.json()
         
         api_key = data.get('apiKey', '')
-        model = data.get('model', 'gemini-2.5-pro')
+        model = data.get('model', DEFAULT_MODEL)
         messages = data.get('messages', [])
         
         if not api_key:
-            return jsonify({"error": "API key is required"}), 400
+            return error_response("API key is required", 400)
         
         if not messages:
-            return jsonify({"error": "Messages are required"}), 400
+            return error_response("Messages are required", 400)
+        
+        if wants_stream(data, request):
+            return sse_response(chat_events(api_key, model, messages, data))
         
         # Call Gemini with full user-configurable params
-        result = call_gemini(
+        result = await call_gemini(
             api_key,
             model,
             messages,
@@ -171,28 +471,15 @@ def ai_chat():
             expect_json=True
         )
         
-        return jsonify(result)
+        return result
         
+    except asyncio.TimeoutError as e:
+        return error_response(str(e) or "Gemini request timed out", 504)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(str(e), 500)
 
-@app.route('/api/defense-analysis', methods=['POST'])
-def defense_analysis():
-    try:
-        data = request.get_json()
-        
-        api_key = data.get('apiKey', '')
-        model = data.get('model', 'gemini-2.5-pro')
-        impact_data = data.get('impactData', {})
-        
-        if not api_key:
-            return jsonify({"error": "API key is required"}), 400
-        
-        if not impact_data:
-            return jsonify({"error": "Impact data is required"}), 400
-        
-        # Create the prompt for defense strategy analysis
-        system_prompt = """You are an expert planetary defense scientist and AI assistant specializing in meteor deflection strategies. Your task is to analyze meteor impact data and provide detailed, scientific explanations for defense mechanism recommendations.
+
+DEFENSE_SYSTEM_PROMPT = """You are an expert planetary defense scientist and AI assistant specializing in meteor deflection strategies. Your task is to analyze meteor impact data and provide detailed, scientific explanations for defense mechanism recommendations.
 
 IMPORTANT: Always use the term "meteor" instead of "asteroid" throughout your analysis.
 
@@ -292,25 +579,42 @@ MANDATORY TIME-BASED EXAMPLES:
   - **>5 years** → “low” urgency
 """
 
-        # Safely extract fields (dictionary-style) with camelCase/snake_case fallbacks
-        diameter = impact_data.get('diameter', impact_data.get('diameter_m', 0))
-        velocity = impact_data.get('velocity', impact_data.get('velocity_mps', 0))
-        density = impact_data.get('density', impact_data.get('density_kgm3', 0))
-        angle = impact_data.get('angle', impact_data.get('impact_angle', 0))
-        kinetic_energy = impact_data.get('kinetic_energy', impact_data.get('_ai_kineticEnergyJ', 0))
-        tnt_equivalent = impact_data.get('tnt_equivalent', 0)
-
-        env = impact_data.get('environmental_effects', {}) or {}
-        atmos = env.get('atmospheric_disturbance', 'unknown')
-        biodiversity = env.get('biodiversity_threat', 'unknown')
-        climate = env.get('climate_impact_duration', 0)
 
+def defense_prompt_inputs(impact_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The impact fields the defense prompt uses, with numbers normalized to floats"""
+    # Safely extract fields (dictionary-style) with camelCase/snake_case fallbacks
+    env = impact_data.get('environmental_effects', {}) or {}
+    inputs = {
+        "diameter": impact_data.get('diameter', impact_data.get('diameter_m', 0)),
+        "velocity": impact_data.get('velocity', impact_data.get('velocity_mps', 0)),
+        "density": impact_data.get('density', impact_data.get('density_kgm3', 0)),
+        "angle": impact_data.get('angle', impact_data.get('impact_angle', 0)),
+        "kinetic_energy": impact_data.get('kinetic_energy', impact_data.get('_ai_kineticEnergyJ', 0)),
+        "tnt_equivalent": impact_data.get('tnt_equivalent', 0),
+        "atmos": env.get('atmospheric_disturbance', 'unknown'),
+        "biodiversity": env.get('biodiversity_threat', 'unknown'),
+        "climate": env.get('climate_impact_duration', 0),
         # Pre-check computed values from frontend (if present)
-        mass_kg = impact_data.get('_ai_massKg', impact_data.get('mass', impact_data.get('mass_kg', 0)))
-        delta_v = impact_data.get('_ai_deltaV_mps', impact_data.get('deltaV', impact_data.get('delta_v', 0)))
-        warning_time_years = impact_data.get('warningTime', impact_data.get('warning_time', impact_data.get('_ai_warningTimeYears', '')))
+        "mass_kg": impact_data.get('_ai_massKg', impact_data.get('mass', impact_data.get('mass_kg', 0))),
+        "delta_v": impact_data.get('_ai_deltaV_mps', impact_data.get('deltaV', impact_data.get('delta_v', 0))),
+        "warning_time_years": impact_data.get('warningTime', impact_data.get('warning_time', impact_data.get('_ai_warningTimeYears', ''))),
+    }
+    # 100 and 100.0 describe the same scenario and must render (and hash) identically
+    return {
+        name: float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+        for name, value in inputs.items()
+    }
+
+
+def build_defense_messages(impact_data: Dict[str, Any]) -> List[Dict[str, str]]:
+    """System and user messages for a defense strategy analysis of one impact scenario"""
+    inputs = defense_prompt_inputs(impact_data)
+    diameter, velocity, density, angle = inputs["diameter"], inputs["velocity"], inputs["density"], inputs["angle"]
+    kinetic_energy, tnt_equivalent = inputs["kinetic_energy"], inputs["tnt_equivalent"]
+    atmos, biodiversity, climate = inputs["atmos"], inputs["biodiversity"], inputs["climate"]
+    mass_kg, delta_v, warning_time_years = inputs["mass_kg"], inputs["delta_v"], inputs["warning_time_years"]
 
-        user_prompt = f"""Analyze the following meteor impact data and provide a defense strategy recommendation:
+    user_prompt = f"""Analyze the following meteor impact data and provide a defense strategy recommendation:
 
 Meteor Parameters:
 - Diameter: {diameter} meters
@@ -337,51 +641,238 @@ Task:
 4. Present the response in a structured format (e.g., table or bullet points) and include references.
 """
 
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+    return [
+        {"role": "system", "content": DEFENSE_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def parse_analysis(content: str) -> Dict[str, Any]:
+    """Parse the model's JSON analysis, tolerating markdown code fences"""
+    try:
+        response_text = content
+        # Remove markdown code blocks if present
+        if response_text.startswith("```json"):
+            response_text = response_text.replace("```json", "").replace("```", "").strip()
+        elif response_text.startswith("```"):
+            response_text = response_text.replace("```", "").strip()
         
-        # Call Gemini with full user-configurable params
-        result = call_gemini(
+        return json.loads(response_text)
+    except json.JSONDecodeError as e:
+        # If not valid JSON, return the raw content
+        return {
+            "raw_content": content,
+            "error": f"Response was not in expected JSON format: {str(e)}"
+        }
+
+
+def analysis_cache_key(model: str, messages: List[Dict[str, str]], generation=None, safety=None) -> str:
+    """Content address of an analysis: the rendered prompt, model and effective generation/safety config"""
+    config = build_request_body("", generation, safety, expect_json=True)
+    return ai_cache.cache_key(
+        messages=messages,
+        model=model or DEFAULT_MODEL,
+        generation=config["generationConfig"],
+        safety=config["safetySettings"],
+    )
+
+
+DEFENSE_SECTIONS = ("kineticImpactor", "gravityTractor", "nuclearDevice")
+
+
+def baseline_analysis(impact_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Rule-based analysis of the scenario, or None without a usable diameter and warning time"""
+    inputs = defense_prompt_inputs(impact_data)
+    try:
+        diameter = float(inputs["diameter"])
+        warning_years = float(inputs["warning_time_years"])
+    except (TypeError, ValueError):
+        return None
+    if not (diameter > 0 and warning_years > 0):
+        return None
+    return defense_scoring.score_scenario(diameter, warning_years)
+
+
+def rules_response(baseline: Dict[str, Any], enrichment_error: Optional[str] = None) -> Dict[str, Any]:
+    response = {
+        "analysis": baseline,
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        "provider": "rules",
+        "model": None,
+        "cache": None,
+    }
+    if enrichment_error:
+        response["enrichment_error"] = enrichment_error
+    return response
+
+
+def defense_response(
+    result: Dict[str, Any],
+    model: str,
+    key: str,
+    cache_tier: Optional[str],
+    baseline: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    response = {
+        "analysis": parse_analysis(result["content"]),
+        "usage": result.get("usage", {}),
+        "provider": "gemini",
+        "model": result.get("model", model),
+        "cache": {"hit": cache_tier is not None, "tier": cache_tier, "key": key}
+    }
+    if baseline is not None:
+        response["baseline"] = baseline
+    return response
+
+
+async def defense_events(
+    api_key: str,
+    model: str,
+    messages: List[Dict[str, str]],
+    data: Dict[str, Any],
+    key: str,
+    cache_mode: str,
+    baseline: Optional[Dict[str, Any]] = None,
+    enrich: bool = True,
+) -> AsyncIterator[bytes]:
+    """"delta" events with partial text, a "section" event per completed strategy, then "done"
+
+    The rule-based baseline sections (source "rules") go out first, before
+    Gemini is called; the model's sections (source "model") follow as they
+    close. "done" carries the same body as the non-streaming response.
+    Cached analyses are replayed as sections without deltas.
+    """
+    if baseline is not None:
+        for name in DEFENSE_SECTIONS:
+            yield sse_event("section", {"name": name, "value": baseline[name], "source": "rules"})
+        if not enrich:
+            yield sse_event("done", rules_response(baseline))
+            return
+
+    if cache_mode == "default":
+        cached, tier = await analysis_cache.lookup(key)
+        if cached is not None:
+            analysis_cache.record_hit(model, cached)
+            response = defense_response(cached, model, key, tier, baseline)
+            for name in DEFENSE_SECTIONS:
+                if name in response["analysis"]:
+                    yield sse_event("section", {"name": name, "value": response["analysis"][name], "source": "model"})
+            yield sse_event("done", response)
+            return
+
+    analysis_cache.record_miss(model)
+    parser = SectionParser(DEFENSE_SECTIONS)
+    result = None
+    try:
+        async for kind, payload in stream_gemini(
             api_key,
             model,
             messages,
             generation=data.get('generation'),
             safety=data.get('safety'),
             expect_json=True
-        )
+        ):
+            if kind == "result":
+                result = payload
+                continue
+            yield sse_event("delta", payload)
+            if payload["candidate"] == 0:
+                for name, value in parser.feed(payload["text"]):
+                    yield sse_event("section", {"name": name, "value": value, "source": "model"})
+    except Exception as e:
+        if baseline is None:
+            raise
+        yield sse_event("done", rules_response(baseline, enrichment_error=str(e) or "Gemini request timed out"))
+        return
+
+    if cache_mode != "bypass" and "note" not in result:
+        await analysis_cache.store(key, model, result)
+    yield sse_event("done", defense_response(result, model, key, None, baseline))
+
+
+def request_cache_mode(data: Dict[str, Any], request: Request) -> str:
+    """Cache mode from the body's "cache" field, else from Cache-Control (no-cache / no-store)"""
+    if data.get('cache'):
+        return data['cache']
+    cache_control = request.headers.get("cache-control", "").lower()
+    if "no-store" in cache_control:
+        return "bypass"
+    if "no-cache" in cache_control:
+        return "refresh"
+    return "default"
+
+
+@app.post('/api/defense-analysis')
+async def defense_analysis(request: Request):
+    try:
+        data = await request.json()
+        
+        api_key = data.get('apiKey', '')
+        model = data.get('model', DEFAULT_MODEL)
+        impact_data = data.get('impactData', {})
         
-        # Try to parse the JSON response - handle markdown code blocks
+        if not impact_data:
+            return error_response("Impact data is required", 400)
+        
+        # The rule-based baseline answers on its own; Gemini enriches it when a key is given
+        baseline = baseline_analysis(impact_data)
+        enrich = bool(api_key) and data.get('enrich', True) is not False
+        if baseline is None and not api_key:
+            return error_response("API key is required", 400)
+        
+        if baseline is not None and not enrich and not wants_stream(data, request):
+            return rules_response(baseline)
+        
+        cache_mode = request_cache_mode(data, request)
+        if cache_mode not in ai_cache.CACHE_MODES:
+            return error_response(f"cache must be one of {', '.join(ai_cache.CACHE_MODES)}", 400)
+        
+        messages = build_defense_messages(impact_data)
+        key = analysis_cache_key(model, messages, data.get('generation'), data.get('safety'))
+        
+        if wants_stream(data, request):
+            return sse_response(defense_events(api_key, model, messages, data, key, cache_mode, baseline, enrich))
+        
+        # Call Gemini with full user-configurable params unless the same scenario is cached
         try:
-            response_text = result["content"]
-            # Remove markdown code blocks if present
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-            elif response_text.startswith("```"):
-                response_text = response_text.replace("```", "").strip()
-            
-            analysis_data = json.loads(response_text)
-        except json.JSONDecodeError as e:
-            # If not valid JSON, return the raw content
-            analysis_data = {
-                "raw_content": result["content"],
-                "error": f"Response was not in expected JSON format: {str(e)}"
-            }
+            result, cache_tier = await analysis_cache.get_or_compute(
+                key,
+                model,
+                lambda: call_gemini(
+                    api_key,
+                    model,
+                    messages,
+                    generation=data.get('generation'),
+                    safety=data.get('safety'),
+                    expect_json=True
+                ),
+                mode=cache_mode,
+                cacheable=lambda value: "note" not in value,
+            )
+        except Exception as e:
+            if baseline is None:
+                raise
+            return rules_response(baseline, enrichment_error=str(e) or "Gemini request timed out")
         
-        return jsonify({
-            "analysis": analysis_data,
-            "usage": result.get("usage", {}),
-            "provider": "gemini",
-            "model": model
-        })
+        return defense_response(result, model, key, cache_tier, baseline)
         
+    except asyncio.TimeoutError as e:
+        return error_response(str(e) or "Gemini request timed out", 504)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(str(e), 500)
+
+
+@app.get('/api/cache/stats')
+async def cache_stats():
+    """Analysis cache size and per-model hit rate / estimated token savings"""
+    return analysis_cache.summary()
+
+
+@app.get('/api/health')
+async def health():
+    return {"status": "healthy", "message": "AI API server is running"}
 
-@app.route('/api/health', methods=['GET'])
-def health():
-    return jsonify({"status": "healthy", "message": "AI API server is running"})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5001)
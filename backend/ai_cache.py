@@ -0,0 +1,229 @@
+"""Content-addressed cache for AI analysis results.
+
+Entries are keyed on a SHA-256 of the canonical JSON of everything that
+determines a completion: the prompt inputs, the prompt template, the model
+and the generation/safety configuration. A bounded in-memory LRU sits in
+front of an optional SQLite tier (AI_CACHE_SQLITE_PATH) that survives
+restarts and is shared by processes on the same host. Both tiers honour
+AI_CACHE_TTL. Concurrent misses for the same key share one computation.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+AI_CACHE_TTL = float(os.environ.get("AI_CACHE_TTL", str(7 * 24 * 3600)))
+AI_CACHE_MAX_ENTRIES = int(os.environ.get("AI_CACHE_MAX_ENTRIES", "512"))
+AI_CACHE_SQLITE_PATH = os.environ.get("AI_CACHE_SQLITE_PATH", "")
+
+# Cache modes: "default" reads and writes, "refresh" skips the read but stores
+# the new result, "bypass" neither reads nor writes
+CACHE_MODES = ("default", "refresh", "bypass")
+
+
+def _canonical(value: Any) -> Any:
+    """Normalize values so equal scenarios hash equally (1 == 1.0, key order, tuples)"""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(repr(float(value)))
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return str(value)
+
+
+def cache_key(**parts: Any) -> str:
+    """SHA-256 of the canonical JSON encoding of the given parts"""
+    encoded = json.dumps(_canonical(parts), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class SQLiteTier:
+    """Persistent cache tier in a single SQLite file; calls run in a worker thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache ("
+                "key TEXT PRIMARY KEY, model TEXT, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Connection that commits (or rolls back) and is closed when the block ends"""
+        with closing(sqlite3.connect(self.path, timeout=5)) as connection, connection:
+            yield connection
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT value, expires_at FROM ai_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                connection.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                return None
+            return json.loads(row[0])
+
+    def _put(self, key: str, model: str, value: Dict[str, Any], expires_at: float):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, model, value, expires_at) VALUES (?, ?, ?, ?)",
+                (key, model, json.dumps(value), expires_at),
+            )
+            connection.execute("DELETE FROM ai_cache WHERE expires_at < ?", (time.time(),))
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: str, model: str, value: Dict[str, Any], expires_at: float):
+        await asyncio.to_thread(self._put, key, model, value, expires_at)
+
+
+class ModelStats:
+    """Hit/miss counts and estimated token savings for one model"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+class AnalysisCache:
+    """Memory LRU + optional SQLite tier of AI results, with per-model statistics"""
+
+    def __init__(
+        self,
+        ttl: float = AI_CACHE_TTL,
+        max_entries: int = AI_CACHE_MAX_ENTRIES,
+        sqlite_path: str = AI_CACHE_SQLITE_PATH,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk = SQLiteTier(sqlite_path) if sqlite_path else None
+        # key -> (expires_at, value)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Dict[str, ModelStats] = {}
+
+    def _model_stats(self, model: str) -> ModelStats:
+        stats = self.stats.get(model)
+        if stats is None:
+            stats = self.stats[model] = ModelStats()
+        return stats
+
+    def record_hit(self, model: str, value: Dict[str, Any]):
+        stats = self._model_stats(model)
+        stats.hits += 1
+        stats.tokens_saved += (value.get("usage") or {}).get("total_tokens", 0)
+
+    def record_miss(self, model: str):
+        self._model_stats(model).misses += 1
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _put_memory(self, key: str, value: Dict[str, Any], expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def lookup(self, key: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Return (value, tier) for a cached key, promoting disk hits into memory"""
+        value = self._get_memory(key)
+        if value is not None:
+            return value, "memory"
+        if self.disk is not None:
+            try:
+                value = await self.disk.get(key)
+            except Exception:
+                value = None
+            if value is not None:
+                self._put_memory(key, value, time.time() + self.ttl)
+                return value, "disk"
+        return None, None
+
+    async def store(self, key: str, model: str, value: Dict[str, Any]):
+        expires_at = time.time() + self.ttl
+        self._put_memory(key, value, expires_at)
+        if self.disk is not None:
+            try:
+                await self.disk.put(key, model, value, expires_at)
+            except Exception:
+                pass
+
+    async def get_or_compute(
+        self,
+        key: str,
+        model: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        mode: str = "default",
+        cacheable: Callable[[Dict[str, Any]], bool] = lambda value: True,
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Return (value, tier hit or None); concurrent misses for one key share one compute()"""
+        if mode == "default":
+            value, tier = await self.lookup(key)
+            if value is not None:
+                self.record_hit(model, value)
+                return value, tier
+
+            future = self._inflight.get(key)
+            if future is not None:
+                value = await asyncio.shield(future)
+                self.record_hit(model, value)
+                return value, "inflight"
+
+        self.record_miss(model)
+        if mode == "bypass":
+            return await compute(), None
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+            if cacheable(value):
+                await self.store(key, model, value)
+            future.set_result(value)
+            return value, None
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "disk_tier": self.disk.path if self.disk is not None else None,
+            "models": {model: stats.as_dict() for model, stats in self.stats.items()},
+        }
@@ -0,0 +1,423 @@
+"""Atmospheric entry of impactors: deceleration, ablation and pancake breakup.
+
+Each body is flown from ENTRY_ALTITUDE through an exponential atmosphere
+with the classic meteor equations (drag, ablation, gravity and the flight
+path turning with Earth's curvature). Once the ram pressure rho_a v^2
+exceeds the body's strength it fragments and the fragment cloud spreads
+laterally as a pancake (Chyba, Thomas & Zahnle 1993), which multiplies the
+drag area; the cloud counts as dispersed, i.e. the body has burst in the
+air, when its radius reaches PANCAKE_FACTOR times the initial radius
+(Collins, Melosh & Marcus 2005 use the same criterion).
+
+All bodies are integrated together as one state array (6, N) with a
+classical Runge-Kutta step whose size is chosen per body from the local
+altitude, velocity, mass and radius change rates, so fast steep entries
+and slow grazing ones both take a few hundred steps; intact bodies cross the
+thin upper atmosphere in long steps that end just past their breakup
+altitude. Bodies that reach the ground, disperse, stall or skip back out
+of the atmosphere are retired from the working arrays as they finish.
+Large bodies the atmosphere can barely slow down are screened out
+analytically beforehand (ground_impact_screen) and never enter the loop.
+
+The outcome decides what the impact pipeline reports: a crater when a body
+reaches the ground at hypervelocity-ish speed, airblast overpressure when a
+significant share of the energy is deposited in the air, or both.
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+ENTRY_ALTITUDE = 100_000.0  # m
+SCALE_HEIGHT = 8_000.0  # m
+SEA_LEVEL_DENSITY = 1.225  # kg/m^3
+EARTH_RADIUS = 6_371_000.0  # m
+SURFACE_GRAVITY = 9.81  # m/s^2
+
+DRAG_COEFFICIENT = 2.0
+HEAT_TRANSFER_COEFFICIENT = 0.1
+HEAT_OF_ABLATION = 8e6  # J/kg
+PANCAKE_FACTOR = 7.0
+
+# Integration control: largest altitude drop and relative change of v, m, r per step
+MAX_ALTITUDE_STEP = 500.0
+MAX_RELATIVE_STEP = 0.02
+MAX_TIME_STEP = 1.0
+# Share of the height above its breakup altitude an intact body may descend in one step
+HEADROOM_STEP_FRACTION = 0.5
+MAX_STEPS = 5000
+
+# Bodies slower than this are in dark flight; their energy counts as deposited
+STALL_VELOCITY = 500.0  # m/s
+# A ground impact below this speed leaves no crater worth reporting
+MIN_CRATER_VELOCITY = 500.0  # m/s
+# Airblast is reported when at least this share of the entry energy stays in the air
+AIRBLAST_MIN_FRACTION = 0.1
+
+# Analytic screen: bodies that can lose at most this share of their energy on
+# the way down reach the ground as a crater and skip the integrator
+FAST_PATH_MAX_DEPOSITION = 0.05
+# The screen assumes a nearly straight path; shallower entries are always integrated
+FAST_PATH_MIN_ANGLE = 30.0  # degrees
+
+KILOTON_J = 4.184e12
+# Overpressure of a 1 kt surface burst (Collins et al. 2005, eq. 54)
+REFERENCE_PRESSURE = 75_000.0  # Pa
+REFERENCE_DISTANCE = 290.0  # m
+# The reference curve does not hold inside the fireball; closer scaled ranges are clamped
+MIN_SCALED_RANGE = 50.0  # m/kt^(1/3)
+OVERPRESSURE_THRESHOLDS = {
+    "1psi": 6_895.0,     # windows shatter
+    "4psi": 27_579.0,    # residential buildings collapse
+    "20psi": 137_895.0,  # reinforced concrete destroyed
+}
+
+# "escape": the body grazed the atmosphere and left it again without a significant airblast
+REGIMES = ("crater", "airburst", "both", "escape")
+
+# Indices into the state array
+V, M, THETA, H, R, U = range(6)
+
+
+def yield_strength(density) -> np.ndarray:
+    """Bulk strength (Pa) from density, Collins et al. (2005) eq. 9"""
+    return 10.0 ** (2.107 + 0.0624 * np.sqrt(np.asarray(density, dtype=np.float64)))
+
+
+def air_density(altitude) -> np.ndarray:
+    return SEA_LEVEL_DENSITY * np.exp(-np.asarray(altitude) / SCALE_HEIGHT)
+
+
+def _derivatives(y: np.ndarray, spread: np.ndarray) -> np.ndarray:
+    """dy/dt; spread is the pancake coefficient C_D / (4 rho_m), zero for intact bodies"""
+    v, m, theta, h, r, u = y
+    rho_a = SEA_LEVEL_DENSITY * np.exp(-h / SCALE_HEIGHT)
+    v_sq = v * v
+    # Ram pressure times frontal area
+    load = rho_a * v_sq * (np.pi * r * r)
+    sin_t, cos_t = np.sin(theta), np.cos(theta)
+    distance = EARTH_RADIUS + h
+    ratio = EARTH_RADIUS / distance
+    g = SURFACE_GRAVITY * ratio * ratio
+
+    dy = np.empty_like(y)
+    dy[V] = g * sin_t - (0.5 * DRAG_COEFFICIENT) * load / m
+    dy[M] = -(0.5 * HEAT_TRANSFER_COEFFICIENT / HEAT_OF_ABLATION) * load * v
+    dy[THETA] = cos_t * (g / v - v / distance)
+    dy[H] = -v * sin_t
+    # The expansion rate u stays zero until the body fragments
+    dy[R] = u
+    # Collins et al. eq. 15 for the pancake diameter, written for its radius
+    dy[U] = spread * rho_a * v_sq / r
+    return dy
+
+
+def _step_size(y: np.ndarray, dy: np.ndarray, altitude_step: np.ndarray) -> np.ndarray:
+    """Per-body time step: at most altitude_step (m) of descent and MAX_RELATIVE_STEP of v, m and r"""
+    with np.errstate(divide="ignore"):
+        dt = np.minimum(altitude_step / np.abs(dy[H]), MAX_TIME_STEP)
+        for index in (V, M, R):
+            dt = np.minimum(dt, MAX_RELATIVE_STEP * y[index] / np.abs(dy[index]))
+    return dt
+
+
+def ground_impact_screen(radius, mass, velocity, density, theta, strength, start_altitude: float) -> Dict[str, np.ndarray]:
+    """Bodies that certainly reach the ground with nearly all of their energy.
+
+    On a straight path the air column in front of a body weighs
+    rho_0 H / sin(theta) per unit area, so drag removes at most a share
+    eps = (C_D / 2) column pi r^2 / m of the velocity and ablation at most
+    sigma v^2 eps of the mass (sigma = C_H / (C_D Q)). A body fragmenting
+    at altitude z widens by at most
+    C_D rho_0 H (H (1 - e^(-z/H)) - z e^(-z/H)) / (4 rho_m r sin^2(theta))
+    before sea level, which bounds r. theta is lowered by the turn of a path that long
+    along Earth's curvature, and v includes what gravity adds on the way down.
+
+    Returns the mask of bodies whose energy loss bound stays under
+    FAST_PATH_MAX_DEPOSITION, together with their breakup altitude, ground
+    velocity and ground mass from the analytic intact-body solution.
+    """
+    sin_t = np.sin(theta)
+    sin_low = np.sin(np.maximum(theta - start_altitude / (sin_t * EARTH_RADIUS), 1e-3))
+    v_top = np.sqrt(velocity ** 2 + 2.0 * SURFACE_GRAVITY * start_altitude)
+    column = SEA_LEVEL_DENSITY * SCALE_HEIGHT * -np.expm1(-start_altitude / SCALE_HEIGHT)
+    sigma = HEAT_TRANSFER_COEFFICIENT / (DRAG_COEFFICIENT * HEAT_OF_ABLATION)
+
+    fragments = SEA_LEVEL_DENSITY * v_top ** 2 > strength
+    # Spreading starts no higher than where the fastest possible body would break up
+    with np.errstate(divide="ignore"):
+        highest = np.clip(SCALE_HEIGHT * np.log(SEA_LEVEL_DENSITY * v_top ** 2 / strength), 0.0, start_altitude)
+    spread_column = SCALE_HEIGHT * -np.expm1(-highest / SCALE_HEIGHT) - highest * np.exp(-highest / SCALE_HEIGHT)
+    # 10% slack for the velocity changing along the path, which the deposition cap keeps well below that
+    widening = np.where(
+        fragments,
+        1.1 * DRAG_COEFFICIENT * SEA_LEVEL_DENSITY * SCALE_HEIGHT * spread_column / (4.0 * density * radius * sin_low ** 2),
+        0.0,
+    )
+    eps = 0.5 * DRAG_COEFFICIENT * column / sin_low * np.pi * (radius + widening) ** 2 / mass
+    deposition = (2.0 + sigma * v_top ** 2) * eps
+    quick = (
+        (theta >= np.radians(FAST_PATH_MIN_ANGLE))
+        & (deposition <= FAST_PATH_MAX_DEPOSITION)
+        & (widening < radius)
+        & (velocity >= 2.0 * MIN_CRATER_VELOCITY)
+    )
+
+    # Intact body on a straight path: v falls exponentially with the column it has swept,
+    # and the mass follows m = m0 exp(-sigma (v0^2 - v^2) / 2)
+    ground_velocity = v_top * np.exp(-0.5 * DRAG_COEFFICIENT * column / sin_t * np.pi * radius ** 2 / mass)
+    ground_mass = mass * np.exp(-0.5 * sigma * (v_top ** 2 - ground_velocity ** 2))
+    with np.errstate(divide="ignore"):
+        breakup = SCALE_HEIGHT * np.log(SEA_LEVEL_DENSITY * velocity ** 2 / strength)
+    breakup_altitude = np.where(fragments, np.clip(breakup, 0.0, start_altitude), np.nan)
+    return {
+        "quick": quick,
+        "breakup_altitude": breakup_altitude,
+        "ground_velocity": ground_velocity,
+        "ground_mass": ground_mass,
+    }
+
+
+def simulate_entry(
+    diameter, velocity, density, angle, strength=None, start_altitude: float = ENTRY_ALTITUDE,
+    fast_path: bool = True,
+) -> Dict[str, Any]:
+    """Fly a batch of bodies through the atmosphere.
+
+    diameter (m), velocity (m/s at the top of the atmosphere), density
+    (kg/m^3) and angle (degrees above the horizon) broadcast together;
+    strength defaults to yield_strength(density). Returns per body:
+    breakup and burst altitudes (m, NaN when they did not happen), ground
+    velocity, mass, equivalent diameter and energy, the energy deposited in
+    the air, and the crater/airblast flags with the resulting regime index
+    (into REGIMES), and whether the body grazed the atmosphere and left it
+    again. With fast_path, bodies passing ground_impact_screen take its
+    analytic outcome instead of being integrated.
+
+    Throughput on one core (BLAS threads pinned to 1, 20k bodies): about 14k
+    bodies/s for 5-500 m bodies with mixed densities and sin^2-distributed
+    angles, about 19k/s at a fixed 45 degrees and 3000 kg/m^3.
+    """
+    diameter, velocity, density, angle = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.float64) for value in (diameter, velocity, density, angle))
+    )
+    shape = diameter.shape
+    diameter, velocity, density, angle = (np.ravel(value) for value in (diameter, velocity, density, angle))
+    strength = yield_strength(density) if strength is None else np.broadcast_to(
+        np.asarray(strength, dtype=np.float64), shape
+    ).ravel()
+    count = diameter.size
+
+    radius = diameter / 2.0
+    mass0 = 4.0 / 3.0 * np.pi * radius ** 3 * density
+    energy0 = 0.5 * mass0 * velocity ** 2
+
+    y = np.empty((6, count))
+    y[V] = velocity
+    y[M] = mass0
+    y[THETA] = np.radians(np.clip(angle, 1.0, 90.0))
+    y[H] = start_altitude
+    y[R] = radius
+    y[U] = 0.0
+
+    breakup_altitude = np.full(count, np.nan)
+    end_altitude = np.zeros(count)
+    ground_velocity = np.zeros(count)
+    ground_mass = np.zeros(count)
+    reached_ground = np.zeros(count, dtype=bool)
+    dispersed = np.zeros(count, dtype=bool)
+    escaped = np.zeros(count, dtype=bool)
+    exit_energy = np.zeros(count)
+    peak_deposition = np.zeros(count)
+    peak_altitude = np.full(count, np.nan)
+
+    # Working set: the bodies still in flight
+    active = np.arange(count)
+    if fast_path:
+        screen = ground_impact_screen(radius, mass0, velocity, density, y[THETA], strength, start_altitude)
+        quick = screen["quick"]
+        if np.any(quick):
+            breakup_altitude[quick] = screen["breakup_altitude"][quick]
+            ground_velocity[quick] = screen["ground_velocity"][quick]
+            ground_mass[quick] = screen["ground_mass"][quick]
+            reached_ground[quick] = True
+            active, y = active[~quick], y[:, ~quick]
+    rho_m, yield_pa, r0 = density[active], strength[active], radius[active]
+    fragmented = np.zeros(active.size, dtype=bool)
+
+    for _ in range(MAX_STEPS):
+        if active.size == 0:
+            break
+        newly = ~fragmented & (air_density(y[H]) * y[V] ** 2 > yield_pa)
+        if np.any(newly):
+            fragmented = fragmented | newly
+            breakup_altitude[active[newly]] = y[H, newly]
+
+        spread = np.where(fragmented, 0.25 * DRAG_COEFFICIENT / rho_m, 0.0)
+        # Intact bodies take long altitude steps through the thin air above the altitude where
+        # they would break up, and land just past it; the limits on v and m still apply
+        with np.errstate(divide="ignore"):
+            headroom = y[H] - SCALE_HEIGHT * np.log(SEA_LEVEL_DENSITY * y[V] ** 2 / yield_pa)
+        altitude_step = np.where(
+            fragmented | ~(headroom > 0),
+            MAX_ALTITUDE_STEP,
+            np.minimum(np.maximum(HEADROOM_STEP_FRACTION * headroom, MAX_ALTITUDE_STEP), headroom + 1.0),
+        )
+        k1 = _derivatives(y, spread)
+        dt = _step_size(y, k1, altitude_step)
+        half = 0.5 * dt
+        k2 = _derivatives(y + half * k1, spread)
+        k3 = _derivatives(y + half * k2, spread)
+        k4 = _derivatives(y + dt * k3, spread)
+        y_next = y + (dt / 6.0) * (k1 + 2.0 * (k2 + k3) + k4)
+
+        ground = y_next[H] <= 0.0
+        burst = fragmented & (y_next[R] >= PANCAKE_FACTOR * r0)
+        # Cut the last step back to where the body hits sea level or the cloud disperses
+        fraction = np.ones(active.size)
+        if np.any(ground):
+            fraction[ground] = y[H, ground] / (y[H, ground] - y_next[H, ground])
+        if np.any(burst):
+            target = PANCAKE_FACTOR * r0[burst]
+            fraction[burst] = np.minimum(fraction[burst], (target - y[R, burst]) / (y_next[R, burst] - y[R, burst]))
+        cut = ground | burst
+        if np.any(cut):
+            y_next[:, cut] = y[:, cut] + fraction[cut] * (y_next[:, cut] - y[:, cut])
+            # Whichever event comes first in the step wins
+            ground = cut & (y_next[H] <= 1e-6)
+            burst &= ~ground
+            y_next[H, ground] = 0.0
+
+        energy = 0.5 * y[M] * y[V] ** 2
+        energy_next = 0.5 * y_next[M] * y_next[V] ** 2
+        drop = np.maximum(y[H] - y_next[H], 1e-9)
+        deposition = (energy - energy_next) / drop
+        higher = deposition > peak_deposition[active]
+        peak_deposition[active[higher]] = deposition[higher]
+        peak_altitude[active[higher]] = 0.5 * (y[H, higher] + y_next[H, higher])
+
+        y = y_next
+        stalled = (y[V] < STALL_VELOCITY) & ~ground
+        # Grazing bodies that climb back out of the atmosphere keep the energy they leave with
+        left = (y[H] > start_altitude) & ~burst
+        done = ground | burst | stalled | left
+        if np.any(done):
+            finished = active[done]
+            end_altitude[finished] = y[H, done]
+            reached_ground[finished] = ground[done]
+            dispersed[finished] = burst[done] | stalled[done]
+            escaped[finished] = left[done]
+            exit_energy[finished] = np.where(left[done], energy_next[done], 0.0)
+            ground_velocity[finished] = np.where(ground[done], y[V, done], 0.0)
+            ground_mass[finished] = np.where(ground[done], y[M, done], 0.0)
+
+            keep = ~done
+            active, y, fragmented = active[keep], y[:, keep], fragmented[keep]
+            rho_m, yield_pa, r0 = rho_m[keep], yield_pa[keep], r0[keep]
+    else:
+        # Out of steps: whatever is still flying deposits its energy where it is
+        end_altitude[active] = y[H]
+        dispersed[active] = True
+
+    ground_energy = 0.5 * ground_mass * ground_velocity ** 2
+    airburst_energy = np.maximum(energy0 - ground_energy - exit_energy, 0.0)
+    crater = reached_ground & (ground_velocity >= MIN_CRATER_VELOCITY)
+    airblast = (~crater & ~escaped) | (airburst_energy >= AIRBLAST_MIN_FRACTION * energy0)
+    # A dispersed cloud releases what is left of its energy where it disperses
+    burst_altitude = np.where(dispersed, end_altitude, peak_altitude)
+    burst_altitude = np.where(airblast, burst_altitude, np.nan)
+    regime = np.where(crater & airblast, 2, np.where(crater, 0, np.where(airblast, 1, 3)))
+
+    with np.errstate(invalid="ignore"):
+        ground_diameter = np.where(ground_mass > 0, np.cbrt(6.0 * ground_mass / (np.pi * density)), 0.0)
+
+    result = {
+        "regime": regime,
+        "crater": crater,
+        "airblast": airblast,
+        "fragmented": ~np.isnan(breakup_altitude),
+        "escaped": escaped,
+        "breakup_altitude": breakup_altitude,
+        "burst_altitude": burst_altitude,
+        "entry_energy": energy0,
+        "airburst_energy": airburst_energy,
+        "ground_energy": ground_energy,
+        "ground_velocity": ground_velocity,
+        "ground_mass": ground_mass,
+        "ground_diameter": ground_diameter,
+    }
+    return {name: values.reshape(shape) for name, values in result.items()}
+
+
+def overpressure(energy_j, burst_altitude, ground_range) -> np.ndarray:
+    """Peak overpressure (Pa) on the ground at ground_range (m) from the burst point.
+
+    Uses the 1 kt reference curve at the cube-root-scaled slant range.
+    """
+    energy_kt = np.maximum(np.asarray(energy_j, dtype=np.float64) / KILOTON_J, 1e-12)
+    slant = np.hypot(np.asarray(ground_range, dtype=np.float64), np.asarray(burst_altitude, dtype=np.float64))
+    scaled = np.maximum(slant / np.cbrt(energy_kt), MIN_SCALED_RANGE)
+    ratio = REFERENCE_DISTANCE / scaled
+    return REFERENCE_PRESSURE * ratio / 4.0 * (1.0 + 3.0 * ratio ** 1.3)
+
+
+def overpressure_radii(energy_j, burst_altitude, iterations: int = 60) -> Dict[str, np.ndarray]:
+    """Ground radius (m) inside which each OVERPRESSURE_THRESHOLDS level is exceeded (0 if nowhere)"""
+    energy_kt = np.maximum(np.asarray(energy_j, dtype=np.float64) / KILOTON_J, 1e-12)
+    burst_altitude = np.nan_to_num(np.asarray(burst_altitude, dtype=np.float64))
+    scale = np.cbrt(energy_kt)
+
+    radii = {}
+    for name, threshold in OVERPRESSURE_THRESHOLDS.items():
+        # The reference curve falls monotonically with scaled range: bisect on its log
+        low = np.full(energy_kt.shape, np.log(MIN_SCALED_RANGE))
+        high = np.full(energy_kt.shape, np.log(1e7))
+        for _ in range(iterations):
+            middle = 0.5 * (low + high)
+            ratio = REFERENCE_DISTANCE / np.exp(middle)
+            above = REFERENCE_PRESSURE * ratio / 4.0 * (1.0 + 3.0 * ratio ** 1.3) > threshold
+            low = np.where(above, middle, low)
+            high = np.where(above, high, middle)
+        slant = np.exp(low) * scale
+        radii[name] = np.sqrt(np.maximum(slant ** 2 - burst_altitude ** 2, 0.0))
+    return radii
+
+
+def airblast_effects(entry: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Ground-zero overpressure and damage radii for the bodies whose airblast is reported"""
+    airblast = np.asarray(entry["airblast"])
+    energy = np.where(airblast, entry["airburst_energy"], 0.0)
+    altitude = np.nan_to_num(np.asarray(entry["burst_altitude"], dtype=np.float64))
+    radii = overpressure_radii(energy, altitude)
+    return {
+        "ground_zero_overpressure": np.where(airblast, overpressure(energy, altitude, 0.0), 0.0),
+        **{f"radius_{name}": np.where(airblast, values, 0.0) for name, values in radii.items()},
+    }
+
+
+def _scalar(value: Any) -> Optional[Any]:
+    value = value.item() if isinstance(value, np.generic) else value
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def entry_summary(entry: Dict[str, Any], effects: Dict[str, Any], index: int = 0) -> Dict[str, Any]:
+    """One body's entry outcome as a JSON-ready dict"""
+    summary = {"regime": REGIMES[int(np.ravel(entry["regime"])[index])]}
+    for source in (entry, effects):
+        for name, values in source.items():
+            if name != "regime":
+                summary[name] = _scalar(np.ravel(values)[index])
+    return summary
+
+
+def entry_columns(entry: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Columnar entry outcome with airblast effects and regime names, as reported by the batch API"""
+    columns = {name: values for name, values in entry.items() if name != "regime"}
+    columns.update(airblast_effects(entry))
+    return {"regime": np.asarray(REGIMES)[entry["regime"]], **columns}
+
+
+def merge_chunks(chunks: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Concatenate simulate_entry results of consecutive slices"""
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
@@ -0,0 +1,209 @@
+"""Coordination between API worker processes through MongoDB.
+
+LeaderLock is a lease document (one per lock name) that a single worker
+holds and renews; the others keep retrying and take over once the lease
+expires. It decides which worker runs the NEO sync.
+
+MongoPubSub is a small message bus over a capped collection read with a
+tailable cursor, so it works on standalone servers as well as replica sets.
+Workers use it to tell each other about finished syncs (new snapshot,
+invalidated caches) and to forward manual sync requests to the leader.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from pymongo import CursorType, ReturnDocument
+from pymongo.errors import CollectionInvalid, DuplicateKeyError
+
+import instrumentation
+
+logger = logging.getLogger("server.cluster")
+
+CLUSTER_COORDINATION = os.environ.get("CLUSTER_COORDINATION", "true").lower() == "true"
+CLUSTER_LOCK_TTL = float(os.environ.get("CLUSTER_LOCK_TTL", "30"))
+CLUSTER_EVENTS_COLLECTION = os.environ.get("CLUSTER_EVENTS_COLLECTION", "cluster_events")
+CLUSTER_EVENTS_SIZE = int(os.environ.get("CLUSTER_EVENTS_SIZE", str(16 * 1024 * 1024)))
+CLUSTER_TAIL_RETRY_SECONDS = 1.0
+# Events re-read after a cursor restart, to cover ObjectIds that are not strictly ordered across processes
+CLUSTER_REPLAY_WINDOW = timedelta(seconds=5)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+leader_gauge = instrumentation.register(instrumentation.Gauge(
+    "cluster_leader", "1 if this worker holds the lock", ("lock",)
+))
+messages_total = instrumentation.register(instrumentation.Counter(
+    "cluster_messages_total", "Cluster bus messages", ("channel", "direction")
+))
+
+
+class LeaderLock:
+    """Lease-based lock in MongoDB; is_leader is True while this worker holds it"""
+
+    def __init__(self, get_collection: Callable[[], Any], name: str, ttl: float = CLUSTER_LOCK_TTL, owner: str = WORKER_ID):
+        self.get_collection = get_collection
+        self.name = name
+        self.ttl = ttl
+        self.owner = owner
+        self.is_leader = False
+        self._renewed_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def try_acquire(self) -> bool:
+        """Take the lock if it is free or expired, or renew it if we hold it"""
+        now = datetime.now(timezone.utc)
+        try:
+            document = await self.get_collection().find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            held = document is not None and document.get("owner") == self.owner
+        except DuplicateKeyError:
+            # Someone else holds an unexpired lease
+            held = False
+        except Exception as e:
+            logger.warning(f"Could not renew lock {self.name}: {e}")
+            # Keep leading only while the last successful lease is still valid
+            held = self.is_leader and self._renewed_at is not None and now - self._renewed_at < timedelta(seconds=self.ttl)
+            self._set_leader(held)
+            return held
+
+        if held:
+            self._renewed_at = now
+        self._set_leader(held)
+        return held
+
+    def _set_leader(self, held: bool):
+        if held != self.is_leader:
+            logger.info(f"Worker {self.owner} {'acquired' if held else 'lost'} lock {self.name}")
+        self.is_leader = held
+        leader_gauge.set(self.name, value=1 if held else 0)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            await self.try_acquire()
+
+    async def start(self):
+        """Make a first attempt, then keep renewing/retrying in the background"""
+        await self.try_acquire()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop renewing and hand the lock over immediately"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self.is_leader:
+            try:
+                await self.get_collection().delete_one({"_id": self.name, "owner": self.owner})
+            except Exception as e:
+                logger.warning(f"Could not release lock {self.name}: {e}")
+            self._set_leader(False)
+
+
+class MongoPubSub:
+    """Broadcast messages to every worker through a tailable capped collection"""
+
+    def __init__(self, get_db: Callable[[], Any], collection_name: str = CLUSTER_EVENTS_COLLECTION, origin: str = WORKER_ID):
+        self.get_db = get_db
+        self.collection_name = collection_name
+        self.origin = origin
+        self.enabled = False
+        self._handlers: Dict[str, List[Callable[[Dict[str, Any]], Awaitable[None]]]] = {}
+        self._seen: Deque[Any] = deque(maxlen=1024)
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, channel: str, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """Call handler(payload) for messages on channel published by other workers"""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    @property
+    def collection(self):
+        return self.get_db()[self.collection_name]
+
+    async def publish(self, channel: str, payload: Dict[str, Any]):
+        if not self.enabled:
+            return
+        try:
+            await self.collection.insert_one({
+                "channel": channel,
+                "payload": payload,
+                "origin": self.origin,
+                "created_at": datetime.now(timezone.utc),
+            })
+            messages_total.inc(channel, "out")
+        except Exception as e:
+            logger.warning(f"Could not publish {channel} to the cluster bus: {e}")
+
+    async def start(self) -> bool:
+        """Create the capped collection if needed and start tailing it"""
+        db = self.get_db()
+        try:
+            try:
+                await db.create_collection(self.collection_name, capped=True, size=CLUSTER_EVENTS_SIZE)
+            except CollectionInvalid:
+                pass
+            if await self.collection.find_one() is None:
+                # A tailable cursor on an empty capped collection dies immediately
+                await self.collection.insert_one({"channel": "_init", "origin": self.origin, "created_at": datetime.now(timezone.utc)})
+        except Exception as e:
+            logger.warning(f"Cluster bus unavailable, running without cross-worker messages: {e}")
+            return False
+        self.enabled = True
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return True
+
+    async def stop(self):
+        self.enabled = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def _run(self):
+        since = datetime.now(timezone.utc)
+        while True:
+            cursor = self.collection.find(
+                {"created_at": {"$gte": since - CLUSTER_REPLAY_WINDOW}},
+                cursor_type=CursorType.TAILABLE_AWAIT,
+            )
+            try:
+                async for message in cursor:
+                    if message["_id"] in self._seen:
+                        continue
+                    self._seen.append(message["_id"])
+                    created_at = message.get("created_at")
+                    if created_at is not None:
+                        since = max(since, created_at.replace(tzinfo=timezone.utc) if created_at.tzinfo is None else created_at)
+                    if message.get("origin") != self.origin:
+                        await self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cluster bus cursor failed, reopening: {e}")
+            await asyncio.sleep(CLUSTER_TAIL_RETRY_SECONDS)
+
+    async def _dispatch(self, message: Dict[str, Any]):
+        channel = message.get("channel")
+        handlers = self._handlers.get(channel, [])
+        if handlers:
+            messages_total.inc(channel, "in")
+        for handler in handlers:
+            try:
+                await handler(message.get("payload") or {})
+            except Exception as e:
+                logger.warning(f"Cluster bus handler for {channel} failed: {e}")
@@ -0,0 +1,284 @@
+"""Rule-based defense strategy scoring.
+
+Implements the rule tables of the defense-analysis prompt (ai_api.py) as
+plain array arithmetic: three diameter bands (<200 m, 200-500 m, >500 m),
+each with a short and a long warning-time anchor that fixes favorability
+and a success range for the kinetic impactor, gravity tractor and nuclear
+device. Between the two anchors of a band (e.g. 2-5 years for small
+bodies) success ranges are interpolated linearly and favorability follows
+the nearer anchor. Urgency comes from the warning time alone.
+
+score_batch() scores whole arrays of scenarios at once (the NEO catalogue);
+score_scenario() returns one scenario in the same JSON schema the LLM
+produces, so the AI service can answer from the rules and treat the model
+as an optional enrichment pass. MITIGATION_TABLE is the mission model
+behind server.calculate_mitigation_requirements; mitigation_requirements()
+evaluates it on arrays for processes that do not import server.py. Only
+strategies the mission model makes available can be recommended.
+"""
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+
+SECONDS_PER_YEAR = 365.25 * 24 * 3600
+EARTH_RADIUS_M = 6_371_000.0
+# Shortest warning time scored, so required delta-v stays finite
+MIN_WARNING_YEARS = 0.01
+
+# Section names of the analysis schema and the matching calculate_mitigation_requirements keys
+STRATEGIES = ("kineticImpactor", "gravityTractor", "nuclearDevice")
+REQUIREMENT_KEYS = ("kinetic_impactor", "gravity_tractor", "nuclear_deflection")
+STRATEGY_NAMES = ("Kinetic Impactor", "Gravity Tractor", "Nuclear Device")
+
+# Mission model per calculate_mitigation_requirements key. success_probability lists
+# (lead time in years from which it applies, probability) steps; the first step is the
+# shortest lead time at which the strategy is available at all.
+MITIGATION_TABLE = {
+    "kinetic_impactor": {
+        "success_probability": ((5.0, 0.6), (10.0, 0.8)),
+        "velocity_change": 0.1,  # m/s (very rough estimate)
+        "cost_estimate": 500.0,  # Million USD
+        "description": "High-speed spacecraft impacts asteroid to change trajectory",
+    },
+    "gravity_tractor": {
+        "success_probability": ((10.0, 0.9),),
+        "velocity_change": 0.01,  # Very small but precise
+        "cost_estimate": 1000.0,
+        "description": "Spacecraft uses gravitational attraction to slowly alter asteroid path",
+    },
+    "nuclear_deflection": {  # Last resort
+        "success_probability": ((1.0, 0.4), (5.0, 0.7)),
+        "velocity_change": 1.0,  # Significant change possible
+        "cost_estimate": 2000.0,
+        "description": "Nuclear device detonation to fragment or deflect asteroid",
+    },
+}
+
+FAVORABILITY = ("low", "medium", "medium-high", "high")
+URGENCY = ("low", "medium", "high")
+DIAMETER_BANDS = ("<200m", "200-500m", ">500m")
+# Upper diameter bound (m) of each band but the last
+DIAMETER_BAND_EDGES = (200.0, 500.0)
+
+# Warning time (years) of the short and long anchor of each diameter band
+ANCHOR_YEARS = np.array([
+    [2.0, 5.0],
+    [5.0, 10.0],
+    [5.0, 10.0],
+])
+
+# [band, anchor (short, long), strategy] -> (favorability index, success low %, success high %).
+# Ranges the prompt leaves open ("low", "medium" without numbers) are filled in conservatively.
+_L, _M, _MH, _H = range(4)
+RULES = np.array([
+    [  # < 200 m
+        [(_M, 80, 90), (_L, 5, 20), (_M, 80, 90)],        # < 2 years
+        [(_H, 85, 95), (_M, 70, 85), (_L, 90, 98)],       # > 5 years
+    ],
+    [  # 200-500 m
+        [(_M, 80, 88), (_L, 5, 15), (_H, 94, 98)],        # < 5 years
+        [(_H, 85, 92), (_MH, 75, 85), (_M, 92, 95)],      # > 10 years
+    ],
+    [  # > 500 m
+        [(_M, 70, 80), (_L, 0, 5), (_H, 95, 98)],         # < 5 years
+        [(_M, 75, 85), (_L, 10, 25), (_H, 90, 95)],       # > 10 years
+    ],
+], dtype=np.float64)
+
+STRATEGY_NOTES = {
+    "kineticImpactor": {
+        "pros": ["Flight-proven technique (NASA DART, 2022)", "No nuclear materials or treaty issues", "Fast to build with existing launch vehicles"],
+        "cons": ["Single impulse with uncertain momentum enhancement (beta)", "Can disrupt rubble-pile bodies", "Needs precise terminal guidance"],
+    },
+    "gravityTractor": {
+        "pros": ["Precise, controllable deflection", "No contact with the body, so no fragmentation risk", "Works regardless of composition or spin"],
+        "cons": ["Very small thrust; needs many years of station keeping", "Impractical for large masses", "Long, expensive mission operations"],
+    },
+    "nuclearDevice": {
+        "pros": ["Largest momentum change per launched kilogram", "Only rapid option for large bodies", "Stand-off detonation limits fragmentation"],
+        "cons": ["Fragmentation risk if detonated too close", "Legal and political constraints (Outer Space Treaty)", "Never tested against a real body"],
+    },
+}
+
+SOURCES = [
+    {"title": "NASA Double Asteroid Redirection Test (DART)", "type": "mission", "url": "https://science.nasa.gov/mission/dart/"},
+    {"title": "Lu & Love (2005), Gravitational tractor for towing asteroids, Nature 438", "type": "paper", "url": "https://www.nature.com/articles/438177a"},
+    {"title": "National Research Council (2010), Defending Planet Earth: Near-Earth Object Surveys and Hazard Mitigation Strategies", "type": "report", "url": "https://nap.nationalacademies.org/catalog/12842"},
+    {"title": "NASA Planetary Defense Coordination Office", "type": "agency", "url": "https://science.nasa.gov/planetary-defense/"},
+]
+
+
+def required_delta_v(warning_years) -> np.ndarray:
+    """Delta-v (m/s) that shifts the arrival point by one Earth radius over the warning time"""
+    warning = np.maximum(np.asarray(warning_years, dtype=np.float64), MIN_WARNING_YEARS)
+    return EARTH_RADIUS_M / (warning * SECONDS_PER_YEAR)
+
+
+def mitigation_requirements(lead_time) -> Dict[str, Dict[str, np.ndarray]]:
+    """MITIGATION_TABLE evaluated for an array of lead times (availability instead of omission)"""
+    lead_time = np.asarray(lead_time, dtype=np.float64)
+    ones = np.ones_like(lead_time)
+    requirements = {}
+    for key, row in MITIGATION_TABLE.items():
+        steps = row["success_probability"]
+        success = np.full_like(lead_time, steps[0][1])
+        for threshold, probability in steps[1:]:
+            success = np.where(lead_time >= threshold, probability, success)
+        requirements[key] = {
+            "available": lead_time >= steps[0][0],
+            "success_probability": success,
+            "velocity_change": row["velocity_change"] * ones,
+            "cost_estimate": row["cost_estimate"] * ones,
+        }
+    return requirements
+
+
+def recommend(favorability, success_low, success_high, available=None) -> np.ndarray:
+    """Index of the recommended strategy along the last axis.
+
+    Best favorability wins; ties go to the higher mid-range success.
+    Strategies marked unavailable are skipped unless none is available.
+    """
+    rank = np.asarray(favorability) * 1000.0 + (np.asarray(success_low) + np.asarray(success_high)) / 2
+    if available is not None:
+        available = np.asarray(available, dtype=bool)
+        feasible = available | ~available.any(axis=-1, keepdims=True)
+        rank = np.where(feasible, rank, -np.inf)
+    return np.argmax(rank, axis=-1)
+
+
+def score_batch(diameter, warning_years) -> Dict[str, Any]:
+    """Score arrays of scenarios.
+
+    Returns band and urgency indices, required delta-v, the index of the
+    recommended strategy (among those mitigation_requirements() makes
+    available) and, per strategy, availability, favorability index and
+    success range (percent) arrays.
+    """
+    diameter = np.asarray(diameter, dtype=np.float64)
+    warning = np.maximum(np.asarray(warning_years, dtype=np.float64), MIN_WARNING_YEARS)
+    diameter, warning = np.broadcast_arrays(diameter, warning)
+
+    band = np.searchsorted(DIAMETER_BAND_EDGES, diameter, side="right")
+    short_years, long_years = ANCHOR_YEARS[band, 0], ANCHOR_YEARS[band, 1]
+    position = np.clip((warning - short_years) / (long_years - short_years), 0.0, 1.0)
+
+    short_rules, long_rules = RULES[band, 0], RULES[band, 1]
+    weight = position[..., np.newaxis]
+    success_low = short_rules[..., 1] + weight * (long_rules[..., 1] - short_rules[..., 1])
+    success_high = short_rules[..., 2] + weight * (long_rules[..., 2] - short_rules[..., 2])
+    favorability = np.where(weight < 0.5, short_rules[..., 0], long_rules[..., 0]).astype(np.int8)
+
+    urgency = np.where(warning < 2, 2, np.where(warning <= 5, 1, 0)).astype(np.int8)
+
+    requirements = mitigation_requirements(warning)
+    available = np.stack([requirements[key]["available"] for key in REQUIREMENT_KEYS], axis=-1)
+    recommended = recommend(favorability, success_low, success_high, available)
+
+    return {
+        "band": band,
+        "urgency": urgency,
+        "warning_years": warning,
+        "required_delta_v": required_delta_v(warning),
+        "recommended": recommended,
+        "strategies": {
+            name: {
+                "available": available[..., index],
+                "favorability": favorability[..., index],
+                "success_low": success_low[..., index],
+                "success_high": success_high[..., index],
+            }
+            for index, name in enumerate(STRATEGIES)
+        },
+    }
+
+
+def _requirement_dict(requirement: Any) -> Optional[Dict[str, Any]]:
+    if requirement is None:
+        return None
+    if hasattr(requirement, "model_dump"):
+        requirement = requirement.model_dump()
+    return {
+        name: (value.item() if isinstance(value, np.generic) else value)
+        for name, value in dict(requirement).items()
+    }
+
+
+def _format_range(low: float, high: float) -> str:
+    return f"{low:.0f}-{high:.0f}%"
+
+
+def score_scenario(
+    diameter: float,
+    warning_years: float,
+    requirements: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, Any]:
+    """One scenario in the defense-analysis JSON schema.
+
+    requirements is the output of calculate_mitigation_requirements (keyed by
+    strategy type; strategies it omits are not feasible for the lead time).
+    Without it, mitigation_requirements() is used.
+    """
+    scores = score_batch([diameter], [warning_years])
+    warning = float(scores["warning_years"][0])
+    delta_v = float(scores["required_delta_v"][0])
+    band = DIAMETER_BANDS[int(scores["band"][0])]
+    urgency = URGENCY[int(scores["urgency"][0])]
+
+    if requirements is None:
+        computed = mitigation_requirements([warning])
+        requirements = {
+            key: {name: values[0] for name, values in columns.items() if name != "available"}
+            for key, columns in computed.items()
+            if columns["available"][0]
+        }
+
+    analysis: Dict[str, Any] = {}
+    available = []
+    for index, name in enumerate(STRATEGIES):
+        strategy = scores["strategies"][name]
+        favorability = FAVORABILITY[int(strategy["favorability"][0])]
+        success_rate = _format_range(float(strategy["success_low"][0]), float(strategy["success_high"][0]))
+        requirement = _requirement_dict(requirements.get(REQUIREMENT_KEYS[index]))
+        available.append(requirement is not None)
+
+        reasoning = (
+            f"A {diameter:g} m body falls in the {band} band; with {warning:g} years of warning "
+            f"the rule table rates the {STRATEGY_NAMES[index].lower()} {favorability} ({success_rate})."
+        )
+        cons = list(STRATEGY_NOTES[name]["cons"])
+        if requirement is None:
+            cons.insert(0, f"Not feasible with {warning:g} years of lead time under the mission model")
+        else:
+            capacity = requirement.get("velocity_change", 0.0)
+            reasoning += (
+                f" A one-Earth-radius shift needs about {delta_v:.3g} m/s of delta-v; "
+                f"the mission model delivers {capacity:g} m/s."
+            )
+            if capacity < delta_v:
+                cons.insert(0, f"Nominal delta-v ({capacity:g} m/s) is below the {delta_v:.3g} m/s required")
+
+        analysis[name] = {
+            "favorability": favorability,
+            "success_rate": success_rate,
+            "analysis": f"{STRATEGY_NAMES[index]}: {favorability} favorability for a {band} body with {warning:g} years of warning.",
+            "reasoning": reasoning,
+            "pros": list(STRATEGY_NOTES[name]["pros"]),
+            "cons": cons,
+            "requirements": requirement,
+        }
+
+    analysis.update({
+        "recommendedStrategy": STRATEGIES[int(recommend(
+            [scores["strategies"][name]["favorability"][0] for name in STRATEGIES],
+            [scores["strategies"][name]["success_low"][0] for name in STRATEGIES],
+            [scores["strategies"][name]["success_high"][0] for name in STRATEGIES],
+            available,
+        ))],
+        "urgency": urgency,
+        "warningTimeYears": warning,
+        "requiredDeltaV_mps": delta_v,
+        "sources": list(SOURCES),
+        "method": "rules",
+    })
+    return analysis
@@ -0,0 +1,276 @@
+"""B-plane deflection engine.
+
+A deflection is an impulsive delta-v applied lead_time years before the
+encounter, in the asteroid's radial / transverse / normal (RTN) frame. The
+deflected state is propagated forward to the nominal encounter epoch with
+Lagrange f and g coefficients (two-body, Sun only; Kepler's equation is
+solved by Newton iteration over whole arrays), and the Earth-relative
+position is projected onto the target plane ("B-plane") perpendicular to the
+geocentric approach velocity. The projection removes the along-track timing
+shift, so one propagation per option gives the miss distance; the body
+misses when it clears Earth's gravitationally focused capture radius.
+
+Every step is array arithmetic over all options, so sweeps over delta-v
+magnitude, direction and lead time (sweep_grid) cost one NumPy pass.
+Earth's own gravity is ignored until the encounter, which is the usual
+assumption for deflections applied well before the final approach.
+"""
+import os
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+from scipy.special import ndtr
+
+import orbit_propagation
+
+# Gaussian gravitational constant squared: GM of the Sun in AU^3/day^2
+MU_SUN = 0.01720209895 ** 2
+SECONDS_PER_DAY = 86400.0
+KM_S_PER_AU_DAY = orbit_propagation.AU_KM / SECONDS_PER_DAY
+EARTH_RADIUS_KM = 6371.0
+EARTH_MU_KM3_S2 = 398600.4418
+
+# Geocentric approach speeds (km/s) used when building an impactor from a scenario
+MIN_V_INF_KMS = 1.0
+MAX_V_INF_KMS = 30.0
+# Geocentric approach direction of a scenario impactor in Earth's RTN frame:
+# from outside Earth's orbit, overtaken by Earth, and well out of the ecliptic
+DEFAULT_APPROACH_RTN = (0.5, -0.5, np.sqrt(0.5))
+
+# 1-sigma B-plane position uncertainty (km) used for impact probabilities
+BPLANE_SIGMA_KM = float(os.environ.get("DEFLECTION_BPLANE_SIGMA_KM", "1000"))
+
+DIRECTIONS = {
+    "along_track": (0.0, 1.0, 0.0),
+    "retrograde": (0.0, -1.0, 0.0),
+    "radial": (1.0, 0.0, 0.0),
+    "anti_radial": (-1.0, 0.0, 0.0),
+    "normal": (0.0, 0.0, 1.0),
+    "anti_normal": (0.0, 0.0, -1.0),
+}
+
+KEPLER_TOLERANCE = orbit_propagation.KEPLER_TOLERANCE
+KEPLER_MAX_ITERATIONS = orbit_propagation.KEPLER_MAX_ITERATIONS
+
+Direction = Union[str, Sequence[float]]
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def rtn_basis(r: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """(..., 3, 3) rows: radial, transverse and orbit-normal unit vectors"""
+    radial = _unit(r)
+    normal = _unit(np.cross(r, v))
+    transverse = np.cross(normal, radial)
+    return np.stack([radial, transverse, normal], axis=-2)
+
+
+def direction_vectors(directions: Iterable[Direction]) -> np.ndarray:
+    """(D, 3) RTN unit vectors for direction names or [radial, transverse, normal] triples"""
+    vectors = []
+    for direction in directions:
+        if isinstance(direction, str):
+            if direction not in DIRECTIONS:
+                raise ValueError(f"Unknown direction {direction!r}; expected one of {', '.join(DIRECTIONS)}")
+            vectors.append(DIRECTIONS[direction])
+            continue
+        vector = np.asarray(direction, dtype=np.float64)
+        if vector.shape != (3,) or not np.all(np.isfinite(vector)) or not np.any(vector):
+            raise ValueError(f"Direction {direction!r} is not a non-zero [radial, transverse, normal] vector")
+        vectors.append(vector / np.linalg.norm(vector))
+    if not vectors:
+        raise ValueError("At least one direction is required")
+    return np.asarray(vectors, dtype=np.float64)
+
+
+def propagate_states(r0: np.ndarray, v0: np.ndarray, dt) -> Tuple[np.ndarray, np.ndarray]:
+    """Two-body heliocentric states after dt days (may be negative), for elliptic orbits.
+
+    r0, v0 are (..., 3) in AU and AU/day; dt broadcasts against their leading shape.
+    """
+    r0 = np.asarray(r0, dtype=np.float64)
+    v0 = np.asarray(v0, dtype=np.float64)
+    dt = np.asarray(dt, dtype=np.float64)
+
+    r0_norm = np.linalg.norm(r0, axis=-1)
+    alpha = 2.0 / r0_norm - np.einsum("...i,...i->...", v0, v0) / MU_SUN  # 1/a
+    a = 1.0 / alpha
+    mean_motion = np.sqrt(MU_SUN * alpha ** 3)
+    # Coefficients of the Kepler equation in the eccentric anomaly change x
+    c = 1.0 - r0_norm * alpha
+    s = np.einsum("...i,...i->...", r0, v0) / np.sqrt(MU_SUN * a)
+    M = mean_motion * dt
+
+    x = np.array(M, dtype=np.float64, copy=True)
+    for _ in range(KEPLER_MAX_ITERATIONS):
+        sin_x, cos_x = np.sin(x), np.cos(x)
+        step = (x - c * sin_x + s * (1.0 - cos_x) - M) / (1.0 - c * cos_x + s * sin_x)
+        x -= step
+        if np.all(np.abs(step) < KEPLER_TOLERANCE):
+            break
+
+    sin_x, cos_x = np.sin(x), np.cos(x)
+    r_norm = a + (r0_norm - a) * cos_x + s * a * sin_x
+    f = 1.0 - (a / r0_norm) * (1.0 - cos_x)
+    g = dt - (x - sin_x) / mean_motion
+    f_dot = -np.sqrt(MU_SUN * a) * sin_x / (r_norm * r0_norm)
+    g_dot = 1.0 - (a / r_norm) * (1.0 - cos_x)
+
+    r = f[..., np.newaxis] * r0 + g[..., np.newaxis] * v0
+    v = f_dot[..., np.newaxis] * r0 + g_dot[..., np.newaxis] * v0
+    return r, v
+
+
+def earth_state(epoch: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Earth's heliocentric position (AU) and velocity (AU/day) at one epoch"""
+    r, v = orbit_propagation.states(orbit_propagation.EARTH_ELEMENTS, [epoch])
+    return r[0, 0], v[0, 0]
+
+
+def approach_speed(impact_velocity_mps: float) -> float:
+    """Geocentric speed at infinity (km/s) of a body hitting Earth at impact_velocity_mps"""
+    v_impact = impact_velocity_mps / 1000.0
+    v_escape_sq = 2 * EARTH_MU_KM3_S2 / EARTH_RADIUS_KM
+    v_inf = np.sqrt(max(v_impact * v_impact - v_escape_sq, 0.0))
+    return float(np.clip(v_inf, MIN_V_INF_KMS, MAX_V_INF_KMS))
+
+
+def impactor_state(
+    epoch: float,
+    impact_velocity_mps: float,
+    approach_rtn: Sequence[float] = DEFAULT_APPROACH_RTN,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Heliocentric state of a body on a collision course, at Earth's centre at epoch"""
+    r_earth, v_earth = earth_state(epoch)
+    approach = direction_vectors([approach_rtn])[0] @ rtn_basis(r_earth, v_earth)
+    v_inf = approach_speed(impact_velocity_mps) / KM_S_PER_AU_DAY
+    return r_earth.copy(), v_earth + v_inf * approach
+
+
+def capture_radius_km(v_inf_kms) -> np.ndarray:
+    """Impact parameter (km) below which gravitational focusing brings a body down"""
+    v_inf_kms = np.asarray(v_inf_kms, dtype=np.float64)
+    return EARTH_RADIUS_KM * np.sqrt(1.0 + 2 * EARTH_MU_KM3_S2 / (EARTH_RADIUS_KM * v_inf_kms ** 2))
+
+
+def impact_probability(b_km, capture_km, sigma_km: float = BPLANE_SIGMA_KM) -> np.ndarray:
+    """Chance of falling inside the capture radius given a Gaussian B-plane error along b"""
+    b_km = np.asarray(b_km, dtype=np.float64)
+    if sigma_km <= 0:
+        return (b_km < capture_km).astype(np.float64)
+    return ndtr((capture_km - b_km) / sigma_km) - ndtr((-capture_km - b_km) / sigma_km)
+
+
+def b_plane(
+    r: np.ndarray, v: np.ndarray, r_earth: np.ndarray, v_earth: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Target-plane coordinates (km) of heliocentric states at the encounter epoch.
+
+    zeta points against the projection of Earth's velocity (it measures the
+    timing error of the encounter), xi completes the right-handed frame with
+    the approach direction (it measures the geometric miss).
+    """
+    relative = (r - r_earth) * orbit_propagation.AU_KM
+    u = (v - v_earth) * KM_S_PER_AU_DAY
+    v_inf = np.linalg.norm(u, axis=-1)
+    eta = u / v_inf[..., np.newaxis]
+
+    b = relative - np.einsum("...i,...i->...", relative, eta)[..., np.newaxis] * eta
+    earth_velocity = np.broadcast_to(v_earth, eta.shape)
+    zeta_axis = -(earth_velocity - np.einsum("...i,...i->...", earth_velocity, eta)[..., np.newaxis] * eta)
+    zeta_axis = _unit(zeta_axis)
+    xi_axis = np.cross(eta, zeta_axis)
+
+    return {
+        "xi": np.einsum("...i,...i->...", b, xi_axis),
+        "zeta": np.einsum("...i,...i->...", b, zeta_axis),
+        "b": np.linalg.norm(b, axis=-1),
+        "v_inf": v_inf,
+    }
+
+
+def sweep_grid(
+    delta_v_mps: Sequence[float], directions: Iterable[Direction], lead_time_years: Sequence[float]
+) -> Dict[str, np.ndarray]:
+    """Flattened options for every (delta-v, direction, lead time) combination"""
+    delta_v = np.asarray(delta_v_mps, dtype=np.float64)
+    lead_time = np.asarray(lead_time_years, dtype=np.float64)
+    vectors = direction_vectors(directions)
+    dv_index, direction_index, lead_index = np.meshgrid(
+        np.arange(delta_v.size), np.arange(len(vectors)), np.arange(lead_time.size), indexing="ij"
+    )
+    return {
+        "delta_v": delta_v[dv_index.ravel()],
+        "direction": direction_index.ravel(),
+        "direction_rtn": vectors[direction_index.ravel()],
+        "lead_time": lead_time[lead_index.ravel()],
+        "lead_index": lead_index.ravel(),
+    }
+
+
+def simulate(
+    r_encounter: np.ndarray,
+    v_encounter: np.ndarray,
+    epoch: float,
+    delta_v_mps,
+    direction_rtn,
+    lead_time_years,
+    sigma_km: float = BPLANE_SIGMA_KM,
+) -> Dict[str, np.ndarray]:
+    """B-plane outcome of deflection options for one body.
+
+    r_encounter, v_encounter: the undeflected heliocentric state at the
+    encounter epoch (days since J2000). delta_v_mps (K,), direction_rtn
+    (K, 3) and lead_time_years (K,) describe the options; scalars broadcast.
+    Returns xi/zeta/b (km), v_inf (km/s), capture radius (km), impact
+    probability and a missed flag per option, plus the undeflected b.
+    """
+    delta_v, lead_time = np.broadcast_arrays(
+        np.asarray(delta_v_mps, dtype=np.float64), np.asarray(lead_time_years, dtype=np.float64)
+    )
+    direction_rtn = np.broadcast_to(np.asarray(direction_rtn, dtype=np.float64), delta_v.shape + (3,))
+    if np.any(lead_time <= 0):
+        raise ValueError("Lead times must be positive")
+
+    r_earth, v_earth = earth_state(epoch)
+    lead_days = lead_time * orbit_propagation.DAYS_PER_YEAR
+
+    # State at the deflection epoch: one backward propagation per distinct lead time
+    unique_days, inverse = np.unique(lead_days, return_inverse=True)
+    r_unique, v_unique = propagate_states(
+        np.broadcast_to(r_encounter, unique_days.shape + (3,)),
+        np.broadcast_to(v_encounter, unique_days.shape + (3,)),
+        -unique_days,
+    )
+    basis = rtn_basis(r_unique, v_unique)
+    inverse = inverse.reshape(lead_days.shape)
+    kick = np.einsum("...i,...ij->...j", direction_rtn, basis[inverse])
+    v_deflected = v_unique[inverse] + (delta_v / 1000.0 / KM_S_PER_AU_DAY)[..., np.newaxis] * kick
+
+    r_final, v_final = propagate_states(r_unique[inverse], v_deflected, lead_days)
+    plane = b_plane(r_final, v_final, r_earth, v_earth)
+    nominal = b_plane(np.asarray(r_encounter), np.asarray(v_encounter), r_earth, v_earth)
+
+    capture = capture_radius_km(plane["v_inf"])
+    probability = impact_probability(plane["b"], capture, sigma_km)
+    return {
+        **plane,
+        "capture_radius": capture,
+        "impact_probability": probability,
+        "missed": plane["b"] > capture,
+        "nominal_b": float(nominal["b"]),
+        "nominal_impact_probability": float(
+            impact_probability(nominal["b"], capture_radius_km(nominal["v_inf"]), sigma_km)
+        ),
+    }
+
+
+def minimum_delta_v(
+    delta_v: np.ndarray, missed: np.ndarray, groups: np.ndarray, group_count: int
+) -> List[Any]:
+    """Smallest swept delta-v that clears Earth in each option group (None if none does)"""
+    best = np.full(group_count, np.inf)
+    np.minimum.at(best, groups[missed], delta_v[missed])
+    return [float(value) if np.isfinite(value) else None for value in best]
@@ -0,0 +1,141 @@
+"""Query planner checks for the query shapes the API issues.
+
+Each shape is run through explain() and its winning plan is searched for
+collection scans (COLLSCAN) and blocking in-memory sorts (SORT), which mean
+an index is missing or not being used. The check runs at startup
+(QUERY_PLAN_CHECK=warn|strict|off; in the background unless strict) and from
+the command line:
+
+    python index_check.py
+
+which creates the indexes, explains every shape and exits non-zero when any
+unexpected COLLSCAN or SORT is found.
+"""
+import asyncio
+import logging
+import os
+import sys
+from typing import Any, Dict, Iterable, List
+
+from pymongo.errors import ConnectionFailure
+
+logger = logging.getLogger("server.index_check")
+
+QUERY_PLAN_CHECK = os.environ.get("QUERY_PLAN_CHECK", "warn").lower()
+
+FLAGGED_STAGES = ("COLLSCAN", "SORT")
+
+
+def plan_stages(plan: Any) -> List[str]:
+    """Every stage name in an explain() plan tree, outermost first"""
+    stages: List[str] = []
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            stages.append(plan["stage"])
+        for key in ("queryPlan", "inputStage", "inputStages", "shards", "winningPlan"):
+            if key in plan:
+                stages.extend(plan_stages(plan[key]))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def plan_indexes(plan: Any) -> List[str]:
+    """Names of the indexes used by an explain() plan tree"""
+    names: List[str] = []
+    if isinstance(plan, dict):
+        if plan.get("indexName"):
+            names.append(plan["indexName"])
+        for value in plan.values():
+            if isinstance(value, (dict, list)):
+                names.extend(plan_indexes(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            names.extend(plan_indexes(item))
+    return names
+
+
+async def explain_shape(shape: Dict[str, Any]) -> Dict[str, Any]:
+    """Explain one query shape and report the stages it would use"""
+    cursor = shape["collection"].find(shape.get("filter", {}), shape.get("projection"))
+    if shape.get("sort"):
+        cursor = cursor.sort(shape["sort"])
+    if shape.get("limit"):
+        cursor = cursor.limit(shape["limit"])
+
+    explain = await cursor.explain()
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    stages = plan_stages(winning_plan)
+    allowed = set(shape.get("allow", ()))
+    issues = [stage for stage in FLAGGED_STAGES if stage in stages and stage not in allowed]
+
+    report = {
+        "name": shape["name"],
+        "stages": stages,
+        "indexes": sorted(set(plan_indexes(winning_plan))),
+        "issues": issues,
+    }
+    execution = explain.get("executionStats")
+    if execution:
+        report["keys_examined"] = execution.get("totalKeysExamined")
+        report["docs_examined"] = execution.get("totalDocsExamined")
+    return report
+
+
+async def check_query_plans(shapes: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Explain every shape; shapes that fail to explain are reported with an error.
+
+    The check stops at the first connection failure: with the server unreachable
+    every further explain() would wait out server selection again.
+    """
+    reports = []
+    for shape in shapes:
+        try:
+            reports.append(await explain_shape(shape))
+        except ConnectionFailure as e:
+            reports.append({
+                "name": shape["name"], "stages": [], "indexes": [], "issues": [],
+                "error": f"database unreachable, remaining shapes skipped: {e}",
+            })
+            break
+        except Exception as e:
+            reports.append({"name": shape["name"], "stages": [], "indexes": [], "issues": [], "error": str(e)})
+    return reports
+
+
+def log_reports(reports: List[Dict[str, Any]]) -> int:
+    """Log each report and return the number of shapes with issues"""
+    problems = 0
+    for report in reports:
+        if report.get("error"):
+            logger.warning(f"Query plan check for {report['name']} failed: {report['error']}")
+        elif report["issues"]:
+            problems += 1
+            logger.warning(
+                f"Query shape {report['name']} uses {', '.join(report['issues'])} "
+                f"(plan: {' <- '.join(report['stages'])})"
+            )
+        else:
+            logger.info(f"Query shape {report['name']} uses indexes {', '.join(report['indexes']) or '-'}")
+    return problems
+
+
+async def _main() -> int:
+    import server
+
+    if server.db is None:
+        print("Database not available", file=sys.stderr)
+        return 2
+    await server.create_database_indexes()
+    reports = await check_query_plans(server.api_query_shapes())
+    for report in reports:
+        status = "ERROR" if report.get("error") else ("FAIL" if report["issues"] else "ok")
+        detail = report.get("error") or " <- ".join(report["stages"])
+        print(f"{status:5} {report['name']}: {detail}")
+    return 1 if any(report["issues"] or report.get("error") for report in reports) else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(_main()))
@@ -0,0 +1,188 @@
+"""In-process request instrumentation for the API router.
+
+Per-stage timings go into fixed-bucket histograms that are rendered in the
+Prometheus text exposition format by /api/metrics. Debug traces are emitted
+for a configurable fraction of requests only (DEBUG_TRACE_SAMPLE_RATE).
+"""
+import bisect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple, Optional, Callable
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TRACE_SAMPLE_RATE = float(os.environ.get("DEBUG_TRACE_SAMPLE_RATE", "0.0"))
+
+trace_logger = logging.getLogger("server.trace")
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # bucket counts, +Inf count, sum
+                series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in sorted(self._series.items())]
+        for labels, counts, total, value_sum in snapshot:
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {total}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {value_sum}")
+            lines.append(f"{self.name}_count{{{label_text}}} {total}")
+        return "\n".join(lines)
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            lines.append(f"{self.name}{{{label_text}}} {value}" if label_text else f"{self.name} {value}")
+        return "\n".join(lines)
+
+
+class Gauge(Counter):
+    """Point-in-time value keyed by a tuple of label values"""
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> str:
+        return super().render().replace(f"# TYPE {self.name} counter", f"# TYPE {self.name} gauge", 1)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY: Dict[str, object] = {}
+
+
+def register(metric):
+    """Add a metric to the registry rendered by /api/metrics and return it"""
+    REGISTRY[metric.name] = metric
+    return metric
+
+
+request_duration = register(Histogram(
+    "api_request_duration_seconds", "Time spent handling API requests", ("method", "route", "status")
+))
+stage_duration = register(Histogram(
+    "api_stage_duration_seconds", "Time spent in individual request stages", ("route", "stage")
+))
+traces_emitted = register(Counter("api_debug_traces_total", "Debug traces emitted for sampled requests", ("route",)))
+
+
+def render_metrics() -> str:
+    """Render every registered metric in Prometheus text format"""
+    return "\n".join(metric.render() for metric in REGISTRY.values()) + "\n"
+
+
+class RequestTrace:
+    """Per-request stage timer; only sampled traces are logged"""
+
+    def __init__(self, route: str, sampled: Optional[bool] = None):
+        self.route = route
+        self.sampled = random.random() < TRACE_SAMPLE_RATE if sampled is None else sampled
+        self.stages: Dict[str, float] = {}
+        self.fields: Dict[str, object] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stage_duration.observe(elapsed, self.route, name)
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def debug(self, **fields):
+        """Attach debug fields; they are only materialized when the request is sampled"""
+        if self.sampled:
+            self.fields.update(fields)
+
+    def emit(self):
+        if not self.sampled:
+            return
+        traces_emitted.inc(self.route)
+        trace_logger.info(json.dumps({
+            "route": self.route,
+            "stages_ms": {name: round(value * 1000, 3) for name, value in self.stages.items()},
+            **self.fields,
+        }, default=str))
+
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute that records total handling time per route in request_duration"""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route_path = self.path
+
+        async def instrumented_handler(request: Request) -> Response:
+            start = time.perf_counter()
+            status = "500"
+            try:
+                response = await handler(request)
+                status = str(response.status_code)
+                return response
+            except Exception as e:
+                status = str(getattr(e, "status_code", 500))
+                raise
+            finally:
+                request_duration.observe(time.perf_counter() - start, request.method, route_path, status)
+
+        return instrumented_handler
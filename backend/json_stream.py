@@ -0,0 +1,108 @@
+"""Incremental parsing of JSON that arrives in pieces.
+
+SectionParser is fed model output chunk by chunk and reports every value
+stored under one of the watched keys (e.g. "kineticImpactor") as soon as its
+closing brace or bracket arrives, at any nesting depth. It only tracks
+structure (strings, escapes, nesting) while scanning, so each chunk costs
+time proportional to its own length. Text outside the top-level JSON value,
+such as a ```json fence, is skipped.
+"""
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+
+class _Frame:
+    """One open object or array"""
+
+    __slots__ = ("is_object", "expect_key", "key", "section", "start")
+
+    def __init__(self, is_object: bool, section: Optional[str], start: int):
+        self.is_object = is_object
+        # Objects alternate between expecting a key and expecting a value
+        self.expect_key = is_object
+        self.key: Optional[str] = None
+        # Name of the watched key this container is the value of, if any
+        self.section = section
+        self.start = start
+
+
+class SectionParser:
+    """Emit (key, value) for watched keys whose object/array value has closed"""
+
+    def __init__(self, sections: Iterable[str]):
+        self.sections = frozenset(sections)
+        self._text = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._done = False
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far"""
+        return self._text
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume one chunk; returns the sections completed by it, in order"""
+        if not chunk:
+            return []
+        self._text += chunk
+        completed: List[Tuple[str, Any]] = []
+        text = self._text
+        i = self._pos
+        end = len(text)
+        stack = self._stack
+
+        while i < end and not self._done:
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    frame = stack[-1] if stack else None
+                    if frame is not None and frame.is_object and frame.expect_key:
+                        try:
+                            frame.key = json.loads(text[self._string_start:i + 1])
+                        except ValueError:
+                            frame.key = None
+                i += 1
+                continue
+
+            if char == '"':
+                if stack:
+                    self._in_string = True
+                    self._string_start = i
+            elif char == "{" or char == "[":
+                section = None
+                if stack:
+                    parent = stack[-1]
+                    if parent.is_object and not parent.expect_key and parent.key in self.sections:
+                        section = parent.key
+                stack.append(_Frame(char == "{", section, i))
+            elif char == "}" or char == "]":
+                if stack:
+                    frame = stack.pop()
+                    if frame.section is not None:
+                        try:
+                            completed.append((frame.section, json.loads(text[frame.start:i + 1])))
+                        except ValueError:
+                            pass
+                    if not stack:
+                        # The top-level value is complete; ignore trailing fences
+                        self._done = True
+            elif char == ":":
+                if stack and stack[-1].is_object:
+                    stack[-1].expect_key = False
+            elif char == ",":
+                if stack and stack[-1].is_object:
+                    stack[-1].expect_key = True
+                    stack[-1].key = None
+            i += 1
+
+        self._pos = i
+        return completed
@@ -0,0 +1,246 @@
+"""Mitigation trade-space evaluation.
+
+Every combination of strategy x lead time x spacecraft mass x spacecraft
+count becomes one grid point. Per point, a mission model turns the
+spacecraft into a delta-v and a cost:
+
+- kinetic impactor: momentum beta * m * v_rel per spacecraft hitting the body;
+- gravity tractor: G * m / r^2 towing acceleration over the towing period,
+  applied at its midpoint;
+- nuclear standoff: yield (specific yield x payload mass) times a momentum
+  coupling per kiloton.
+
+The delta-v goes through the B-plane deflection engine (deflection.py);
+each spacecraft works independently with the strategy's reliability, so
+the success probability is the binomial mixture over how many of them
+deliver, each term weighted by the chance the resulting deflection clears
+Earth. pareto_front() then keeps the points no other point beats on cost,
+miss distance and success probability at once.
+
+evaluate_chunk() is a top-level function over plain arrays so that large
+grids can be split across the shared process pool (monte_carlo.get_executor).
+The mission constants are order-of-magnitude figures from public mission
+studies, not design values.
+"""
+from bisect import bisect_right
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from scipy.stats import binom
+
+import deflection
+
+G = 6.674e-11
+SECONDS_PER_YEAR = 365.25 * 24 * 3600
+
+# Grid points per evaluate_chunk call, in-process and per process-pool task. Small
+# chunks keep the per-term arrays in cache: a 200k-point grid took 0.7 s in 20k-point
+# chunks but 3.3 s in a single call (one core)
+TRADE_CHUNK_SIZE = 20_000
+
+STRATEGIES = ("kinetic_impactor", "gravity_tractor", "nuclear_deflection")
+
+# Per strategy: transit (years from decision to arrival), per-spacecraft reliability,
+# cost = mission + count * (spacecraft + per_kg * mass) [+ per tow year], millions USD
+MISSION_MODELS = {
+    "kinetic_impactor": {
+        "transit_years": 1.0,
+        "reliability": 0.9,
+        "mission_cost": 300.0,
+        "spacecraft_cost": 150.0,
+        "cost_per_kg": 0.05,
+        "beta": 2.0,              # momentum enhancement (DART measured ~3.6)
+        "impact_speed": 10_000.0,  # m/s relative to the body
+    },
+    "gravity_tractor": {
+        "transit_years": 2.0,
+        "reliability": 0.85,
+        "mission_cost": 500.0,
+        "spacecraft_cost": 300.0,
+        "cost_per_kg": 0.05,
+        "cost_per_tow_year": 20.0,
+        "max_tow_years": 10.0,
+        "hover_radii": 2.0,       # hover distance from the centre, in body radii
+    },
+    "nuclear_deflection": {
+        "transit_years": 1.0,
+        "reliability": 0.8,
+        "mission_cost": 800.0,
+        "spacecraft_cost": 400.0,
+        "cost_per_kg": 0.05,
+        "kilotons_per_kg": 2.0,   # specific yield of the payload
+        "momentum_per_kiloton": 7e5,  # kg m/s delivered by a standoff burst
+    },
+}
+
+
+def build_grid(
+    strategies: Sequence[str], lead_times: Sequence[float], masses: Sequence[float], counts: Sequence[int]
+) -> Dict[str, np.ndarray]:
+    """Flattened grid of every strategy x lead time x mass x count combination"""
+    for name in strategies:
+        if name not in MISSION_MODELS:
+            raise ValueError(f"Unknown strategy {name!r}; expected one of {', '.join(STRATEGIES)}")
+    index = np.meshgrid(
+        np.arange(len(strategies)), np.arange(len(lead_times)), np.arange(len(masses)), np.arange(len(counts)),
+        indexing="ij",
+    )
+    strategy_ids = np.array([STRATEGIES.index(name) for name in strategies])
+    return {
+        "strategy": strategy_ids[index[0].ravel()],
+        "lead_time": np.asarray(lead_times, dtype=np.float64)[index[1].ravel()],
+        "spacecraft_mass": np.asarray(masses, dtype=np.float64)[index[2].ravel()],
+        "spacecraft_count": np.asarray(counts, dtype=np.int64)[index[3].ravel()],
+    }
+
+
+def mission_model(
+    strategy: np.ndarray, lead_time: np.ndarray, mass: np.ndarray, count: np.ndarray,
+    body_mass: float, body_diameter: float,
+) -> Dict[str, np.ndarray]:
+    """Delta-v per spacecraft (m/s), effective impulse lead time (years), cost and reliability"""
+    per_spacecraft = np.zeros_like(lead_time)
+    impulse_lead = np.zeros_like(lead_time)
+    cost = np.zeros_like(lead_time)
+    reliability = np.zeros_like(lead_time)
+
+    for index, name in enumerate(STRATEGIES):
+        model = MISSION_MODELS[name]
+        rows = strategy == index
+        if not np.any(rows):
+            continue
+        lead, m, n = lead_time[rows], mass[rows], count[rows]
+        available = lead - model["transit_years"]
+        row_cost = model["mission_cost"] + n * (model["spacecraft_cost"] + model["cost_per_kg"] * m)
+
+        if name == "kinetic_impactor":
+            dv = model["beta"] * m * model["impact_speed"] / body_mass
+            impulse = available
+        elif name == "gravity_tractor":
+            tow_years = np.clip(available, 0.0, model["max_tow_years"])
+            hover = model["hover_radii"] * body_diameter / 2
+            dv = G * m / hover ** 2 * tow_years * SECONDS_PER_YEAR
+            # The towing impulse acts, on average, half way through the tow
+            impulse = available - tow_years / 2
+            row_cost = row_cost + model["cost_per_tow_year"] * tow_years
+        else:
+            dv = model["kilotons_per_kg"] * m * model["momentum_per_kiloton"] / body_mass
+            impulse = available
+
+        per_spacecraft[rows] = dv
+        impulse_lead[rows] = impulse
+        cost[rows] = row_cost
+        reliability[rows] = model["reliability"]
+
+    return {
+        "delta_v_per_spacecraft": per_spacecraft,
+        "impulse_lead": impulse_lead,
+        "cost": cost,
+        "reliability": reliability,
+    }
+
+
+def evaluate_chunk(
+    scenario: Dict[str, Any], strategy: np.ndarray, lead_time: np.ndarray, mass: np.ndarray, count: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """Delta-v, cost, miss distance and success probability of a block of grid points.
+
+    scenario holds the undeflected encounter state (r, v, epoch) and the
+    body's mass and diameter. Points whose spacecraft cannot arrive before
+    the encounter get zero delta-v and zero success probability.
+    """
+    model = mission_model(strategy, lead_time, mass, count, scenario["body_mass"], scenario["body_diameter"])
+    feasible = model["impulse_lead"] > 0
+
+    # Points that differ only in spacecraft count share their per-spacecraft delta-v and
+    # impulse time, so each distinct pair is simulated once for 0..max count delivering
+    per_spacecraft = np.where(feasible, model["delta_v_per_spacecraft"], 0.0)
+    impulse_lead = np.where(feasible, model["impulse_lead"], 1.0)
+    levels = np.where(feasible, count, 0) + 1
+    pairs, base = np.unique(np.column_stack([per_spacecraft, impulse_lead]), axis=0, return_inverse=True)
+    base = base.ravel()
+    base_levels = np.zeros(len(pairs), dtype=np.int64)
+    np.maximum.at(base_levels, base, levels)
+    base_starts = np.concatenate([[0], np.cumsum(base_levels)[:-1]])
+    owner = np.repeat(np.arange(len(pairs)), base_levels)
+    delivered_dv = (np.arange(owner.size) - base_starts[owner]) * pairs[owner, 0]
+
+    # Push along or against the orbital motion, whichever misses by more
+    best_b = np.zeros(owner.size)
+    capture = np.zeros(owner.size)
+    probability = np.ones(owner.size)
+    for direction in ("along_track", "retrograde"):
+        outcome = deflection.simulate(
+            scenario["r"], scenario["v"], scenario["epoch"],
+            delivered_dv, deflection.DIRECTIONS[direction], pairs[owner, 1],
+        )
+        better = outcome["b"] > best_b
+        best_b = np.where(better, outcome["b"], best_b)
+        capture = np.where(better, outcome["capture_radius"], capture)
+        probability = np.where(better, outcome["impact_probability"], probability)
+        nominal_probability = outcome["nominal_impact_probability"]
+
+    # One term per (point, number of spacecraft that deliver: 0..count)
+    starts = np.concatenate([[0], np.cumsum(levels)[:-1]])
+    point = np.repeat(np.arange(lead_time.size), levels)
+    delivered = np.arange(point.size) - starts[point]
+    option = base_starts[base[point]] + delivered
+    best_b, capture, probability = best_b[option], capture[option], probability[option]
+
+    weights = binom.pmf(delivered, count[point], model["reliability"][point])
+    cleared = 1.0 - probability / nominal_probability if nominal_probability > 0 else 1.0 - probability
+    success = np.add.reduceat(weights * np.clip(cleared, 0.0, 1.0), starts)
+    last = starts + levels - 1
+
+    return {
+        "delta_v": np.where(feasible, count * model["delta_v_per_spacecraft"], 0.0),
+        "cost": model["cost"],
+        "miss_distance": best_b[last],
+        "capture_radius": capture[last],
+        "success_probability": np.where(feasible, success, 0.0),
+        "feasible": feasible,
+    }
+
+
+def merge_chunks(chunks: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Concatenate evaluate_chunk results in grid order"""
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+
+def evaluate_grid(
+    scenario: Dict[str, Any], strategy: np.ndarray, lead_time: np.ndarray, mass: np.ndarray, count: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """evaluate_chunk over a whole grid in this process, TRADE_CHUNK_SIZE points at a time"""
+    return merge_chunks([
+        evaluate_chunk(scenario, *(column[start:start + TRADE_CHUNK_SIZE] for column in (strategy, lead_time, mass, count)))
+        for start in range(0, lead_time.size, TRADE_CHUNK_SIZE)
+    ])
+
+
+def pareto_front(cost: np.ndarray, miss_distance: np.ndarray, success: np.ndarray) -> np.ndarray:
+    """Indices of points no other point beats on all of cost (lower), miss and success (higher).
+
+    Points are visited cheapest first, so a point can only be dominated by
+    one visited before it. The visited points that are non-dominated in
+    (miss, success) form a staircase kept sorted by miss; one bisection per
+    point answers whether any of them is at least as good on both, which
+    makes the sweep O(N log N). Exact duplicates keep the first point.
+    """
+    # Minimize all three: cost, -miss, -success
+    order = np.lexsort((-success, -miss_distance, cost))
+    front: List[int] = []
+    # Staircase over (-miss, -success): first key ascending, second strictly descending
+    stair_b: List[float] = []
+    stair_c: List[float] = []
+    for index, b, c in zip(order.tolist(), (-miss_distance[order]).tolist(), (-success[order]).tolist()):
+        position = bisect_right(stair_b, b)
+        if position and stair_c[position - 1] <= c:
+            continue
+        front.append(index)
+        # Drop staircase points the new one dominates; they follow it contiguously
+        end = position
+        while end < len(stair_b) and stair_c[end] >= c:
+            end += 1
+        stair_b[position:end] = [b]
+        stair_c[position:end] = [c]
+    return np.asarray(front, dtype=np.int64)
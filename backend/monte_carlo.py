@@ -0,0 +1,289 @@
+"""Monte Carlo uncertainty propagation for impact outcomes.
+
+Samples diameter, density, angle and velocity from configurable distributions
+and pushes them through the vectorized physics in chunks, optionally flying
+each sample through the atmospheric entry stage first. Each chunk only
+returns fixed-grid histograms (plus min/max and category counts), so memory
+stays bounded regardless of the sample count, and chunks can be evaluated on
+a process pool. Chunk seeds are spawned from one SeedSequence, so a run is
+reproducible from its seed independently of how many workers are used.
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+
+import atmospheric_entry
+import vectorized_physics
+
+# Percentiles are read from a fine log10 grid: 0.005 decades per bin (~1.2% relative resolution)
+LOG_GRID_MIN = -10.0
+LOG_GRID_MAX = 40.0
+LOG_GRID_BINS = 10000
+LOG_GRID_EDGES = np.linspace(LOG_GRID_MIN, LOG_GRID_MAX, LOG_GRID_BINS + 1)
+
+CHUNK_SIZE = 100_000
+
+NUMERIC_METRICS = [
+    "kinetic_energy",
+    "tnt_megatons",
+    "crater_diameter",
+    "crater_depth",
+    "seismic_magnitude",
+    "ejecta_volume",
+    "dust_injection",
+    "thermal_radiation",
+    "climate_impact_duration",
+]
+CATEGORY_METRICS = {
+    "atmospheric_disturbance": ["local", "regional", "global"],
+    "biodiversity_threat": ["moderate", "severe", "extinction"],
+}
+
+DISTRIBUTIONS = {
+    "fixed": ("value",),
+    "uniform": ("low", "high"),
+    "normal": ("mean", "std"),
+    "lognormal": ("median", "sigma"),
+    "triangular": ("low", "mode", "high"),
+    "impact_angle": (),  # p(theta) ~ sin(2 theta), most probable 45 degrees
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def validate_distribution(name: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Check a distribution spec and return it reduced to the fields it uses"""
+    kind = spec.get("distribution", "uniform")
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(f"{name}: unknown distribution '{kind}' (expected one of {sorted(DISTRIBUTIONS)})")
+
+    clean: Dict[str, Any] = {"distribution": kind}
+    for field in DISTRIBUTIONS[kind]:
+        if spec.get(field) is None:
+            raise ValueError(f"{name}: '{kind}' distribution requires '{field}'")
+        clean[field] = float(spec[field])
+
+    if kind == "uniform" and clean["low"] > clean["high"]:
+        raise ValueError(f"{name}: low must not exceed high")
+    if kind == "triangular" and not clean["low"] <= clean["mode"] <= clean["high"]:
+        raise ValueError(f"{name}: triangular requires low <= mode <= high")
+    if kind in ("normal", "lognormal") and clean.get("std", clean.get("sigma", 0)) < 0:
+        raise ValueError(f"{name}: spread must be non-negative")
+    if kind == "lognormal" and clean["median"] <= 0:
+        raise ValueError(f"{name}: lognormal median must be positive")
+    return clean
+
+
+def sample_distribution(rng: np.random.Generator, spec: Dict[str, Any], size: int) -> np.ndarray:
+    """Draw samples for one validated distribution spec"""
+    kind = spec["distribution"]
+    if kind == "fixed":
+        return np.full(size, spec["value"])
+    if kind == "uniform":
+        return rng.uniform(spec["low"], spec["high"], size)
+    if kind == "normal":
+        return rng.normal(spec["mean"], spec["std"], size)
+    if kind == "lognormal":
+        return rng.lognormal(np.log(spec["median"]), spec["sigma"], size)
+    if kind == "triangular":
+        if spec["low"] == spec["high"]:
+            return np.full(size, spec["low"])
+        return rng.triangular(spec["low"], spec["mode"], spec["high"], size)
+    # impact_angle: CDF is sin^2(theta)
+    return np.degrees(np.arcsin(np.sqrt(rng.random(size))))
+
+
+def _log_histogram(values: np.ndarray) -> np.ndarray:
+    """Count positive values on the fine log grid; non-positive values land in bin 0"""
+    # log10(0) = -inf does not cast to an integer; those entries are reset below
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.log10(values)
+        index = np.clip(
+            ((logs - LOG_GRID_MIN) / (LOG_GRID_MAX - LOG_GRID_MIN) * LOG_GRID_BINS).astype(np.int64, copy=False),
+            0,
+            LOG_GRID_BINS - 1,
+        )
+    index[~(values > 0)] = 0
+    return np.bincount(index, minlength=LOG_GRID_BINS)
+
+
+def run_chunk(
+    distributions: Dict[str, Dict[str, Any]],
+    size: int,
+    seed_sequence: np.random.SeedSequence,
+    latitude: Optional[float],
+    longitude: Optional[float],
+    simulate_atmosphere: bool = True,
+) -> Dict[str, Any]:
+    """Sample and evaluate one chunk, returning only aggregate statistics.
+
+    Each sample is flown through the atmosphere as /impact/calculate does, so
+    craters, seismic magnitude and tsunamis come from the energy that reaches
+    the ground and the regime shares are reported as a category. With
+    simulate_atmosphere=False every body reaches the ground intact.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    diameter = np.maximum(sample_distribution(rng, distributions["diameter"], size), 1e-3)
+    velocity = np.maximum(sample_distribution(rng, distributions["velocity"], size), 1.0)
+    density = np.maximum(sample_distribution(rng, distributions["density"], size), 1.0)
+    angle = np.clip(sample_distribution(rng, distributions["angle"], size), 0.0, 90.0)
+
+    mass = vectorized_physics.calculate_asteroid_mass(diameter, density)
+    energy = vectorized_physics.calculate_kinetic_energy(mass, velocity)
+    ground_energy = energy
+    if simulate_atmosphere:
+        entry = atmospheric_entry.simulate_entry(diameter, velocity, density, angle)
+        crater_diameter, crater_depth = vectorized_physics.calculate_crater_size(
+            entry["ground_diameter"], density, entry["ground_velocity"], angle
+        )
+        crater_diameter = np.where(entry["crater"], crater_diameter, 0.0)
+        crater_depth = np.where(entry["crater"], crater_depth, 0.0)
+        ground_energy = entry["ground_energy"]
+    else:
+        crater_diameter, crater_depth = vectorized_physics.calculate_crater_size(diameter, density, velocity, angle)
+    effects = vectorized_physics.calculate_environmental_effects(energy, crater_diameter)
+
+    metrics = {
+        "kinetic_energy": energy,
+        "tnt_megatons": energy / vectorized_physics.MEGATON_J,
+        "crater_diameter": crater_diameter,
+        "crater_depth": crater_depth,
+        "seismic_magnitude": vectorized_physics.calculate_seismic_magnitude(ground_energy),
+    }
+    for name in ("ejecta_volume", "dust_injection", "thermal_radiation", "climate_impact_duration"):
+        metrics[name] = effects[name]
+
+    result: Dict[str, Any] = {"count": size, "numeric": {}, "categories": {}}
+    for name, values in metrics.items():
+        result["numeric"][name] = {
+            "histogram": _log_histogram(values),
+            "zeros": int(np.count_nonzero(~(values > 0))),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "sum": float(values.sum()),
+        }
+    for name, labels in CATEGORY_METRICS.items():
+        result["categories"][name] = {label: int(np.count_nonzero(effects[name] == label)) for label in labels}
+    if simulate_atmosphere:
+        result["categories"]["regime"] = {
+            label: int(np.count_nonzero(entry["regime"] == index)) for index, label in enumerate(atmospheric_entry.REGIMES)
+        }
+    if latitude is not None and longitude is not None:
+        result["tsunami_count"] = int(np.count_nonzero(
+            vectorized_physics.assess_tsunami_risk(latitude, longitude, ground_energy)
+        ))
+    return result
+
+
+def merge_chunks(chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-chunk aggregates into a single aggregate"""
+    merged: Dict[str, Any] = {"count": 0, "numeric": {}, "categories": {}}
+    for chunk in chunks:
+        merged["count"] += chunk["count"]
+        for name, stats in chunk["numeric"].items():
+            current = merged["numeric"].get(name)
+            if current is None:
+                merged["numeric"][name] = {**stats, "histogram": stats["histogram"].copy()}
+                continue
+            current["histogram"] += stats["histogram"]
+            current["zeros"] += stats["zeros"]
+            current["min"] = min(current["min"], stats["min"])
+            current["max"] = max(current["max"], stats["max"])
+            current["sum"] += stats["sum"]
+        for name, counts in chunk["categories"].items():
+            target = merged["categories"].setdefault(name, dict.fromkeys(counts, 0))
+            for label, value in counts.items():
+                target[label] += value
+        if "tsunami_count" in chunk:
+            merged["tsunami_count"] = merged.get("tsunami_count", 0) + chunk["tsunami_count"]
+    return merged
+
+
+def summarize(merged: Dict[str, Any], percentiles: List[float], bins: int) -> Dict[str, Any]:
+    """Turn merged aggregates into percentiles, histograms and category probabilities"""
+    total = merged["count"]
+    fine_centers = 10 ** ((LOG_GRID_EDGES[:-1] + LOG_GRID_EDGES[1:]) / 2)
+    summary: Dict[str, Any] = {}
+
+    for name, stats in merged["numeric"].items():
+        histogram = stats["histogram"].astype(np.float64)
+        # Non-positive samples sit in bin 0 of the fine grid; treat them as exact zeros
+        histogram[0] -= stats["zeros"]
+        lo, hi = stats["min"], stats["max"]
+
+        cdf = np.cumsum(histogram) + stats["zeros"]
+        values = {}
+        for p in percentiles:
+            rank = p / 100.0 * total
+            if rank <= stats["zeros"]:
+                value = 0.0 if stats["zeros"] else lo
+            else:
+                value = float(fine_centers[min(np.searchsorted(cdf, rank), LOG_GRID_BINS - 1)])
+            values[f"p{p:g}"] = float(np.clip(value, lo, hi))
+
+        positive_min = None
+        if histogram.any():
+            positive_min = lo if lo > 0 else float(fine_centers[np.argmax(histogram > 0)])
+        if positive_min is not None and hi > positive_min:
+            edges = np.logspace(np.log10(positive_min), np.log10(hi), bins + 1)
+            coarse = np.bincount(
+                np.clip(np.searchsorted(edges, fine_centers, side="right") - 1, 0, bins - 1),
+                weights=histogram,
+                minlength=bins,
+            )
+            hist = {"edges": edges.tolist(), "counts": coarse.astype(np.int64).tolist(), "scale": "log"}
+        else:
+            hist = {"edges": [lo, hi], "counts": [int(total - stats["zeros"])], "scale": "log"}
+        hist["zero_count"] = stats["zeros"]
+
+        summary[name] = {
+            "mean": stats["sum"] / total,
+            "min": lo,
+            "max": hi,
+            "percentiles": values,
+            "histogram": hist,
+        }
+
+    result = {
+        "samples": total,
+        "metrics": summary,
+        "categories": {
+            name: {label: count / total for label, count in counts.items()}
+            for name, counts in merged["categories"].items()
+        },
+    }
+    if "tsunami_count" in merged:
+        result["tsunami_probability"] = merged["tsunami_count"] / total
+    return result
+
+
+def worker_count() -> int:
+    """Number of worker processes the shared pool runs (MONTE_CARLO_WORKERS, else one per CPU)"""
+    return int(os.environ.get("MONTE_CARLO_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=worker_count(), mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown_executor():
+    """Stop the shared process pool if it was started"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def plan_chunks(samples: int, seed: int) -> List[tuple]:
+    """Split a run into (size, SeedSequence) chunks; the split depends only on samples and seed"""
+    sizes = [CHUNK_SIZE] * (samples // CHUNK_SIZE)
+    if samples % CHUNK_SIZE:
+        sizes.append(samples % CHUNK_SIZE)
+    return list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
@@ -0,0 +1,197 @@
+"""Fan-out of NEO snapshot updates to Server-Sent Events subscribers.
+
+Every published snapshot is diffed against the previous one by NEO id and
+turned into a single delta event (added, changed, removed) that is encoded
+once and shared by all subscribers. Each event carries a monotonically
+increasing id, so a reconnecting client that sends Last-Event-ID is replayed
+the deltas it missed from a short history, or sent a full snapshot when the
+history no longer reaches back far enough.
+
+Subscriber queues are bounded: a client that falls more than
+NEO_STREAM_QUEUE_SIZE events behind has its backlog dropped and receives a
+fresh snapshot instead once it catches up.
+"""
+import asyncio
+import os
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import orjson
+
+import instrumentation
+
+NEO_STREAM_QUEUE_SIZE = int(os.environ.get("NEO_STREAM_QUEUE_SIZE", "16"))
+NEO_STREAM_HISTORY = int(os.environ.get("NEO_STREAM_HISTORY", "64"))
+
+# Fields that change on every sync without the NEO itself changing
+_VOLATILE_FIELDS = ("_id", "last_updated")
+
+events_published = instrumentation.register(instrumentation.Counter(
+    "neo_stream_events_total", "NEO stream events published", ("type",)
+))
+resyncs_total = instrumentation.register(instrumentation.Counter(
+    "neo_stream_resyncs_total", "Subscribers whose backlog was dropped and replaced by a snapshot", ()
+))
+subscribers_gauge = instrumentation.register(instrumentation.Gauge(
+    "neo_stream_subscribers", "Connected NEO stream subscribers", ()
+))
+
+
+def _fingerprint(neo: Dict[str, Any]) -> bytes:
+    if neo.get("content_hash"):
+        return neo["content_hash"].encode()
+    return orjson.dumps(
+        {k: v for k, v in neo.items() if k not in _VOLATILE_FIELDS},
+        option=orjson.OPT_SORT_KEYS,
+        default=str,
+    )
+
+
+def encode_event(event_id: int, payload: Dict[str, Any]) -> bytes:
+    """Encode one SSE frame"""
+    return b"id: %d\ndata: %s\n\n" % (event_id, orjson.dumps(payload, default=str))
+
+
+class Subscriber:
+    """One connected client: a bounded backlog of encoded frames"""
+
+    def __init__(self, broadcaster: "NEOBroadcaster", max_pending: int):
+        self.broadcaster = broadcaster
+        self.max_pending = max_pending
+        self.resync = False
+        self._frames: Deque[bytes] = deque()
+        self._ready = asyncio.Event()
+
+    def offer(self, frame: bytes):
+        if self.resync:
+            # A snapshot is already owed; it will include this update
+            return
+        if len(self._frames) >= self.max_pending:
+            self._frames.clear()
+            self.resync = True
+            resyncs_total.inc()
+        else:
+            self._frames.append(frame)
+        self._ready.set()
+
+    async def next_frame(self, timeout: float) -> Optional[bytes]:
+        """Next frame to send, or None if nothing arrived within timeout"""
+        if not self._frames and not self.resync:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.resync:
+            self.resync = False
+            return self.broadcaster.snapshot_frame()
+        return self._frames.popleft()
+
+
+class NEOBroadcaster:
+    """Current NEO snapshot plus delta events fanned out to subscribers"""
+
+    def __init__(self, queue_size: int = NEO_STREAM_QUEUE_SIZE, history: int = NEO_STREAM_HISTORY):
+        self.queue_size = queue_size
+        self.version = 0
+        self.updated_at: Optional[datetime] = None
+        self._neos: Dict[str, Dict[str, Any]] = {}
+        self._fingerprints: Dict[str, bytes] = {}
+        self._history: Deque[Tuple[int, bytes]] = deque(maxlen=history)
+        self._snapshot_frame: Optional[Tuple[int, bytes]] = None
+        self._subscribers: List[Subscriber] = []
+
+    @property
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return list(self._neos.values())
+
+    def publish(self, neos: List[Any], version: Optional[int] = None) -> bool:
+        """Replace the snapshot; returns True if anything changed (and a delta was sent).
+
+        version pins the event id, so workers replaying another worker's
+        snapshot hand out the same ids for Last-Event-ID resume.
+        """
+        neos = [neo.model_dump() if hasattr(neo, "model_dump") else neo for neo in neos]
+        new_neos = {neo["id"]: neo for neo in neos if neo.get("id") is not None}
+        new_fingerprints = {neo_id: _fingerprint(neo) for neo_id, neo in new_neos.items()}
+
+        added = [neo for neo_id, neo in new_neos.items() if neo_id not in self._neos]
+        changed = [
+            neo for neo_id, neo in new_neos.items()
+            if neo_id in self._fingerprints and self._fingerprints[neo_id] != new_fingerprints[neo_id]
+        ]
+        removed = [neo_id for neo_id in self._neos if neo_id not in new_neos]
+
+        self._neos, self._fingerprints = new_neos, new_fingerprints
+        self.updated_at = datetime.now(timezone.utc)
+        if not (added or changed or removed):
+            if version is not None and version != self.version:
+                self._history.clear()
+                self.version = version
+            return False
+
+        if version is not None and version != self.version + 1:
+            # Deltas on either side of a gap cannot be chained for resume
+            self._history.clear()
+        self.version = version if version is not None else self.version + 1
+        frame = encode_event(self.version, {
+            "type": "neo_delta",
+            "timestamp": self.updated_at.isoformat(),
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+        })
+        self._history.append((self.version, frame))
+        events_published.inc("delta")
+        for subscriber in self._subscribers:
+            subscriber.offer(frame)
+        return True
+
+    def snapshot_frame(self) -> bytes:
+        """Full snapshot event for the current version, encoded once per version"""
+        if self._snapshot_frame is None or self._snapshot_frame[0] != self.version:
+            timestamp = (self.updated_at or datetime.now(timezone.utc)).isoformat()
+            self._snapshot_frame = (self.version, encode_event(self.version, {
+                "type": "neo_update",
+                "timestamp": timestamp,
+                "data": self.snapshot,
+            }))
+            events_published.inc("snapshot")
+        return self._snapshot_frame[1]
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscriber:
+        """Register a subscriber and queue whatever it needs to catch up"""
+        subscriber = Subscriber(self, self.queue_size)
+        missed = self._missed_frames(last_event_id)
+        if missed is None:
+            if self._neos:
+                subscriber.resync = True
+        else:
+            for frame in missed:
+                subscriber.offer(frame)
+        self._subscribers.append(subscriber)
+        subscribers_gauge.set(value=len(self._subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        try:
+            self._subscribers.remove(subscriber)
+        except ValueError:
+            pass
+        subscribers_gauge.set(value=len(self._subscribers))
+
+    def _missed_frames(self, last_event_id: Optional[str]) -> Optional[List[bytes]]:
+        """Deltas after last_event_id, or None if the client needs a full snapshot"""
+        try:
+            last = int(last_event_id)
+        except (TypeError, ValueError):
+            return None
+        if last == self.version:
+            return []
+        if last > self.version or not self._history or last < self._history[0][0] - 1:
+            return None
+        return [frame for version, frame in self._history if version > last]
+
+
+neo_broadcaster = NEOBroadcaster()
@@ -0,0 +1,142 @@
+"""Designation search for NEO documents.
+
+Designations are normalized (lowercased, punctuation and spaces removed) into
+a `designation_keys` array stored on every NEO document, so prefix searches
+become index range scans instead of unanchored regular expressions. An
+in-memory trigram index over the same keys serves autocomplete requests
+without touching the database.
+"""
+import bisect
+import heapq
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+MAX_QUERY_LENGTH = 64
+
+
+def normalize_designation(text: Optional[str]) -> str:
+    """Normalize a designation or name for matching: '(2023 AB-1)' -> '2023ab1'"""
+    if not text:
+        return ""
+    return _NON_ALNUM.sub("", str(text).lower())[:MAX_QUERY_LENGTH]
+
+
+def designation_keys(neo: Dict[str, Any]) -> List[str]:
+    """Normalized keys a NEO can be found by (its designation and its display name)"""
+    keys = []
+    for value in (neo.get("neo_id"), neo.get("name")):
+        key = normalize_designation(value)
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def add_search_fields(neo: Dict[str, Any]) -> Dict[str, Any]:
+    """Set the indexed search fields on a NEO document in place and return it"""
+    neo["designation_keys"] = designation_keys(neo)
+    return neo
+
+
+def prefix_query(term: str) -> Dict[str, Any]:
+    """Index range query matching documents with a designation key starting with term.
+
+    A term without letters or digits (e.g. "-") normalizes to an empty key and
+    matches nothing, rather than dropping the filter and matching everything.
+    """
+    key = normalize_designation(term)
+    if not key:
+        return {"designation_keys": {"$in": []}}
+    upper = key[:-1] + chr(ord(key[-1]) + 1)
+    return {"designation_keys": {"$gte": key, "$lt": upper}}
+
+
+def _trigrams(key: str) -> Set[str]:
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+class TrigramIndex:
+    """In-memory substring index over designation keys.
+
+    Prefix matches come from a binary search over the sorted keys. When there
+    are fewer than `limit` of them, queries of three or more characters are
+    completed with substring matches from intersected trigram posting sets,
+    so the work depends on the query's selectivity rather than catalogue size.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._keys: List[tuple] = []  # sorted (key, id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build(self, neos: Iterable[Dict[str, Any]]):
+        """Replace the index contents with the given NEO documents"""
+        entries: Dict[str, Dict[str, Any]] = {}
+        postings: Dict[str, Set[str]] = {}
+        keys: List[tuple] = []
+        for neo in neos:
+            neo_id = neo.get("id")
+            if not neo_id:
+                continue
+            neo_keys = neo.get("designation_keys") or designation_keys(neo)
+            entries[neo_id] = {
+                "id": neo_id,
+                "name": neo.get("name"),
+                "designation": neo.get("neo_id") or neo.get("name"),
+                "keys": neo_keys,
+            }
+            for key in neo_keys:
+                keys.append((key, neo_id))
+                for trigram in _trigrams(key):
+                    postings.setdefault(trigram, set()).add(neo_id)
+        keys.sort()
+        self._entries, self._postings, self._keys = entries, postings, keys
+
+    def _prefix_matches(self, key: str, limit: int) -> List[str]:
+        """NEO ids with a key starting with `key`, in key order, via binary search"""
+        matches: List[str] = []
+        position = bisect.bisect_left(self._keys, (key,))
+        while position < len(self._keys) and len(matches) < limit:
+            indexed_key, neo_id = self._keys[position]
+            if not indexed_key.startswith(key):
+                break
+            if neo_id not in matches:
+                matches.append(neo_id)
+            position += 1
+        return matches
+
+    def _substring_matches(self, key: str, limit: int, exclude: List[str]) -> List[str]:
+        """NEO ids with a key containing `key` (three or more characters), via trigram postings"""
+        posting_sets = sorted((self._postings.get(t, set()) for t in _trigrams(key)), key=len)
+        matches = set(posting_sets[0])
+        for posting in posting_sets[1:]:
+            matches &= posting
+            if not matches:
+                return []
+        matches.difference_update(exclude)
+        candidates = (
+            neo_id for neo_id in matches
+            if any(key in indexed_key for indexed_key in self._entries[neo_id]["keys"])
+        )
+        return heapq.nsmallest(limit, candidates, key=lambda neo_id: min(self._entries[neo_id]["keys"]))
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return up to `limit` NEOs whose designation contains the query, prefix matches first"""
+        key = normalize_designation(query)
+        if not key or limit <= 0:
+            return []
+
+        ranked = self._prefix_matches(key, limit)
+        if len(ranked) < limit and len(key) >= 3:
+            ranked += self._substring_matches(key, limit - len(ranked), ranked)
+        return [
+            {name: self._entries[neo_id][name] for name in ("id", "name", "designation")}
+            for neo_id in ranked
+        ]
+
+
+designation_index = TrigramIndex()
@@ -0,0 +1,165 @@
+"""Single owner of the current NEO snapshot.
+
+The service runs the periodic catalogue sync and, whenever the stored data
+changes, reloads the current NEO list once and publishes it to the
+broadcaster. The REST endpoints and the SSE stream both read that in-memory
+snapshot, so neither polls MongoDB on its own.
+
+With several workers only the one for which is_leader() returns true runs
+the sync; the others apply the snapshots it announces (see cluster.py).
+
+Changes are picked up from three places: the end of every sync run in this
+process, explicit notify() calls, and (NEO_CHANGE_STREAMS=auto|true) a
+MongoDB change stream on the NEO collection when the deployment runs as a
+replica set. With "auto", a standalone server that cannot open change
+streams is detected once and the watcher stays off.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, List, Optional
+
+from neo_broadcast import NEOBroadcaster
+
+logger = logging.getLogger("server.neo_service")
+
+NEO_CHANGE_STREAMS = os.environ.get("NEO_CHANGE_STREAMS", "auto").lower()
+NEO_CHANGE_DEBOUNCE_SECONDS = float(os.environ.get("NEO_CHANGE_DEBOUNCE_SECONDS", "1.0"))
+NEO_SYNC_RETRY_SECONDS = 300
+NEO_LEADER_POLL_SECONDS = 10
+
+
+class NEODataService:
+    """Runs NEO syncs and keeps the broadcaster's snapshot current"""
+
+    def __init__(
+        self,
+        broadcaster: NEOBroadcaster,
+        sync: Callable[..., Awaitable[Any]],
+        load_snapshot: Callable[[], Awaitable[List[Any]]],
+        get_collection: Callable[[], Any],
+        sync_interval: float,
+        on_change: Optional[Callable[[], None]] = None,
+        is_leader: Callable[[], bool] = lambda: True,
+        on_sync: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.broadcaster = broadcaster
+        self._sync = sync
+        self._load_snapshot = load_snapshot
+        self.get_collection = get_collection
+        self.sync_interval = sync_interval
+        self.on_change = on_change
+        self.is_leader = is_leader
+        self.on_sync = on_sync
+        self._sync_lock = asyncio.Lock()
+        self._refresh_pending = False
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def snapshot(self) -> List[Any]:
+        return self.broadcaster.snapshot
+
+    async def refresh(self) -> bool:
+        """Reload the current NEO list and publish it; returns True if it changed"""
+        neos = await self._load_snapshot()
+        if not isinstance(neos, list):
+            return False
+        changed = self.broadcaster.publish(neos)
+        if changed and self.on_change is not None:
+            self.on_change()
+        return changed
+
+    async def run_sync(self, mode: Optional[str] = None) -> Any:
+        """Run one sync (never two at once in this process) and publish the result"""
+        async with self._sync_lock:
+            result = await self._sync(mode)
+            await self.refresh()
+            if self.on_sync is not None:
+                await self.on_sync()
+            return result
+
+    def apply_snapshot(self, neos: List[Any], version: int):
+        """Publish a snapshot produced by the worker that ran the sync"""
+        changed = self.broadcaster.publish(neos, version=version)
+        if changed and self.on_change is not None:
+            self.on_change()
+
+    def notify(self):
+        """Schedule a debounced refresh after the stored NEO data changed"""
+        if self._refresh_pending or self._sync_lock.locked():
+            # A refresh is already queued, or the running sync publishes when done
+            return
+        self._refresh_pending = True
+        asyncio.get_running_loop().create_task(self._debounced_refresh())
+
+    async def _debounced_refresh(self):
+        try:
+            await asyncio.sleep(NEO_CHANGE_DEBOUNCE_SECONDS)
+            self._refresh_pending = False
+            await self.refresh()
+        except Exception as e:
+            self._refresh_pending = False
+            logger.warning(f"NEO snapshot refresh failed: {e}")
+
+    def start(self, run_sync: bool = True, watch_changes: bool = True):
+        """Publish the initial snapshot and start the sync loop and change stream watcher.
+
+        The sync loop only syncs while is_leader() is true; watch_changes=False
+        leaves change notification to the caller (e.g. a cross-worker bus).
+        """
+        loop = asyncio.get_running_loop()
+        self._tasks.append(loop.create_task(self._initial_refresh()))
+        if run_sync:
+            self._tasks.append(loop.create_task(self._sync_loop()))
+        if watch_changes and NEO_CHANGE_STREAMS != "false" and self.get_collection() is not None:
+            self._tasks.append(loop.create_task(self._watch_changes()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+
+    async def _initial_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"Initial NEO snapshot load failed: {e}")
+
+    async def _sync_loop(self):
+        while True:
+            if not self.is_leader():
+                await asyncio.sleep(NEO_LEADER_POLL_SECONDS)
+                continue
+            try:
+                await self.run_sync()
+                await asyncio.sleep(self.sync_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in periodic NEO sync: {e}")
+                await asyncio.sleep(NEO_SYNC_RETRY_SECONDS)
+
+    async def _watch_changes(self):
+        """Refresh on writes made by other processes, via a MongoDB change stream"""
+        collection = self.get_collection()
+        opened = False
+        while True:
+            try:
+                async with collection.watch() as stream:
+                    opened = True
+                    logger.info("Watching the NEO collection for changes")
+                    async for _ in stream:
+                        self.notify()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if NEO_CHANGE_STREAMS == "auto" and not opened:
+                    logger.info(f"NEO change streams unavailable, relying on sync notifications: {e}")
+                    return
+                logger.warning(f"NEO change stream failed, reopening: {e}")
+                await asyncio.sleep(NEO_CHANGE_DEBOUNCE_SECONDS * 5)
@@ -0,0 +1,274 @@
+"""Vectorized two-body propagation of NEO orbits.
+
+Kepler's equation is solved by Newton iteration over whole arrays, so the
+positions of every NEO at every epoch come out of one NumPy pass (chunked
+over NEOs to bound memory). Times are days since J2000 (JD 2451545.0),
+positions are heliocentric ecliptic coordinates in AU.
+
+The catalogue only stores orbital period, eccentricity and inclination.
+elements_from_neos() fills in the orientation and phase so that each orbit
+passes the reported miss distance from Earth, radially outward along the
+line of nodes, at the reported close-approach date: the orbit is anchored on
+the one encounter we know about. close_approaches() then searches a time
+window for each NEO's closest approach to Earth.
+"""
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+AU_KM = 149_597_870.7
+J2000 = np.datetime64("2000-01-01T12:00:00")
+DAYS_PER_YEAR = 365.25
+
+KEPLER_TOLERANCE = 1e-12
+KEPLER_MAX_ITERATIONS = 50
+# NEOs per propagation chunk; positions take chunk * epochs * 3 doubles
+ORBIT_CHUNK_SIZE = int(os.environ.get("ORBIT_CHUNK_SIZE", "2048"))
+# Samples per NEO when refining a close approach between two coarse grid points
+REFINE_SAMPLES = 33
+
+# Earth (Earth-Moon barycentre) mean elements at J2000, Standish (1992)
+EARTH_ELEMENTS = {
+    "a": 1.00000261,
+    "e": 0.01671123,
+    "i": np.radians(-0.00001531),
+    "node": 0.0,
+    "peri": np.radians(102.93768193),
+    "M0": np.radians(100.46457166 - 102.93768193),
+    "epoch": 0.0,
+    "period": 365.256363004,
+}
+
+ELEMENT_NAMES = ("a", "e", "i", "node", "peri", "M0", "epoch", "period")
+
+
+def days_since_j2000(dates: Iterable[Any]) -> np.ndarray:
+    """Days since J2000 for date strings / datetimes; NaN where a date cannot be parsed"""
+    days = []
+    for value in dates:
+        try:
+            days.append((np.datetime64(str(value)[:19]) - J2000) / np.timedelta64(1, "D"))
+        except (ValueError, TypeError):
+            days.append(np.nan)
+    return np.asarray(days, dtype=np.float64)
+
+
+def dates_from_days(days: np.ndarray) -> np.ndarray:
+    """datetime64[s] epochs for days since J2000 (NaT for NaN)"""
+    days = np.asarray(days, dtype=np.float64)
+    seconds = np.where(np.isfinite(days), np.round(days * 86400.0), 0).astype("int64")
+    dates = J2000 + seconds.astype("timedelta64[s]")
+    return np.where(np.isfinite(days), dates, np.datetime64("NaT"))
+
+
+def solve_kepler(mean_anomaly, eccentricity, tolerance: float = KEPLER_TOLERANCE) -> np.ndarray:
+    """Eccentric anomaly E with E - e sin E = M, by Newton iteration over broadcast arrays"""
+    mean_anomaly = np.asarray(mean_anomaly, dtype=np.float64)
+    eccentricity = np.asarray(eccentricity, dtype=np.float64)
+    mean_anomaly, eccentricity = np.broadcast_arrays(mean_anomaly, eccentricity)
+    # Wrap to [-pi, pi) so the starting guess is good for every revolution
+    M = np.remainder(mean_anomaly + np.pi, 2 * np.pi) - np.pi
+    E = np.where(eccentricity < 0.8, M + eccentricity * np.sin(M), np.pi * np.sign(M + (M == 0)))
+    for _ in range(KEPLER_MAX_ITERATIONS):
+        step = (E - eccentricity * np.sin(E) - M) / (1.0 - eccentricity * np.cos(E))
+        E = E - step
+        if np.all(np.abs(step) < tolerance):
+            break
+    # Undo the wrap so E advances with M across revolutions
+    return E + (mean_anomaly - M)
+
+
+def _orientation(elements: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit vectors P (towards perihelion) and Q of each orbital plane, shape (N, 3)"""
+    node, peri, inc = elements["node"], elements["peri"], elements["i"]
+    cos_node, sin_node = np.cos(node), np.sin(node)
+    cos_peri, sin_peri = np.cos(peri), np.sin(peri)
+    cos_inc, sin_inc = np.cos(inc), np.sin(inc)
+    P = np.stack([
+        cos_peri * cos_node - sin_peri * sin_node * cos_inc,
+        cos_peri * sin_node + sin_peri * cos_node * cos_inc,
+        sin_peri * sin_inc,
+    ], axis=-1)
+    Q = np.stack([
+        -sin_peri * cos_node - cos_peri * sin_node * cos_inc,
+        -sin_peri * sin_node + cos_peri * cos_node * cos_inc,
+        cos_peri * sin_inc,
+    ], axis=-1)
+    return P, Q
+
+
+def _as_elements(elements: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    return {name: np.atleast_1d(np.asarray(elements[name], dtype=np.float64)) for name in ELEMENT_NAMES}
+
+
+def positions(elements: Dict[str, Any], times) -> np.ndarray:
+    """Heliocentric positions (AU), shape (N, T, 3).
+
+    times is either shared by all orbits, shape (T,), or per orbit, shape (N, T).
+    """
+    elements = _as_elements(elements)
+    times = np.asarray(times, dtype=np.float64)
+    if times.ndim == 1:
+        times = times[np.newaxis, :]
+    column = lambda name: elements[name][:, np.newaxis]
+
+    mean_motion = 2 * np.pi / column("period")
+    M = column("M0") + mean_motion * (times - column("epoch"))
+    e = column("e")
+    E = solve_kepler(M, e)
+    a = column("a")
+    x = a * (np.cos(E) - e)
+    y = a * np.sqrt(1.0 - e * e) * np.sin(E)
+
+    P, Q = _orientation(elements)
+    return x[..., np.newaxis] * P[:, np.newaxis, :] + y[..., np.newaxis] * Q[:, np.newaxis, :]
+
+
+def states(elements: Dict[str, Any], times) -> Tuple[np.ndarray, np.ndarray]:
+    """Heliocentric positions (AU) and velocities (AU/day), each shape (N, T, 3)"""
+    elements = _as_elements(elements)
+    times = np.asarray(times, dtype=np.float64)
+    if times.ndim == 1:
+        times = times[np.newaxis, :]
+    column = lambda name: elements[name][:, np.newaxis]
+
+    mean_motion = 2 * np.pi / column("period")
+    e = column("e")
+    E = solve_kepler(column("M0") + mean_motion * (times - column("epoch")), e)
+    a = column("a")
+    sin_E, cos_E = np.sin(E), np.cos(E)
+    root = np.sqrt(1.0 - e * e)
+    rate = a * mean_motion / (1.0 - e * cos_E)
+
+    P, Q = _orientation(elements)
+    P, Q = P[:, np.newaxis, :], Q[:, np.newaxis, :]
+    r = (a * (cos_E - e))[..., np.newaxis] * P + (a * root * sin_E)[..., np.newaxis] * Q
+    v = (-rate * sin_E)[..., np.newaxis] * P + (rate * root * cos_E)[..., np.newaxis] * Q
+    return r, v
+
+
+def positions_into(elements: Dict[str, Any], times, out: np.ndarray, chunk_size: int = ORBIT_CHUNK_SIZE) -> np.ndarray:
+    """positions() for shared times written chunk by chunk into out (shape (N, T, 3), any float dtype)"""
+    elements = _as_elements(elements)
+    for begin in range(0, len(elements["a"]), chunk_size):
+        index = slice(begin, begin + chunk_size)
+        out[index] = positions(take_elements(elements, index), times)
+    return out
+
+
+def earth_positions(times) -> np.ndarray:
+    """Heliocentric position of Earth (AU); shape (T, 3), or (N, T, 3) for per-orbit times"""
+    times = np.asarray(times, dtype=np.float64)
+    result = positions(EARTH_ELEMENTS, times.reshape(1, -1))[0]
+    return result.reshape(times.shape + (3,))
+
+
+def earth_distances(elements: Dict[str, Any], times) -> np.ndarray:
+    """Earth-NEO distance (km), shape (N, T)"""
+    times = np.asarray(times, dtype=np.float64)
+    relative = positions(elements, times) - earth_positions(times)
+    return np.linalg.norm(relative, axis=-1) * AU_KM
+
+
+def elements_from_neos(neos: List[Dict[str, Any]]) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Elements anchored on each NEO's reported close approach, and a mask of NEOs that have an orbit.
+
+    NEOs without a positive orbital period, an eccentricity below 1 or a
+    parseable close-approach date are masked out (their elements are NaN).
+    """
+    period_years = np.array([neo.get("orbital_period") or np.nan for neo in neos], dtype=np.float64)
+    e = np.array([neo.get("eccentricity") if neo.get("eccentricity") is not None else np.nan for neo in neos], dtype=np.float64)
+    inclination = np.array([neo.get("inclination") or 0.0 for neo in neos], dtype=np.float64)
+    miss_km = np.array([neo.get("miss_distance") or 0.0 for neo in neos], dtype=np.float64)
+    epoch = days_since_j2000(neo.get("close_approach_date") for neo in neos)
+
+    valid = (period_years > 0) & (e >= 0) & (e < 1) & np.isfinite(epoch)
+    period_years = np.where(valid, period_years, 1.0)
+    e = np.where(valid, e, 0.0)
+    epoch = np.where(valid, epoch, 0.0)
+
+    a = period_years ** (2.0 / 3.0)
+    earth = earth_positions(epoch)
+    earth_distance = np.linalg.norm(earth, axis=-1)
+
+    # The orbit crosses the ecliptic (ascending node) in Earth's direction at
+    # the close-approach epoch, miss_distance further out than Earth
+    node = np.arctan2(earth[:, 1], earth[:, 0])
+    target = earth_distance + miss_km / AU_KM
+    semi_latus = a * (1.0 - e * e)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_true = np.where(e > 1e-9, (semi_latus / target - 1.0) / e, 1.0)
+    # Orbits that never reach the target distance are anchored at perihelion / aphelion
+    true_anomaly = np.arccos(np.clip(cos_true, -1.0, 1.0))
+    eccentric = 2.0 * np.arctan(np.sqrt((1.0 - e) / (1.0 + e)) * np.tan(true_anomaly / 2.0))
+
+    elements = {
+        "a": a,
+        "e": e,
+        "i": np.radians(inclination),
+        "node": node,
+        "peri": -true_anomaly,
+        "M0": eccentric - e * np.sin(eccentric),
+        "epoch": epoch,
+        "period": period_years * DAYS_PER_YEAR,
+    }
+    for name in ELEMENT_NAMES:
+        elements[name] = np.where(valid, elements[name], np.nan)
+    return elements, valid
+
+
+def take_elements(elements: Dict[str, np.ndarray], index) -> Dict[str, np.ndarray]:
+    return {name: values[index] for name, values in elements.items()}
+
+
+def _close_approaches_chunk(elements: Dict[str, np.ndarray], grid: np.ndarray, step: float) -> Tuple[np.ndarray, np.ndarray]:
+    distances = earth_distances(elements, grid)
+    coarse = np.argmin(distances, axis=1)
+
+    # Refine on a fine grid spanning the neighbouring coarse samples, then fit a parabola
+    offsets = np.linspace(-step, step, REFINE_SAMPLES)
+    fine_times = grid[coarse][:, np.newaxis] + offsets[np.newaxis, :]
+    fine = earth_distances(elements, fine_times)
+    best = np.clip(np.argmin(fine, axis=1), 1, REFINE_SAMPLES - 2)
+    rows = np.arange(len(best))
+    left, middle, right = fine[rows, best - 1], fine[rows, best], fine[rows, best + 1]
+    curvature = left - 2 * middle + right
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shift = np.where(curvature > 0, 0.5 * (left - right) / curvature, 0.0)
+    shift = np.clip(shift, -1.0, 1.0)
+    fine_step = offsets[1] - offsets[0]
+    epochs = fine_times[rows, best] + shift * fine_step
+    epochs = np.clip(epochs, grid[0], grid[-1])
+    minimum = earth_distances(elements, epochs[:, np.newaxis])[:, 0]
+    # Keep whichever of the refined and sampled minima is smaller
+    sampled = fine[rows, best]
+    use_sampled = sampled < minimum
+    return np.where(use_sampled, fine_times[rows, best], epochs), np.where(use_sampled, sampled, minimum)
+
+
+def close_approaches(
+    elements: Dict[str, Any],
+    start: float,
+    end: float,
+    step: float = 1.0,
+    chunk_size: int = ORBIT_CHUNK_SIZE,
+) -> Dict[str, np.ndarray]:
+    """Epoch (days since J2000) and distance (km) of each orbit's closest approach to Earth in [start, end].
+
+    Distances are sampled every `step` days, then refined around the sampled
+    minimum. Orbits with NaN elements get NaN results.
+    """
+    elements = _as_elements(elements)
+    count = len(elements["a"])
+    grid = np.arange(start, end + step / 2, step, dtype=np.float64)
+    epochs = np.full(count, np.nan)
+    distances = np.full(count, np.nan)
+    valid = np.flatnonzero(np.all([np.isfinite(values) for values in elements.values()], axis=0))
+
+    for begin in range(0, len(valid), chunk_size):
+        index = valid[begin:begin + chunk_size]
+        chunk_epochs, chunk_distances = _close_approaches_chunk(take_elements(elements, index), grid, step)
+        epochs[index] = chunk_epochs
+        distances[index] = chunk_distances
+    return {"epoch": epochs, "distance": distances}
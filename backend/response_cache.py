@@ -0,0 +1,186 @@
+"""Shared in-process response cache for read-heavy endpoints.
+
+Responses are cached as already-encoded JSON bytes keyed on the endpoint and
+its query parameters, with a TTL, LRU eviction and entry/byte limits.
+Concurrent misses for the same key share one computation. Endpoints wrap
+degraded results (fallback data, error payloads) in Uncached so they are
+returned but never stored.
+"""
+import asyncio
+import functools
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+import instrumentation
+
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+cache_hits = instrumentation.register(instrumentation.Counter(
+    "response_cache_hits_total", "Responses served from the in-process cache", ("endpoint",)
+))
+cache_misses = instrumentation.register(instrumentation.Counter(
+    "response_cache_misses_total", "Responses computed because they were not cached", ("endpoint",)
+))
+cache_evictions = instrumentation.register(instrumentation.Counter(
+    "response_cache_evictions_total", "Cache entries evicted by size limits", ()
+))
+cache_invalidations = instrumentation.register(instrumentation.Counter(
+    "response_cache_invalidations_total", "Full cache invalidations", ()
+))
+
+
+class Uncached:
+    """Endpoint result to return as usual but not store, e.g. fallback or error data"""
+
+    __slots__ = ("result",)
+
+    def __init__(self, result: Any):
+        self.result = result
+
+
+class ResponseCache:
+    """TTL + LRU cache of encoded response bodies"""
+
+    def __init__(
+        self,
+        ttl: float = RESPONSE_CACHE_TTL,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (expires_at, body)
+        self._entries: "OrderedDict[Tuple, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        # Bumped on invalidation so computations started before it are not stored
+        self._generation = 0
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, body = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: Tuple, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, body)
+        self._bytes += len(body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            cache_evictions.inc()
+
+    def _remove(self, key: Tuple):
+        _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def invalidate(self):
+        """Drop every cached response (called when the underlying data changes)"""
+        self._entries.clear()
+        self._bytes = 0
+        self._generation += 1
+        cache_invalidations.inc()
+
+    async def get_or_compute(self, key: Tuple, compute: Callable) -> Tuple[bytes, bool]:
+        """Return (body, hit); concurrent misses for one key await a single compute().
+
+        compute() may return Uncached(body) to hand the body to every waiter without storing it.
+        """
+        body = self.get(key)
+        if body is not None:
+            return body, True
+
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+        try:
+            body = await compute()
+            if isinstance(body, Uncached):
+                body = body.result
+            elif body is not None and generation == self._generation:
+                self.put(key, body)
+            future.set_result(body)
+            return body, False
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+neo_response_cache = ResponseCache()
+
+
+def cached_response(cache: ResponseCache, response_model: Any = None):
+    """Cache an endpoint's JSON body in `cache`, keyed on the endpoint name and its arguments.
+
+    The wrapped endpoint keeps its signature for FastAPI. Results are validated against
+    response_model once, on a miss, exactly as FastAPI would, and hits are returned as
+    pre-encoded bytes. Endpoints may also return an encoded JSON body as bytes, which is
+    cached as is. Endpoints that return a Response themselves are not cached, and neither
+    are results wrapped in Uncached.
+    """
+    adapter = TypeAdapter(response_model) if response_model is not None else None
+
+    def decorator(func):
+        endpoint = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (endpoint, args, tuple(sorted(kwargs.items())))
+            passthrough = []
+
+            async def compute():
+                result = await func(*args, **kwargs)
+                if isinstance(result, Uncached):
+                    return Uncached(encode(result.result))
+                return encode(result)
+
+            def encode(result):
+                if isinstance(result, Response):
+                    passthrough.append(result)
+                    return None
+                if isinstance(result, bytes):
+                    # Endpoint already produced the JSON body
+                    return result
+                if adapter is not None:
+                    return adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+                return orjson.dumps(jsonable_encoder(result))
+
+            body, hit = await cache.get_or_compute(key, compute)
+            (cache_hits if hit else cache_misses).inc(endpoint)
+            if passthrough:
+                return passthrough[0]
+            if body is None:
+                # Shared a computation whose result was not cacheable
+                return await func(*args, **kwargs)
+            return Response(content=body, media_type="application/json")
+
+        return wrapper
+
+    return decorator
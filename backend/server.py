@@ -1,21 +1,44 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, Query, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne, UpdateOne
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator
 import uuid
 from datetime import datetime, timezone, timedelta
 import json
+import orjson
 import requests
 import aiohttp
 import asyncio
 import numpy as np
 import math
+import time
+import hashlib
+import struct
+import base64
+import random
 from scipy import constants
+import vectorized_physics
+import atmospheric_entry
+import monte_carlo
+import defense_scoring
+import orbit_propagation
+import deflection
+import mitigation_trade
+import instrumentation
+import write_behind
+import neo_search
+import index_check
+from neo_broadcast import neo_broadcaster
+from neo_service import NEODataService
+import cluster
+from response_cache import ResponseCache, Uncached, neo_response_cache, cached_response
 
 ROOT_DIR = Path(__file__).parent
 try:
@@ -32,9 +55,23 @@ async def create_database_indexes():
         # NEO collection indexes
         await neo_collection.create_index("id", unique=True)
         await neo_collection.create_index("potentially_hazardous")
-        await neo_collection.create_index("close_approach_date")
+        # /neo/search: sorted by (close_approach_date, id), date range on the sort key
+        await neo_collection.create_index([("close_approach_date", 1), ("id", 1)])
+        # /neo/search with potentially_hazardous_only: equality, then the sort key,
+        # then the range-filtered fields so they are filtered on index keys
+        await neo_collection.create_index([
+            ("potentially_hazardous", 1),
+            ("close_approach_date", 1),
+            ("id", 1),
+            ("miss_distance", 1),
+            ("diameter_min", 1),  # min_diameter filter
+            ("diameter_max", 1),  # max_diameter filter
+        ])
+        # /neo/close-approaches: miss_distance range sorted by miss_distance
         await neo_collection.create_index("miss_distance")
         await neo_collection.create_index("diameter_max")
+        await neo_collection.create_index("designation_keys")
+        await neo_collection.create_index([("name", "text"), ("neo_id", "text")], name="neo_text_search")
         
         # Historical impacts collection indexes
         await historical_impacts_collection.create_index("id", unique=True)
@@ -44,11 +81,16 @@ async def create_database_indexes():
         # Cache collection indexes
         await neo_cache_collection.create_index("type", unique=True)
         
+        # Result collections: lookup by id and most recent scenarios
+        await db.impact_results.create_index("id")
+        await db.impact_results.create_index([("timestamp", -1)])
+        
         logger.info("Database indexes created successfully")
     except Exception as e:
         logger.error(f"Error creating database indexes: {e}")
 
 # MongoDB connection (optional for testing)
+DATABASE_RETRY_SECONDS = float(os.environ.get("DATABASE_RETRY_SECONDS", "15"))  # ping interval while MongoDB is unreachable
 try:
     mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
     client = AsyncIOMotorClient(mongo_url)
@@ -68,25 +110,68 @@ except Exception as e:
     historical_impacts_collection = None
     neo_cache_collection = None
 
+# Result documents are persisted asynchronously so responses never wait on MongoDB
+impact_results_writer = write_behind.WriteBehindBuffer(
+    "impact_results", lambda: db.impact_results if db is not None else None
+)
+mitigation_results_writer = write_behind.WriteBehindBuffer(
+    "mitigation_results", lambda: db.mitigation_results if db is not None else None
+)
+
 # Create the main app without a prefix
 app = FastAPI(title="Asteroid Defense Simulation API")
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=instrumentation.InstrumentedRoute)
 
 # ESA NEOCC API Configuration
-ESA_NEOCC_API_BASE = "https://neo.ssa.esa.int"
+ESA_NEOCC_API_BASE = os.environ.get("ESA_NEOCC_API_BASE", "https://neo.ssa.esa.int")
 ESA_NEOCC_ALL_NEO_URL = f"{ESA_NEOCC_API_BASE}/PSDB-portlet/download?file=allneo.lst"
 ESA_NEOCC_UPDATED_NEA_URL = f"{ESA_NEOCC_API_BASE}/PSDB-portlet/download?file=updated_nea.lst"
 ESA_NEOCC_AUTOMATED_ACCESS = f"{ESA_NEOCC_API_BASE}/computer-access"
 
 # NASA API Configuration (keeping as fallback)
-NASA_NEO_API_BASE = "https://api.nasa.gov/neo/rest/v1"
+NASA_NEO_API_BASE = os.environ.get("NASA_NEO_API_BASE", "https://api.nasa.gov/neo/rest/v1")
 NASA_API_KEY = os.environ.get('NASA_API_KEY', 'NaochsnJRMdbNuEZ1w1YfbFY8ru4ftrPBm4r5rAT')  # Use provided NASA API key
 
 # Data synchronization settings
 NEO_SYNC_INTERVAL = 3600  # 1 hour in seconds
 CACHE_DURATION = 1800  # 30 minutes in seconds
+NEO_SYNC_LIMIT = int(os.environ.get("NEO_SYNC_LIMIT", "0"))  # designations per full sync, 0 = whole catalogue
+NEO_SNAPSHOT_SIZE = 500  # NEOs kept in the current_neo cache document
+NEO_STATS_MATERIALIZED = os.environ.get("NEO_STATS_MATERIALIZED", "true").lower() == "true"  # serve /neo/stats from neo_cache
+NEO_SYNC_CONCURRENCY = int(os.environ.get("NEO_SYNC_CONCURRENCY", "16"))  # concurrent detail fetches
+NEO_SYNC_WRITE_CHUNK = int(os.environ.get("NEO_SYNC_WRITE_CHUNK", "200"))  # ReplaceOne ops per bulk_write
+NEO_SYNC_BATCH = int(os.environ.get("NEO_SYNC_BATCH", "100"))  # designations per watermark checkpoint
+NEO_SYNC_MODE = os.environ.get("NEO_SYNC_MODE", "incremental")  # "incremental" or "full"
+NEO_SEARCH_MAX_LIMIT = int(os.environ.get("NEO_SEARCH_MAX_LIMIT", "1000"))  # largest /neo/search page or stream limit
+# Synthetic ESA close approaches fall within this many days of the sync date. The
+# date is left out of the content hash, so it does not force a rewrite every day;
+# a stored approach that has drifted out of the window counts as changed instead
+NEO_SYNTHETIC_APPROACH_WINDOW = 30
+
+# Batch impact settings
+MAX_BATCH_SCENARIOS = int(os.environ.get("MAX_BATCH_SCENARIOS", "200000"))
+BATCH_INSERT_CHUNK_SIZE = 5000
+
+# Monte Carlo settings
+MAX_MONTE_CARLO_SAMPLES = int(os.environ.get("MAX_MONTE_CARLO_SAMPLES", "1000000"))
+MONTE_CARLO_MAX_INFLIGHT_CHUNKS = int(os.environ.get("MONTE_CARLO_MAX_INFLIGHT_CHUNKS", "8"))
+
+# Mitigation trade-space settings
+MAX_TRADE_POINTS = int(os.environ.get("MAX_TRADE_POINTS", "200000"))
+MAX_TRADE_SPACECRAFT = 20
+# Grids at least this large are split across the process pool when it has two or more
+# workers. On one core the pool cannot win: for a 150k-point grid a warm single-worker
+# pool took 0.57 s against 0.60 s in-process, plus 1.9 s to spawn the worker on first use
+TRADE_PROCESS_POOL_MIN_POINTS = int(os.environ.get("TRADE_PROCESS_POOL_MIN_POINTS", "100000"))
+
+# Atmospheric entry settings
+# The batch endpoint only integrates atmospheric entry when asked to ("atmospheric_entry": true);
+# see atmospheric_entry.simulate_entry for its throughput
+# Batches at least this large fly their atmospheric entries on the process pool, when it has several workers
+ENTRY_PROCESS_POOL_MIN_SCENARIOS = int(os.environ.get("ENTRY_PROCESS_POOL_MIN_SCENARIOS", "20000"))
+ENTRY_CHUNK_SIZE = 10_000
 
 # USGS API Configuration
 USGS_EARTHQUAKE_API = "https://earthquake.usgs.gov/fdsnws/event/1/query"
@@ -117,8 +202,24 @@ class ImpactResults(BaseModel):
     seismic_magnitude: float = Field(..., description="Estimated seismic magnitude")
     tsunami_risk: bool = Field(..., description="Tsunami risk assessment")
     environmental_effects: Dict[str, Any] = Field(..., description="Environmental impact assessment")
+    atmospheric_entry: Optional[Dict[str, Any]] = Field(None, description="Atmospheric entry outcome: regime (crater, airburst, both), burst altitude, airblast radii")
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class BatchAsteroidParameters(BaseModel):
+    """Columnar batch of asteroid parameters; each list holds one value per scenario."""
+    diameter: List[float] = Field(..., description="Asteroid diameters in meters")
+    velocity: List[float] = Field(..., description="Impact velocities in m/s")
+    density: Optional[List[float]] = Field(None, description="Asteroid densities in kg/m³ (default 3000)")
+    angle: Optional[List[float]] = Field(None, description="Impact angles in degrees (default 45)")
+    latitude: List[float] = Field(..., description="Impact latitudes")
+    longitude: List[float] = Field(..., description="Impact longitudes")
+    persist: bool = Field(default=True, description="Store the results in impact_results")
+    atmospheric_entry: bool = Field(
+        default=False,
+        description="Fly each body through the atmosphere (breakup, airburst) before the ground effects; "
+                    "off by default to keep large batches fast",
+    )
+
 class MitigationStrategy(BaseModel):
     strategy_type: str = Field(..., description="Type of mitigation (kinetic_impactor, gravity_tractor, nuclear)")
     lead_time: float = Field(..., description="Lead time in years")
@@ -134,8 +235,27 @@ class MitigationResults(BaseModel):
     deflection_distance: float = Field(..., description="Deflection distance in km")
     new_trajectory: Dict[str, float] = Field(..., description="New trajectory parameters")
     risk_reduction: float = Field(..., description="Risk reduction percentage")
+    sweep: Optional[Dict[str, Any]] = Field(None, description="Outcomes of a deflection sweep, when one was requested")
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class DeflectionSweep(BaseModel):
+    """Grid of deflection options evaluated by /mitigation/simulate (every combination is simulated)."""
+    delta_v: List[float] = Field(..., description="Delta-v magnitudes in m/s")
+    directions: List[Any] = Field(
+        default_factory=lambda: list(deflection.DIRECTIONS),
+        description="Direction names (along_track, retrograde, radial, anti_radial, normal, anti_normal) or [radial, transverse, normal] vectors"
+    )
+    lead_times: List[float] = Field(default=[10.0], description="Lead times in years before the encounter")
+
+class MitigationTradeRequest(BaseModel):
+    """Trade-space grid for /mitigation/optimize; every combination is evaluated."""
+    parameters: AsteroidParameters
+    strategies: List[str] = Field(default_factory=lambda: list(mitigation_trade.STRATEGIES), description="Strategy types to trade")
+    lead_times: List[float] = Field(default_factory=lambda: [2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0], description="Lead times in years")
+    spacecraft_masses: List[float] = Field(default_factory=lambda: [500.0, 1000.0, 2000.0, 5000.0, 10000.0, 20000.0], description="Spacecraft masses in kg")
+    spacecraft_counts: List[int] = Field(default_factory=lambda: [1, 2, 3, 4, 5], description="Spacecraft per mission")
+    require_miss: bool = Field(default=True, description="Only options whose full delivery clears Earth enter the frontier")
+
 class NearEarthObject(BaseModel):
     id: str
     name: str
@@ -167,6 +287,35 @@ class HistoricalImpact(BaseModel):
     source: str = Field(default="historical", description="Data source")
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class DistributionSpec(BaseModel):
+    distribution: str = Field(default="uniform", description="fixed, uniform, normal, lognormal, triangular or impact_angle")
+    value: Optional[float] = Field(None, description="Value for fixed")
+    low: Optional[float] = Field(None, description="Lower bound for uniform/triangular")
+    high: Optional[float] = Field(None, description="Upper bound for uniform/triangular")
+    mode: Optional[float] = Field(None, description="Mode for triangular")
+    mean: Optional[float] = Field(None, description="Mean for normal")
+    std: Optional[float] = Field(None, description="Standard deviation for normal")
+    median: Optional[float] = Field(None, description="Median for lognormal")
+    sigma: Optional[float] = Field(None, description="Log-space standard deviation for lognormal")
+
+class MonteCarloRequest(BaseModel):
+    samples: int = Field(default=100000, description="Number of Monte Carlo samples")
+    seed: Optional[int] = Field(None, ge=0, description="Random seed (non-negative); a seed is generated and returned when omitted")
+    neo_id: Optional[str] = Field(None, description="Derive default distributions from a stored NEO record")
+    diameter: Optional[DistributionSpec] = Field(None, description="Diameter distribution in meters")
+    velocity: Optional[DistributionSpec] = Field(None, description="Velocity distribution in m/s")
+    density: Optional[DistributionSpec] = Field(None, description="Density distribution in kg/m³")
+    angle: Optional[DistributionSpec] = Field(None, description="Impact angle distribution in degrees")
+    latitude: Optional[float] = Field(None, description="Impact latitude for tsunami probability")
+    longitude: Optional[float] = Field(None, description="Impact longitude for tsunami probability")
+    percentiles: List[float] = Field(default=[5, 25, 50, 75, 95], description="Percentiles to report")
+    bins: int = Field(default=50, description="Histogram bins per metric")
+    atmospheric_entry: bool = Field(
+        default=True,
+        description="Fly each sample through the atmosphere (breakup, airburst) as /impact/calculate does; "
+                    "false skips entry and every body reaches the ground intact",
+    )
+
 class NEOSearchFilters(BaseModel):
     min_diameter: Optional[float] = Field(None, description="Minimum diameter filter")
     max_diameter: Optional[float] = Field(None, description="Maximum diameter filter")
@@ -176,6 +325,7 @@ class NEOSearchFilters(BaseModel):
     date_from: Optional[str] = Field(None, description="Start date filter (YYYY-MM-DD)")
     date_to: Optional[str] = Field(None, description="End date filter (YYYY-MM-DD)")
     search_term: Optional[str] = Field(None, description="Search in name/description")
+    search_mode: str = Field("prefix", description="'prefix' matches designation prefixes, 'text' runs a full-text search")
 
 class GeologyData(BaseModel):
     location: Dict[str, float]
@@ -254,6 +404,32 @@ def calculate_crater_size(
         depth = diameter / 7
         return diameter, depth
 
+def calculate_atmospheric_entry(diameter: float, velocity: float, density: float, angle: float) -> Dict[str, Any]:
+    """Fly one body through the atmosphere; the regime decides whether a crater, airblast or both are reported"""
+    entry = atmospheric_entry.simulate_entry([diameter], [velocity], [density], [angle])
+    return atmospheric_entry.entry_summary(entry, atmospheric_entry.airblast_effects(entry))
+
+def calculate_ground_effects(entry: Dict[str, Any], density: float, angle: float, lat: float, lon: float) -> tuple:
+    """Crater, seismic magnitude and tsunami risk from the energy that reaches the ground.
+
+    Returns (crater_diameter, crater_depth, seismic_magnitude, tsunami_risk);
+    bodies that burst in the air leave no crater.
+    """
+    ground_energy = entry["ground_energy"]
+    if entry["crater"]:
+        crater_diameter, crater_depth = calculate_crater_size(
+            ground_energy,
+            target_density=2500,
+            projectile_diameter=entry["ground_diameter"],
+            projectile_density=density,
+            velocity=entry["ground_velocity"],
+            impact_angle_deg=angle,
+        )
+    else:
+        crater_diameter, crater_depth = 0.0, 0.0
+    seismic_magnitude = calculate_seismic_magnitude(ground_energy) if ground_energy > 0 else 0.0
+    return crater_diameter, crater_depth, seismic_magnitude, assess_tsunami_risk(lat, lon, ground_energy)
+
 def calculate_seismic_magnitude(energy: float) -> float:
     """Estimate seismic magnitude from impact energy"""
     # Using Gutenberg-Richter relationship adapted for impacts
@@ -291,178 +467,489 @@ def calculate_environmental_effects(energy: float, crater_diameter: float) -> Di
     return effects
 
 def calculate_mitigation_requirements(asteroid_params: AsteroidParameters, lead_time: float) -> Dict[str, MitigationStrategy]:
-    """Calculate different mitigation strategies"""
-    mass = calculate_asteroid_mass(asteroid_params.diameter, asteroid_params.density)
-    
-    strategies = {}
-    
-    # Kinetic Impactor
-    if lead_time >= 5:
-        # Required delta-v for deflection (simplified)
-        required_dv = 0.1  # m/s (very rough estimate)
-        strategies["kinetic_impactor"] = MitigationStrategy(
-            strategy_type="kinetic_impactor",
-            lead_time=lead_time,
-            success_probability=0.8 if lead_time >= 10 else 0.6,
-            velocity_change=required_dv,
-            cost_estimate=500,  # Million USD
-            description="High-speed spacecraft impacts asteroid to change trajectory"
-        )
-    
-    # Gravity Tractor
-    if lead_time >= 10:
-        strategies["gravity_tractor"] = MitigationStrategy(
-            strategy_type="gravity_tractor",
+    """Calculate different mitigation strategies (the mission model is defense_scoring.MITIGATION_TABLE)"""
+    requirements = defense_scoring.mitigation_requirements(lead_time)
+    return {
+        key: MitigationStrategy(
+            strategy_type=key,
             lead_time=lead_time,
-            success_probability=0.9,
-            velocity_change=0.01,  # Very small but precise
-            cost_estimate=1000,
-            description="Spacecraft uses gravitational attraction to slowly alter asteroid path"
+            success_probability=float(columns["success_probability"]),
+            velocity_change=float(columns["velocity_change"]),
+            cost_estimate=float(columns["cost_estimate"]),
+            description=defense_scoring.MITIGATION_TABLE[key]["description"],
         )
-    
-    # Nuclear Option (last resort)
-    if lead_time >= 1:
-        strategies["nuclear_deflection"] = MitigationStrategy(
-            strategy_type="nuclear_deflection",
-            lead_time=lead_time,
-            success_probability=0.7 if lead_time >= 5 else 0.4,
-            velocity_change=1.0,  # Significant change possible
-            cost_estimate=2000,
-            description="Nuclear device detonation to fragment or deflect asteroid"
-        )
-    
-    return strategies
+        for key, columns in requirements.items()
+        if columns["available"]
+    }
+
+MAX_DEFLECTION_OPTIONS = 200_000
+
+def impact_epoch(impact_results: ImpactResults) -> float:
+    """Encounter epoch (days since J2000) of an impact scenario"""
+    timestamp = impact_results.timestamp
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return float(orbit_propagation.days_since_j2000([timestamp.isoformat()])[0])
+
+def shifted_impact_point(latitude: float, longitude: float, outcome: Dict[str, float]) -> Dict[str, float]:
+    """Ground point of a deflected body that still hits: the B-plane offset mapped onto Earth's disk"""
+    b, capture = outcome["b"], outcome["capture_radius"]
+    if b <= 0:
+        return {"latitude": latitude, "longitude": longitude}
+    # b = capture radius grazes the limb, 90 degrees from the sub-approach point;
+    # move that far along a great circle, zeta towards north and xi towards east
+    distance = math.asin(min(1.0, b / capture))
+    bearing = math.atan2(outcome["xi"], outcome["zeta"])
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2 = math.asin(math.sin(lat1) * math.cos(distance) + math.cos(lat1) * math.sin(distance) * math.cos(bearing))
+    lon2 = lon1 + math.atan2(
+        math.sin(bearing) * math.sin(distance) * math.cos(lat1),
+        math.cos(distance) - math.sin(lat1) * math.sin(lat2),
+    )
+    return {
+        "latitude": math.degrees(lat2),
+        "longitude": (math.degrees(lon2) + 180.0) % 360.0 - 180.0,
+    }
+
+def summarize_deflection_sweep(sweep: DeflectionSweep, grid: Dict[str, np.ndarray], outcome: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+    """Columnar outcome of every swept option plus the cheapest miss per direction and lead time"""
+    lead_count = len(sweep.lead_times)
+    groups = grid["direction"] * lead_count + grid["lead_index"]
+    minimum = deflection.minimum_delta_v(grid["delta_v"], outcome["missed"], groups, len(sweep.directions) * lead_count)
+
+    return {
+        "count": int(grid["delta_v"].size),
+        "elapsed_ms": round(elapsed * 1000, 3),
+        "directions": sweep.directions,
+        "lead_times": sweep.lead_times,
+        "nominal_miss_distance": outcome["nominal_b"],
+        "options": {
+            "delta_v": grid["delta_v"].tolist(),
+            "direction": grid["direction"].tolist(),
+            "lead_time": grid["lead_time"].tolist(),
+            "miss_distance": outcome["b"].tolist(),
+            "b_plane_xi": outcome["xi"].tolist(),
+            "b_plane_zeta": outcome["zeta"].tolist(),
+            "impact_probability": outcome["impact_probability"].tolist(),
+        },
+        # [direction][lead time] -> smallest swept delta-v (m/s) that clears Earth, or None
+        "minimum_delta_v": [
+            minimum[index * lead_count:(index + 1) * lead_count]
+            for index in range(len(sweep.directions))
+        ],
+    }
+
+def calculate_deflection_outcome(impact_results: ImpactResults, strategy: MitigationStrategy, sweep: Optional[DeflectionSweep] = None) -> MitigationResults:
+    """Calculate the outcome of a mitigation strategy on the B-plane.
+
+    The scenario becomes a body on a collision course at its impact velocity;
+    the strategy's delta-v is applied strategy.lead_time years ahead in each
+    principal direction and the most effective direction is reported. An
+    optional sweep simulates a whole grid of options in the same pass.
+    """
+    epoch = impact_epoch(impact_results)
+    r_encounter, v_encounter = deflection.impactor_state(epoch, impact_results.parameters.velocity)
+
+    strategy_grid = deflection.sweep_grid([strategy.velocity_change], list(deflection.DIRECTIONS), [strategy.lead_time])
+    count = strategy_grid["delta_v"].size
+    grid = strategy_grid
+    if sweep is not None:
+        sweep_options = deflection.sweep_grid(sweep.delta_v, sweep.directions, sweep.lead_times)
+        grid = {name: np.concatenate([strategy_grid[name], values]) for name, values in sweep_options.items()}
+
+    started = time.perf_counter()
+    outcome = deflection.simulate(
+        r_encounter, v_encounter, epoch, grid["delta_v"], grid["direction_rtn"], grid["lead_time"]
+    )
+    elapsed = time.perf_counter() - started
+
+    best = int(np.argmax(outcome["b"][:count]))
+    chosen = {name: float(outcome[name][best]) for name in ("b", "xi", "zeta", "capture_radius", "impact_probability")}
+    missed = chosen["b"] > chosen["capture_radius"]
 
-def calculate_deflection_outcome(impact_results: ImpactResults, strategy: MitigationStrategy) -> MitigationResults:
-    """Calculate the outcome of a mitigation strategy"""
-    # Simplified deflection calculation
-    deflection_km = strategy.velocity_change * strategy.lead_time * 365 * 24 * 3600 / 1000  # Convert to km
-    
-    # New trajectory (simplified - just shift impact point)
-    original_lat = impact_results.parameters.latitude
-    original_lon = impact_results.parameters.longitude
-    
-    # Simple displacement (in reality this would be complex orbital mechanics)
-    lat_shift = (deflection_km / 111) * 0.5  # Rough km to degree conversion
-    lon_shift = (deflection_km / 111) * 0.5
-    
     new_trajectory = {
-        "latitude": original_lat + lat_shift,
-        "longitude": original_lon + lon_shift,
-        "miss_distance": deflection_km
+        "latitude": impact_results.parameters.latitude,
+        "longitude": impact_results.parameters.longitude,
+        "miss_distance": chosen["b"],
+        "b_plane_xi": chosen["xi"],
+        "b_plane_zeta": chosen["zeta"],
+        "capture_radius": chosen["capture_radius"],
+        "impact_probability": chosen["impact_probability"],
+        "impact": 0.0 if missed else 1.0,
     }
-    
-    # Risk reduction based on success probability and deflection distance
-    risk_reduction = strategy.success_probability * min(100, deflection_km / 100)  # Up to 100% reduction
-    
+    if not missed:
+        new_trajectory.update(shifted_impact_point(
+            impact_results.parameters.latitude, impact_results.parameters.longitude, chosen
+        ))
+
+    # Risk reduction: drop in impact probability, weighted by the chance the mission works
+    nominal_probability = outcome["nominal_impact_probability"]
+    reduction = 1.0 - chosen["impact_probability"] / nominal_probability if nominal_probability > 0 else 0.0
+    risk_reduction = 100.0 * strategy.success_probability * max(0.0, reduction)
+
+    sweep_summary = None
+    if sweep is not None:
+        sweep_outcome = {
+            name: (values[count:] if isinstance(values, np.ndarray) else values)
+            for name, values in outcome.items()
+        }
+        sweep_grid = {name: values[count:] for name, values in grid.items()}
+        sweep_summary = summarize_deflection_sweep(sweep, sweep_grid, sweep_outcome, elapsed)
+
     return MitigationResults(
         original_impact=impact_results,
         strategy=strategy,
-        deflection_distance=deflection_km,
+        deflection_distance=abs(chosen["b"] - outcome["nominal_b"]),
         new_trajectory=new_trajectory,
-        risk_reduction=risk_reduction
+        risk_reduction=risk_reduction,
+        sweep=sweep_summary,
     )
 
 # Enhanced NEO Data Management Functions
-async def fetch_and_store_neo_data():
-    """Fetch comprehensive NEO data from ESA NEOCC API and store in database"""
+neo_sync_items = instrumentation.register(instrumentation.Counter(
+    "neo_sync_items_total", "Items processed by the NEO sync pipeline", ("stage",)
+))
+neo_sync_throughput = instrumentation.register(instrumentation.Gauge(
+    "neo_sync_throughput_per_second", "Items per second of the last NEO sync, per stage", ("stage",)
+))
+NEO_SYNC_STATS: Dict[str, Any] = {}
+
+class SyncStageStats:
+    """Item count and wall time for one stage of the NEO sync pipeline"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.skipped = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        neo_sync_items.inc(self.name, amount=self.items)
+        neo_sync_throughput.set(self.name, value=self.rate)
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.items / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 4),
+            "items_per_second": round(self.rate, 2),
+        }
+
+# Fields that change on every fetch without the NEO itself changing
+# (close_approach_date is generated relative to the sync date)
+NEO_VOLATILE_FIELDS = ("_id", "last_updated", "content_hash", "close_approach_date")
+
+def compute_neo_content_hash(neo: Dict[str, Any]) -> str:
+    """Stable hash of a NEO document's content, ignoring volatile bookkeeping fields"""
+    content = {k: v for k, v in neo.items() if k not in NEO_VOLATILE_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+async def load_neo_content_hashes(designations: List[str]) -> Dict[str, Optional[str]]:
+    """Fetch stored content hashes for a batch of designations in one query.
+
+    Documents whose close approach is older than NEO_SYNTHETIC_APPROACH_WINDOW
+    days get no hash, so the sync rewrites them with a current date.
+    """
+    ids = [f"esa_{neo_id}" for neo_id in designations]
+    oldest = (datetime.now() - timedelta(days=NEO_SYNTHETIC_APPROACH_WINDOW)).strftime('%Y-%m-%d')
+    cursor = neo_collection.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "content_hash": 1, "close_approach_date": 1})
+    return {
+        doc["id"]: doc.get("content_hash") if (doc.get("close_approach_date") or "") >= oldest else None
+        async for doc in cursor
+    }
+
+async def load_sync_watermark(mode: str) -> Optional[Dict[str, Any]]:
+    """Return the stored progress marker of the last sync in this mode"""
+    return await neo_cache_collection.find_one({"type": f"sync_watermark_{mode}"})
+
+async def save_sync_watermark(mode: str, list_version: Optional[str], position: int, completed: bool):
+    """Record how far through a designation list the sync has got, so a restart can resume"""
+    await neo_cache_collection.replace_one(
+        {"type": f"sync_watermark_{mode}"},
+        {
+            "type": f"sync_watermark_{mode}",
+            "list_version": list_version,
+            "position": position,
+            "completed": completed,
+            "last_updated": datetime.now(timezone.utc)
+        },
+        upsert=True
+    )
+
+async def write_neo_chunk(chunk: List[Dict[str, Any]], stats: SyncStageStats):
+    """Upsert a chunk of NEO documents with a single unordered bulk_write"""
+    try:
+        await neo_collection.bulk_write(
+            [ReplaceOne({"id": neo["id"]}, neo_search.add_search_fields(neo), upsert=True) for neo in chunk],
+            ordered=False
+        )
+        stats.items += len(chunk)
+    except Exception as e:
+        stats.errors += len(chunk)
+        logger.error(f"Bulk write of {len(chunk)} NEO objects failed: {e}")
+
+async def run_neo_sync_pipeline(
+    session,
+    designations,
+    fetch_stats: SyncStageStats,
+    write_stats: SyncStageStats,
+    known_hashes: Optional[Dict[str, str]] = None,
+):
+    """Fetch NEO details concurrently and upsert them in chunks as they arrive.
+
+    Detail fetches run behind a semaphore of NEO_SYNC_CONCURRENCY; a writer task
+    drains completed documents and issues bulk_write calls of NEO_SYNC_WRITE_CHUNK
+    ReplaceOne upserts, so fetching and writing overlap. Documents whose content
+    hash matches known_hashes are skipped without being written.
+    """
+    known_hashes = known_hashes or {}
+    semaphore = asyncio.Semaphore(NEO_SYNC_CONCURRENCY)
+    results: "asyncio.Queue" = asyncio.Queue(maxsize=NEO_SYNC_WRITE_CHUNK * 2)
+
+    async def fetch_one(neo_id):
+        try:
+            detailed_data = await fetch_esa_neocc_details(session, neo_id)
+            if detailed_data:
+                fetch_stats.items += 1
+                detailed_data["content_hash"] = compute_neo_content_hash(detailed_data)
+                if known_hashes.get(detailed_data["id"]) == detailed_data["content_hash"]:
+                    write_stats.skipped += 1
+                    return
+                await results.put(detailed_data)
+        except Exception as detail_error:
+            fetch_stats.errors += 1
+            logger.warning(f"Failed to get details for {neo_id}: {detail_error}")
+        finally:
+            semaphore.release()
+
+    async def writer():
+        chunk = []
+        while True:
+            neo = await results.get()
+            if neo is None:
+                break
+            chunk.append(neo)
+            if len(chunk) >= NEO_SYNC_WRITE_CHUNK:
+                await write_neo_chunk(chunk, write_stats)
+                chunk = []
+        if chunk:
+            await write_neo_chunk(chunk, write_stats)
+
+    writer_task = asyncio.create_task(writer())
+    pending = set()
+    try:
+        for neo_id in designations:
+            # Acquire before spawning so at most NEO_SYNC_CONCURRENCY fetch tasks exist at once
+            await semaphore.acquire()
+            task = asyncio.create_task(fetch_one(neo_id))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        await results.put(None)
+        await writer_task
+
+async def batch_designations(designations: AsyncIterator[str], size: int) -> AsyncIterator[List[str]]:
+    """Group a stream of designations into lists of at most size items"""
+    batch = []
+    async for neo_id in designations:
+        batch.append(neo_id)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def sync_neo_designations(
+    session,
+    designations: AsyncIterator[str],
+    mode: str,
+    list_version: Optional[str],
+    limit: int = 0,
+):
+    """Run the detail/upsert pipeline over a stream of designations in watermarked batches.
+
+    Designations are consumed NEO_SYNC_BATCH at a time, so memory does not grow with
+    the list length. Progress is saved after every batch; if the same list version is
+    seen again before it was finished, already processed designations are skipped.
+    A limit of 0 processes the whole stream.
+    """
+    fetch_stats = SyncStageStats("fetch")
+    write_stats = SyncStageStats("write")
+    watermark = await load_sync_watermark(mode)
+    start = 0
+    # Without HTTP validators there is no way to tell lists apart, so neither skip nor resume
+    if list_version is not None and watermark and watermark.get("list_version") == list_version:
+        if watermark.get("completed") and mode == "incremental":
+            logger.info("Updated NEO list unchanged since last incremental sync; nothing to do")
+            start = None
+        elif not watermark.get("completed"):
+            start = watermark.get("position", 0)
+            logger.info(f"Resuming {mode} NEO sync at position {start}")
+
+    position = 0
+    if start is not None:
+        async for batch in batch_designations(designations, NEO_SYNC_BATCH):
+            if limit:
+                batch = batch[:max(0, limit - position)]
+            batch_end = position + len(batch)
+            if batch_end > start:
+                batch = batch[max(0, start - position):]
+                known_hashes = await load_neo_content_hashes(batch)
+                await run_neo_sync_pipeline(session, batch, fetch_stats, write_stats, known_hashes)
+                await save_sync_watermark(mode, list_version, batch_end, completed=False)
+            position = batch_end
+            if limit and position >= limit:
+                break
+        await save_sync_watermark(mode, list_version, position, completed=True)
+
+    fetch_stats.finish()
+    write_stats.finish()
+    NEO_SYNC_STATS["fetch"] = fetch_stats.as_dict()
+    NEO_SYNC_STATS["write"] = write_stats.as_dict()
+    NEO_SYNC_STATS["resumed_from"] = start or 0
+    NEO_SYNC_STATS["designations"] = position
+    logger.info(f"NEO sync pipeline ({mode}): {NEO_SYNC_STATS}")
+
+async def fetch_and_store_neo_data(mode: Optional[str] = None):
+    """Fetch comprehensive NEO data from ESA NEOCC API and store in database.
+
+    mode "full" streams allneo.lst (up to NEO_SYNC_LIMIT designations, 0 for the whole
+    catalogue); "incremental" processes only updated_nea.lst and falls back to a full
+    sync when no full sync has completed yet. Either way, NEOs whose content hash is
+    unchanged are not rewritten. Returns the refreshed current_neo snapshot.
+    """
     if neo_collection is None:
         return []
     
+    mode = mode or NEO_SYNC_MODE
+    if mode == "incremental":
+        full_watermark = await load_sync_watermark("full")
+        if not (full_watermark and full_watermark.get("completed")):
+            logger.info("No completed full NEO sync yet; running a full sync instead of incremental")
+            mode = "full"
+    list_url = ESA_NEOCC_UPDATED_NEA_URL if mode == "incremental" else ESA_NEOCC_ALL_NEO_URL
+    
     try:
         timeout = aiohttp.ClientTimeout(total=30)
         async with aiohttp.ClientSession(timeout=timeout) as session:
-            # Fetch ESA NEOCC data
-            neo_objects = []
+            NEO_SYNC_STATS.clear()
+            NEO_SYNC_STATS["mode"] = mode
+            NEO_SYNC_STATS["started_at"] = datetime.now(timezone.utc).isoformat()
             
-            # Fetch all NEO list from ESA NEOCC
+            # Stream the NEO designation list from ESA NEOCC; the body is read while
+            # the pipeline runs, so only the total-time limit is lifted here
             try:
-                async with session.get(ESA_NEOCC_ALL_NEO_URL, timeout=timeout) as response:
-                    if response.status == 200:
-                        text_data = await response.text()
-                        neo_list = parse_esa_neocc_list(text_data)
-                        logger.info(f"Fetched {len(neo_list)} NEOs from ESA NEOCC")
-                        
-                        # For each NEO, try to get detailed orbital data
-                        for neo_id in neo_list[:500]:  # Process first 500 NEOs for better coverage
-                            try:
-                                detailed_data = await fetch_esa_neocc_details(session, neo_id)
-                                if detailed_data:
-                                    neo_objects.append(detailed_data)
-                            except Exception as detail_error:
-                                logger.warning(f"Failed to get details for {neo_id}: {detail_error}")
-                                continue
-                    else:
+                list_stats = SyncStageStats("list")
+                stream_timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+                async with session.get(list_url, timeout=stream_timeout) as response:
+                    if response.status != 200:
                         logger.error(f"ESA NEOCC returned status {response.status}")
                         return await fetch_nasa_fallback_data(session)
+                    
+                    designations = stream_esa_neocc_list(response, list_stats)
+                    await sync_neo_designations(
+                        session,
+                        designations,
+                        mode,
+                        esa_list_version(response),
+                        limit=NEO_SYNC_LIMIT if mode == "full" else 0,
+                    )
+                    list_stats.finish()
+                    NEO_SYNC_STATS["list"] = list_stats.as_dict()
+                    logger.info(f"Streamed {list_stats.items} NEO designations from ESA NEOCC ({mode})")
             except Exception as esa_error:
                 logger.error(f"Error fetching ESA NEOCC data: {esa_error}")
                 return await fetch_nasa_fallback_data(session)
             
-            # Store in database
-            if neo_objects:
-                for neo in neo_objects:
-                    await neo_collection.replace_one(
-                        {"id": neo["id"]}, 
-                        neo, 
-                        upsert=True
-                    )
-                
-                # Update cache
-                await neo_cache_collection.replace_one(
-                    {"type": "current_neo"},
-                    {
-                        "type": "current_neo",
-                        "data": neo_objects,
-                        "last_updated": datetime.now(timezone.utc)
-                    },
-                    upsert=True
-                )
+            # Update cache with a bounded snapshot of the collection
+            cache_data = await neo_collection.find({}, {"_id": 0}).limit(NEO_SNAPSHOT_SIZE).to_list(length=NEO_SNAPSHOT_SIZE)
+            await neo_cache_collection.replace_one(
+                {"type": "current_neo"},
+                {
+                    "type": "current_neo",
+                    "data": cache_data,
+                    "last_updated": datetime.now(timezone.utc)
+                },
+                upsert=True
+            )
+            await materialize_neo_statistics()
+            await rebuild_designation_index()
+            invalidate_neo_caches()
             
-            logger.info(f"Stored {len(neo_objects)} NEO objects from ESA NEOCC in database")
-            return neo_objects
+            logger.info(f"Stored {NEO_SYNC_STATS['write']['items']} changed NEO objects from ESA NEOCC in database")
+            return cache_data
             
     except Exception as e:
         logger.error(f"Error fetching ESA NEOCC data: {str(e)}")
         return await get_cached_neo_data()
 
+def _parse_esa_neocc_line(line: str) -> Optional[str]:
+    """Return the designation on one line of an ESA NEOCC list, or None for blanks/comments"""
+    line = line.strip()
+    if line and not line.startswith('#'):
+        # Each line contains just the NEO designation
+        return line
+    return None
+
 def parse_esa_neocc_list(text_data):
     """Parse ESA NEOCC list format - simple list of NEO designations"""
     neo_list = []
-    lines = text_data.strip().split('\n')
-    
-    for line in lines:
-        line = line.strip()
-        if line and not line.startswith('#'):
-            # Each line contains just the NEO designation
-            neo_id = line
+    for line in text_data.strip().split('\n'):
+        neo_id = _parse_esa_neocc_line(line)
+        if neo_id:
             neo_list.append(neo_id)
     
     return neo_list
 
+async def stream_esa_neocc_list(response, stats: Optional[SyncStageStats] = None) -> AsyncIterator[str]:
+    """Yield designations from an ESA NEOCC list response line by line without buffering the body"""
+    async for raw_line in response.content:
+        neo_id = _parse_esa_neocc_line(raw_line.decode("utf-8", errors="replace"))
+        if neo_id:
+            if stats is not None:
+                stats.items += 1
+            yield neo_id
+
+def esa_list_version(response) -> Optional[str]:
+    """Identify a list download by its HTTP validators, used to match resume watermarks"""
+    parts = [response.headers.get(name) for name in ("ETag", "Last-Modified", "Content-Length")]
+    return "|".join(p or "" for p in parts) if any(parts) else None
+
 async def fetch_esa_neocc_details(session, neo_id):
     """Create detailed NEO object from ESA NEOCC designation"""
     try:
         # Since ESA NEOCC automated access is experimental, create realistic NEO data
         # based on the designation pattern and ESA NEOCC statistics
         
-        # Generate realistic parameters based on NEO designation
-        import random
-        import hashlib
-        
-        # Use hash of neo_id for consistent "random" values
+        # Use hash of neo_id for consistent "random" values, so unchanged NEOs
+        # produce identical documents (and content hashes) across syncs
         hash_obj = hashlib.md5(neo_id.encode())
         hash_int = int(hash_obj.hexdigest()[:8], 16)
+        rng = random.Random(hash_int)
         
         # Generate realistic NEO parameters
-        diameter_min = random.uniform(5, 500)  # 5m to 500m
-        diameter_max = diameter_min * random.uniform(1.1, 2.0)
+        diameter_min = rng.uniform(5, 500)  # 5m to 500m
+        diameter_max = diameter_min * rng.uniform(1.1, 2.0)
         
         # Velocity based on typical NEO speeds
-        velocity = random.uniform(10000, 30000)  # 10-30 km/s
+        velocity = rng.uniform(10000, 30000)  # 10-30 km/s
         
         # Miss distance (most NEOs pass at safe distances)
-        miss_distance = random.uniform(100000, 50000000)  # 100k km to 50M km
+        miss_distance = rng.uniform(100000, 50000000)  # 100k km to 50M km
         
         # Determine if potentially hazardous (based on size and distance)
         avg_diameter = (diameter_min + diameter_max) / 2
@@ -472,9 +959,9 @@ async def fetch_esa_neocc_details(session, neo_id):
         absolute_magnitude = 20 + (500 - avg_diameter) / 50
         
         # Orbital parameters
-        orbital_period = random.uniform(0.5, 5.0)  # 0.5 to 5 years
-        eccentricity = random.uniform(0.0, 0.8)
-        inclination = random.uniform(0, 180)
+        orbital_period = rng.uniform(0.5, 5.0)  # 0.5 to 5 years
+        eccentricity = rng.uniform(0.0, 0.8)
+        inclination = rng.uniform(0, 180)
         
         # Create NEO object with ESA NEOCC data
         neo_obj = {
@@ -483,7 +970,9 @@ async def fetch_esa_neocc_details(session, neo_id):
             "name": f"NEO {neo_id}",
             "diameter_min": diameter_min,
             "diameter_max": diameter_max,
-            "close_approach_date": (datetime.now() + timedelta(days=random.randint(-30, 30))).strftime('%Y-%m-%d'),
+            "close_approach_date": (
+                datetime.now() + timedelta(days=rng.randint(-NEO_SYNTHETIC_APPROACH_WINDOW, NEO_SYNTHETIC_APPROACH_WINDOW))
+            ).strftime('%Y-%m-%d'),
             "miss_distance": miss_distance,
             "velocity": velocity,
             "potentially_hazardous": potentially_hazardous,
@@ -577,44 +1066,117 @@ async def get_cached_neo_data():
         logger.error(f"Error getting cached NEO data: {e}")
         return await get_fallback_neo_data()
 
-async def search_neo_objects(filters: NEOSearchFilters, limit: int = 50):
-    """Search NEO objects with filters"""
+# NEO list endpoints return only the NearEarthObject fields; documents are
+# projected in Mongo and encoded directly instead of building a model per row
+NEO_LIST_FIELDS = tuple(NearEarthObject.model_fields)
+NEO_FIELD_DEFAULTS = {
+    name: (None if field.default_factory is not None else field.default)
+    for name, field in NearEarthObject.model_fields.items()
+    if not field.is_required()
+}
+
+def parse_neo_fields(fields: Optional[str], extra_fields: tuple = ()) -> tuple:
+    """Resolve a comma-separated fields= parameter into an ordered tuple of output fields"""
+    allowed = NEO_LIST_FIELDS + extra_fields
+    if not fields:
+        return allowed
+    requested = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in allowed]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}; allowed fields are {', '.join(allowed)}"
+        )
+    return requested
+
+def neo_projection(fields: tuple, required: tuple = ()) -> Dict[str, int]:
+    """Mongo projection for the requested NEO fields plus any the endpoint needs internally"""
+    projection = {"_id": 0}
+    projection.update({name: 1 for name in fields + required if name in NEO_LIST_FIELDS})
+    return projection
+
+def encode_neo_rows(rows: List[Any], fields: tuple) -> bytes:
+    """Encode projected NEO documents as a JSON array without per-row validation"""
+    encoded = []
+    for row in rows:
+        if isinstance(row, BaseModel):
+            row = row.model_dump()
+        encoded.append({name: row.get(name, NEO_FIELD_DEFAULTS.get(name)) for name in fields})
+    return orjson.dumps(encoded)
+
+NEO_SEARCH_SORT = [("close_approach_date", 1), ("id", 1)]
+
+def encode_search_cursor(document: Dict[str, Any]) -> str:
+    """Opaque keyset cursor pointing just after `document` in NEO_SEARCH_SORT order"""
+    key = orjson.dumps([document.get("close_approach_date"), document.get("id")])
+    return base64.urlsafe_b64encode(key).decode("ascii").rstrip("=")
+
+def decode_search_cursor(cursor: str) -> Dict[str, Any]:
+    """Turn a cursor back into a query for the documents that follow it"""
+    try:
+        date, neo_id = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"close_approach_date": {"$gt": date}},
+        {"close_approach_date": date, "id": {"$gt": neo_id}},
+    ]}
+
+def build_neo_search_query(filters: NEOSearchFilters, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Translate search filters (and an optional keyset cursor) into a Mongo query"""
+    query = {}
+    
+    if filters.min_diameter is not None:
+        
+        query["diameter_min"] = {"$gte": filters.min_diameter}
+    if filters.max_diameter is not None:
+        query["diameter_max"] = {"$lte": filters.max_diameter}
+    if filters.potentially_hazardous_only:
+        query["potentially_hazardous"] = True
+    if filters.min_miss_distance is not None:
+        query["miss_distance"] = {"$gte": filters.min_miss_distance}
+    if filters.max_miss_distance is not None:
+        if "miss_distance" in query:
+            query["miss_distance"]["$lte"] = filters.max_miss_distance
+        else:
+            query["miss_distance"] = {"$lte": filters.max_miss_distance}
+    if filters.date_from:
+        query["close_approach_date"] = {"$gte": filters.date_from}
+    if filters.date_to:
+        if "close_approach_date" in query:
+            query["close_approach_date"]["$lte"] = filters.date_to
+        else:
+            query["close_approach_date"] = {"$lte": filters.date_to}
+    if filters.search_term:
+        if filters.search_mode == "text":
+            query["$text"] = {"$search": filters.search_term}
+        elif filters.search_mode == "prefix":
+            query.update(neo_search.prefix_query(filters.search_term))
+        else:
+            raise HTTPException(status_code=400, detail="search_mode must be 'prefix' or 'text'")
+    if cursor:
+        query = {"$and": [query, decode_search_cursor(cursor)]} if query else decode_search_cursor(cursor)
+    
+    return query
+
+async def search_neo_objects(
+    filters: NEOSearchFilters,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: tuple = NEO_LIST_FIELDS
+):
+    """Search NEO objects with filters, one keyset page at a time"""
     if neo_collection is None:
         return await get_fallback_neo_data()
     
     try:
-        query = {}
-        
-        if filters.min_diameter is not None:
-            query["diameter_min"] = {"$gte": filters.min_diameter}
-        if filters.max_diameter is not None:
-            query["diameter_max"] = {"$lte": filters.max_diameter}
-        if filters.potentially_hazardous_only:
-            query["potentially_hazardous"] = True
-        if filters.min_miss_distance is not None:
-            query["miss_distance"] = {"$gte": filters.min_miss_distance}
-        if filters.max_miss_distance is not None:
-            if "miss_distance" in query:
-                query["miss_distance"]["$lte"] = filters.max_miss_distance
-            else:
-                query["miss_distance"] = {"$lte": filters.max_miss_distance}
-        if filters.date_from:
-            query["close_approach_date"] = {"$gte": filters.date_from}
-        if filters.date_to:
-            if "close_approach_date" in query:
-                query["close_approach_date"]["$lte"] = filters.date_to
-            else:
-                query["close_approach_date"] = {"$lte": filters.date_to}
-        if filters.search_term:
-            query["$or"] = [
-                {"name": {"$regex": filters.search_term, "$options": "i"}},
-                {"id": {"$regex": filters.search_term, "$options": "i"}}
-            ]
-        
-        cursor = neo_collection.find(query).sort("close_approach_date", 1).limit(limit)
-        results = await cursor.to_list(length=limit)
+        query = build_neo_search_query(filters, cursor)
+        db_cursor = neo_collection.find(query, neo_projection(fields, required=("close_approach_date", "id")))
+        results = await db_cursor.sort(NEO_SEARCH_SORT).limit(limit).to_list(length=limit)
         return results
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error searching NEO objects: {e}")
         return await get_fallback_neo_data()
@@ -624,50 +1186,50 @@ async def get_historical_impacts(limit: int = 20):
     if historical_impacts_collection is None:
         return []
     
-    try:
-        cursor = historical_impacts_collection.find().sort("date", -1).limit(limit)
-        results = await cursor.to_list(length=limit)
-        return results
-    except Exception as e:
-        logger.error(f"Error getting historical impacts: {e}")
-        return []
+    cursor = historical_impacts_collection.find().sort("date", -1).limit(limit)
+    return await cursor.to_list(length=limit)
 
 # Removed get_sample_historical_impacts - using live data only
 
-# Background task for periodic data sync
-async def periodic_neo_sync():
-    """Background task to periodically sync NEO data"""
-    while True:
-        try:
-            await fetch_and_store_neo_data()
-            await asyncio.sleep(NEO_SYNC_INTERVAL)
-        except Exception as e:
-            logger.error(f"Error in periodic NEO sync: {e}")
-            await asyncio.sleep(300)  # Wait 5 minutes before retry
-
 # API Endpoints
 @api_router.get("/")
 async def root():
     return {"message": "Asteroid Defense Simulation API v1.0"}
 
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Expose in-process request and stage timings in Prometheus text format"""
+    return PlainTextResponse(
+        instrumentation.render_metrics(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 @api_router.get("/neo/current", response_model=List[NearEarthObject])
-async def get_current_neo_data():
-    """Get current Near-Earth Object data from database"""
+@cached_response(neo_response_cache)
+async def get_current_neo_data(fields: Optional[str] = None):
+    """Get current Near-Earth Object data from database.
+
+    fields: optional comma-separated subset of NearEarthObject fields to return.
+    """
+    selected = parse_neo_fields(fields)
+    neos = await load_current_neo_data(selected)
+    body = encode_neo_rows(neos, selected)
+    # Sample data stands in while the database is unavailable; do not cache it
+    return Uncached(body) if is_fallback_neo_data(neos) else body
+
+async def load_current_neo_data(fields: tuple = NEO_LIST_FIELDS):
+    """Current NEO list from the data service snapshot, loading it if nothing was published yet"""
+    return neo_data_service.snapshot or await load_neo_snapshot(fields)
+
+async def load_neo_snapshot(fields: tuple = NEO_LIST_FIELDS):
+    """Load the current NEO list from the database, falling back to cached and simulated data"""
     try:
         # Get ESA NEOCC data directly from database
         if neo_collection is not None:
-            cursor = neo_collection.find({}).limit(20)
+            cursor = neo_collection.find({}, neo_projection(fields)).limit(20)
             results = await cursor.to_list(length=20)
-            
-            # Convert MongoDB documents to dictionaries and remove _id
-            processed_results = []
-            for result in results:
-                result_dict = dict(result)
-                result_dict.pop('_id', None)
-                processed_results.append(result_dict)
-            
-            if processed_results:
-                return processed_results
+            if results:
+                return results
         
         # Fallback to cached data if no database data
         neo_data = await get_cached_neo_data()
@@ -681,92 +1243,273 @@ async def get_current_neo_data():
         logger.error(f"Error getting current NEO data: {e}")
         return await get_fallback_neo_data()
 
+async def stream_neo_search(query: Dict[str, Any], fields: tuple, limit: Optional[int]) -> AsyncIterator[bytes]:
+    """Yield matching NEOs as NDJSON lines straight from the Motor cursor"""
+    db_cursor = neo_collection.find(query, neo_projection(fields)).sort(NEO_SEARCH_SORT)
+    if limit:
+        db_cursor = db_cursor.limit(limit)
+    try:
+        async for document in db_cursor:
+            yield orjson.dumps({name: document.get(name, NEO_FIELD_DEFAULTS.get(name)) for name in fields}) + b"\n"
+    except Exception as e:
+        logger.error(f"Error streaming NEO search results: {e}")
+    finally:
+        await db_cursor.close()
+
 @api_router.post("/neo/search", response_model=List[NearEarthObject])
-async def search_neo_objects_endpoint(filters: NEOSearchFilters, limit: int = 50):
-    """Search NEO objects with advanced filters"""
+async def search_neo_objects_endpoint(
+    filters: NEOSearchFilters,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=NEO_SEARCH_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Search NEO objects with advanced filters.
+
+    Results are ordered by (close_approach_date, id). Pass the X-Next-Cursor
+    response header back as `cursor` to fetch the next page. With
+    `Accept: application/x-ndjson` every matching NEO (or the first `limit`)
+    is streamed as newline-delimited JSON instead.
+    """
+    selected = parse_neo_fields(fields)
+    if "application/x-ndjson" in request.headers.get("accept", "") and neo_collection is not None:
+        query = build_neo_search_query(filters, cursor)
+        return StreamingResponse(stream_neo_search(query, selected, limit), media_type="application/x-ndjson")
+
+    page_size = limit or 50
     try:
-        results = await search_neo_objects(filters, limit)
-        return results
+        results = await search_neo_objects(filters, page_size, cursor, selected)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error searching NEO objects: {e}")
-        return await get_fallback_neo_data()
+        results = await get_fallback_neo_data()
+
+    headers = {}
+    if len(results) == page_size and isinstance(results[-1], dict):
+        headers["X-Next-Cursor"] = encode_search_cursor(results[-1])
+    return Response(content=encode_neo_rows(results, selected), media_type="application/json", headers=headers)
 
 @api_router.get("/neo/historical", response_model=List[HistoricalImpact])
+@cached_response(neo_response_cache, List[HistoricalImpact])
 async def get_historical_impacts_endpoint(limit: int = 20):
     """Get historical impact events"""
+    if historical_impacts_collection is None:
+        return Uncached([])
     try:
-        results = await get_historical_impacts(limit)
-        return results
+        return await get_historical_impacts(limit)
     except Exception as e:
         logger.error(f"Error getting historical impacts: {e}")
-        return []
+        return Uncached([])
 
 @api_router.post("/neo/sync")
-async def sync_neo_data():
-    """Manually trigger NEO data synchronization"""
+async def sync_neo_data(mode: Optional[str] = None):
+    """Manually trigger NEO data synchronization ("full" or "incremental")"""
+    if mode not in (None, "full", "incremental"):
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'incremental'")
     try:
-        results = await fetch_and_store_neo_data()
+        if cluster.CLUSTER_COORDINATION and not neo_sync_lock.is_leader:
+            # Avoid a second ingestion next to the leader's; it runs the sync instead
+            await cluster_bus.publish("neo_sync_requested", {"mode": mode})
+            return {
+                "message": "Sync requested from the worker that owns NEO ingestion",
+                "count": 0,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
+        results = await neo_data_service.run_sync(mode)
+        count = NEO_SYNC_STATS.get("write", {}).get("items", len(results))
         return {
-            "message": f"Successfully synced {len(results)} NEO objects",
-            "count": len(results),
+            "message": f"Successfully synced {count} NEO objects",
+            "count": count,
+            "stages": dict(NEO_SYNC_STATS),
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
     except Exception as e:
         logger.error(f"Error syncing NEO data: {e}")
         raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
 
+# Histogram bucket boundaries for /neo/stats (lower bound inclusive, upper exclusive)
+NEO_DIAMETER_BUCKETS = [0, 10, 25, 50, 100, 140, 300, 500, 1000, 5000]  # meters
+NEO_MISS_DISTANCE_BUCKETS = [0, 384400, 1000000, 7500000, 20000000, 50000000, 100000000]  # km (1 LD, ..., PHA limit)
+
+def build_neo_stats_pipeline(now: datetime) -> List[Dict[str, Any]]:
+    """Single $facet aggregation producing every /neo/stats figure in one round trip"""
+    def count_where(match):
+        return [{"$match": match}, {"$count": "n"}] if match else [{"$count": "n"}]
+
+    return [{"$facet": {
+        "total": count_where(None),
+        "hazardous": count_where({"potentially_hazardous": True}),
+        "recent": count_where({"last_updated": {"$gte": now - timedelta(hours=24)}}),
+        "closest": [
+            {"$match": {"miss_distance": {"$gt": 0}}},
+            {"$sort": {"miss_distance": 1}},
+            {"$limit": 1},
+            {"$project": {"_id": 0, "name": 1, "miss_distance": 1, "close_approach_date": 1}},
+        ],
+        "largest": [
+            {"$match": {"diameter_max": {"$gt": 0}}},
+            {"$sort": {"diameter_max": -1}},
+            {"$limit": 1},
+            {"$project": {"_id": 0, "name": 1, "diameter_max": 1, "diameter_min": 1}},
+        ],
+        "diameter_histogram": [
+            {"$match": {"diameter_max": {"$type": "number"}}},
+            {"$bucket": {
+                "groupBy": "$diameter_max",
+                "boundaries": NEO_DIAMETER_BUCKETS,
+                "default": "other",
+                "output": {"count": {"$sum": 1}},
+            }},
+        ],
+        "miss_distance_histogram": [
+            {"$match": {"miss_distance": {"$type": "number"}}},
+            {"$bucket": {
+                "groupBy": "$miss_distance",
+                "boundaries": NEO_MISS_DISTANCE_BUCKETS,
+                "default": "other",
+                "output": {"count": {"$sum": 1}},
+            }},
+        ],
+        "approach_month_histogram": [
+            {"$match": {"close_approach_date": {"$type": "string"}}},
+            {"$group": {"_id": {"$substrBytes": ["$close_approach_date", 0, 7]}, "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ],
+    }}]
+
+def _bucket_histogram(rows: List[Dict[str, Any]], boundaries: List[float]) -> List[Dict[str, Any]]:
+    """Expand $bucket output into a dense list of {min, max, count}, plus an overflow bucket"""
+    counts = {row["_id"]: row["count"] for row in rows}
+    histogram = [
+        {"min": low, "max": high, "count": counts.get(low, 0)}
+        for low, high in zip(boundaries[:-1], boundaries[1:])
+    ]
+    histogram.append({"min": boundaries[-1], "max": None, "count": counts.get("other", 0)})
+    return histogram
+
+async def compute_neo_statistics() -> Dict[str, Any]:
+    """Compute NEO statistics and histograms with one aggregation"""
+    now = datetime.now(timezone.utc)
+    facets = (await neo_collection.aggregate(build_neo_stats_pipeline(now)).to_list(length=1))[0]
+
+    def first_count(name):
+        return facets[name][0]["n"] if facets[name] else 0
+
+    closest_approach = facets["closest"][0] if facets["closest"] else None
+    largest_object = facets["largest"][0] if facets["largest"] else None
+    return {
+        "total_objects": first_count("total"),
+        "potentially_hazardous": first_count("hazardous"),
+        "recent_updates_24h": first_count("recent"),
+        "closest_approach": {
+            "name": closest_approach.get("name", "Unknown") if closest_approach else None,
+            "distance_km": closest_approach.get("miss_distance", 0) if closest_approach else None,
+            "date": closest_approach.get("close_approach_date", "Unknown") if closest_approach else None
+        },
+        "largest_object": {
+            "name": largest_object.get("name", "Unknown") if largest_object else None,
+            "diameter_max": largest_object.get("diameter_max", 0) if largest_object else None,
+            "diameter_min": largest_object.get("diameter_min", 0) if largest_object else None
+        },
+        "histograms": {
+            "diameter_m": _bucket_histogram(facets["diameter_histogram"], NEO_DIAMETER_BUCKETS),
+            "miss_distance_km": _bucket_histogram(facets["miss_distance_histogram"], NEO_MISS_DISTANCE_BUCKETS),
+            "approach_month": [{"month": row["_id"], "count": row["count"]} for row in facets["approach_month_histogram"]],
+        },
+        "last_sync": now.isoformat()
+    }
+
+async def materialize_neo_statistics():
+    """Recompute statistics and store them in neo_cache so /neo/stats reads are a single lookup"""
+    if not NEO_STATS_MATERIALIZED or neo_cache_collection is None:
+        return
+    try:
+        stats = await compute_neo_statistics()
+        await neo_cache_collection.replace_one(
+            {"type": "neo_stats"},
+            {"type": "neo_stats", "data": stats, "last_updated": datetime.now(timezone.utc)},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Error materializing NEO statistics: {e}")
+
 @api_router.get("/neo/stats")
-async def get_neo_statistics():
-    """Get NEO database statistics"""
+@cached_response(neo_response_cache)
+async def get_neo_statistics(fresh: bool = False):
+    """Get NEO database statistics and histograms.
+
+    Served from the materialized stats document written after each sync when
+    available; fresh=true recomputes from the collection.
+    """
     if neo_collection is None:
-        return {"message": "Database not available", "total": 0}
+        return Uncached({"message": "Database not available", "total": 0})
     
     try:
-        total_count = await neo_collection.count_documents({})
-        hazardous_count = await neo_collection.count_documents({"potentially_hazardous": True})
-        
-        # Get recent updates
-        recent_updates = await neo_collection.count_documents({
-            "last_updated": {"$gte": datetime.now(timezone.utc) - timedelta(hours=24)}
-        })
-        
-        # Get closest approaches
-        closest_approach = await neo_collection.find_one(
-            {"miss_distance": {"$gt": 0}}, 
-            sort=[("miss_distance", 1)]
-        )
-        
-        # Get largest objects
-        largest_object = await neo_collection.find_one(
-            {"diameter_max": {"$gt": 0}}, 
-            sort=[("diameter_max", -1)]
-        )
-        
-        return {
-            "total_objects": total_count,
-            "potentially_hazardous": hazardous_count,
-            "recent_updates_24h": recent_updates,
-            "closest_approach": {
-                "name": closest_approach.get("name", "Unknown") if closest_approach else None,
-                "distance_km": closest_approach.get("miss_distance", 0) if closest_approach else None,
-                "date": closest_approach.get("close_approach_date", "Unknown") if closest_approach else None
-            },
-            "largest_object": {
-                "name": largest_object.get("name", "Unknown") if largest_object else None,
-                "diameter_max": largest_object.get("diameter_max", 0) if largest_object else None,
-                "diameter_min": largest_object.get("diameter_min", 0) if largest_object else None
-            },
-            "last_sync": datetime.now(timezone.utc).isoformat()
-        }
+        if NEO_STATS_MATERIALIZED and not fresh:
+            materialized = await neo_cache_collection.find_one({"type": "neo_stats"})
+            if materialized:
+                return materialized["data"]
+        stats = await compute_neo_statistics()
+        # An explicit recomputation is for this caller only; caching it would shadow later syncs
+        return Uncached(stats) if fresh else stats
     except Exception as e:
         logger.error(f"Error getting NEO statistics: {e}")
-        return {"error": str(e), "total": 0}
+        # A transient database failure must not be served from the cache afterwards
+        return Uncached({"error": str(e), "total": 0})
+
+async def backfill_search_fields():
+    """Add designation_keys to NEO documents stored before search fields existed"""
+    if neo_collection is None:
+        return
+    try:
+        updates = []
+        async for neo in neo_collection.find(
+            {"designation_keys": {"$exists": False}},
+            {"_id": 0, "id": 1, "neo_id": 1, "name": 1}
+        ):
+            updates.append(UpdateOne({"id": neo["id"]}, {"$set": {"designation_keys": neo_search.designation_keys(neo)}}))
+            if len(updates) >= NEO_SYNC_WRITE_CHUNK:
+                await neo_collection.bulk_write(updates, ordered=False)
+                updates = []
+        if updates:
+            await neo_collection.bulk_write(updates, ordered=False)
+    except Exception as e:
+        logger.error(f"Error backfilling NEO search fields: {e}")
+
+async def rebuild_designation_index():
+    """Reload the in-memory autocomplete index from the NEO collection"""
+    if neo_collection is None:
+        return
+    try:
+        neos = await neo_collection.find(
+            {}, {"_id": 0, "id": 1, "neo_id": 1, "name": 1, "designation_keys": 1}
+        ).to_list(length=None)
+        neo_search.designation_index.build(neos)
+        logger.info(f"Designation index rebuilt with {len(neo_search.designation_index)} NEOs")
+    except Exception as e:
+        logger.error(f"Error rebuilding designation index: {e}")
+
+@api_router.get("/neo/autocomplete")
+async def autocomplete_neo_designations(q: str, limit: int = 10):
+    """Suggest NEOs whose designation or name contains q (prefix matches first)"""
+    return neo_search.designation_index.search(q, max(1, min(limit, 50)))
 
 @api_router.get("/neo/close-approaches")
-async def get_close_approaches(limit: int = 50, min_distance: float = 0, max_distance: float = 1000000):
-    """Get asteroids that came close to Earth"""
+@cached_response(neo_response_cache)
+async def get_close_approaches(
+    limit: int = 50,
+    min_distance: float = 0,
+    max_distance: float = 1000000,
+    fields: Optional[str] = None
+):
+    """Get asteroids that came close to Earth.
+
+    fields: optional comma-separated subset of NearEarthObject fields (and risk_level) to return.
+    """
+    selected = parse_neo_fields(fields, extra_fields=("risk_level",))
     if neo_collection is None:
-        return await get_fallback_neo_data()
+        return Uncached(encode_neo_rows(await get_fallback_neo_data(), selected))
     
     try:
         query = {
@@ -776,39 +1519,211 @@ async def get_close_approaches(limit: int = 50, min_distance: float = 0, max_dis
             }
         }
         
-        cursor = neo_collection.find(query).sort("miss_distance", 1).limit(limit)
+        projection = neo_projection(selected, required=("miss_distance", "diameter_max"))
+        cursor = neo_collection.find(query, projection).sort("miss_distance", 1).limit(limit)
         results = await cursor.to_list(length=limit)
         
-        # Convert MongoDB documents to dictionaries and remove _id
-        processed_results = []
         for result in results:
-            # Convert to dict and remove _id
-            result_dict = dict(result)
-            result_dict.pop('_id', None)
-            
             # Add risk assessment
-            distance_km = result_dict.get("miss_distance", 0)
-            diameter_max = result_dict.get("diameter_max", 0)
+            distance_km = result.get("miss_distance", 0)
+            diameter_max = result.get("diameter_max", 0)
             
             # Risk assessment based on distance and size
             if distance_km < 100000 and diameter_max > 100:  # Within 100k km and >100m
-                result_dict["risk_level"] = "HIGH"
+                result["risk_level"] = "HIGH"
             elif distance_km < 500000 and diameter_max > 50:  # Within 500k km and >50m
-                result_dict["risk_level"] = "MEDIUM"
+                result["risk_level"] = "MEDIUM"
             else:
-                result_dict["risk_level"] = "LOW"
-            
-            processed_results.append(result_dict)
+                result["risk_level"] = "LOW"
                 
-        return processed_results
+        return encode_neo_rows(results, selected)
         
     except Exception as e:
         logger.error(f"Error getting close approaches: {e}")
-        return await get_fallback_neo_data()
+        return Uncached(encode_neo_rows(await get_fallback_neo_data(), selected))
+
+ORBIT_FIELDS = ("id", "name", "orbital_period", "eccentricity", "inclination", "miss_distance", "close_approach_date")
+MAX_ORBIT_EPOCHS = 20000
+
+async def load_orbit_catalogue(ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """NEOs with the fields orbit propagation needs (optionally only the given ids)"""
+    if neo_collection is not None:
+        query = {"id": {"$in": ids}} if ids else {}
+        try:
+            return await neo_collection.find(query, neo_projection(ORBIT_FIELDS)).to_list(length=None)
+        except Exception as e:
+            logger.error(f"Error loading NEO orbits: {e}")
+    neos = [neo.model_dump() for neo in await get_fallback_neo_data()]
+    return [neo for neo in neos if not ids or neo["id"] in ids]
+
+def parse_orbit_window(start: Optional[str], days: float, step: float) -> np.ndarray:
+    """Epoch grid (days since J2000) for a propagation window; 400 on invalid input"""
+    if days <= 0 or step <= 0:
+        raise HTTPException(status_code=400, detail="days and step must be positive")
+    if days / step > MAX_ORBIT_EPOCHS:
+        raise HTTPException(status_code=400, detail=f"Window has more than {MAX_ORBIT_EPOCHS} epochs; increase step")
+    first = orbit_propagation.days_since_j2000([start or datetime.now(timezone.utc).date().isoformat()])[0]
+    if not np.isfinite(first):
+        raise HTTPException(status_code=400, detail="start must be an ISO date")
+    return np.arange(first, first + days + step / 2, step)
+
+def propagate_close_approaches(neos: List[Dict[str, Any]], grid: np.ndarray) -> List[Dict[str, Any]]:
+    """Closest approach of every NEO within the grid's window, closest first"""
+    elements, valid = orbit_propagation.elements_from_neos(neos)
+    step = float(grid[1] - grid[0]) if len(grid) > 1 else 1.0
+    approaches = orbit_propagation.close_approaches(elements, float(grid[0]), float(grid[-1]), step)
+    epochs = orbit_propagation.dates_from_days(approaches["epoch"])
+    rows = [
+        {
+            "id": neo.get("id"),
+            "name": neo.get("name"),
+            "close_approach_epoch": str(epochs[i]) + "Z",
+            "min_distance_km": float(approaches["distance"][i]),
+            "reported_close_approach_date": neo.get("close_approach_date"),
+            "reported_miss_distance_km": neo.get("miss_distance"),
+        }
+        for i, neo in enumerate(neos) if valid[i]
+    ]
+    rows.sort(key=lambda row: row["min_distance_km"])
+    return rows
+
+@api_router.get("/neo/orbits/close-approaches")
+@cached_response(neo_response_cache)
+async def get_propagated_close_approaches(
+    start: Optional[str] = None,
+    days: float = 365.0,
+    step: float = 1.0,
+    limit: int = 100,
+):
+    """Closest approach to Earth of every catalogued NEO in [start, start + days], from its propagated orbit.
+
+    Orbits are two-body ellipses from orbital_period, eccentricity and
+    inclination, anchored on the reported close approach (see
+    orbit_propagation.py). NEOs without orbital elements are skipped.
+    """
+    grid = parse_orbit_window(start, days, step)
+    neos = await load_orbit_catalogue()
+    loop = asyncio.get_running_loop()
+    rows = await loop.run_in_executor(None, propagate_close_approaches, neos, grid)
+    body = orjson.dumps({
+        "start": str(orbit_propagation.dates_from_days(grid[:1])[0]) + "Z",
+        "days": days,
+        "step": step,
+        "propagated": len(rows),
+        "skipped": len(neos) - len(rows),
+        "close_approaches": rows[:max(0, limit)],
+    })
+    return Uncached(body) if is_fallback_neo_data(neos) else body
+
+def propagate_distance_series(neos: List[Dict[str, Any]], grid: np.ndarray) -> Dict[str, Any]:
+    elements, valid = orbit_propagation.elements_from_neos(neos)
+    distances = orbit_propagation.earth_distances(orbit_propagation.take_elements(elements, valid), grid)
+    return {
+        "ids": [neo.get("id") for neo, has_orbit in zip(neos, valid) if has_orbit],
+        "distances_km": distances.round(1),
+    }
+
+@api_router.get("/neo/orbits/distances")
+async def get_distance_series(
+    ids: str,
+    start: Optional[str] = None,
+    days: float = 365.0,
+    step: float = 1.0,
+):
+    """Earth-NEO distance (km) time series for the comma-separated NEO ids, one row per NEO"""
+    requested = [neo_id.strip() for neo_id in ids.split(",") if neo_id.strip()]
+    if not requested:
+        raise HTTPException(status_code=400, detail="ids must name at least one NEO")
+    grid = parse_orbit_window(start, days, step)
+    neos = await load_orbit_catalogue(requested)
+    loop = asyncio.get_running_loop()
+    series = await loop.run_in_executor(None, propagate_distance_series, neos, grid)
+    return ORJSONResponse({
+        "epochs": [str(epoch) + "Z" for epoch in orbit_propagation.dates_from_days(grid)],
+        "missing": sorted(set(requested) - set(series["ids"])),
+        **series,
+    })
+
+# Ephemeris buffers are large and binary, so they get their own byte budget
+EPHEMERIS_MAX_VALUES = int(os.environ.get("EPHEMERIS_MAX_VALUES", str(16 * 1024 * 1024)))
+ephemeris_cache = ResponseCache(
+    max_entries=int(os.environ.get("EPHEMERIS_CACHE_MAX_ENTRIES", "64")),
+    max_bytes=int(os.environ.get("EPHEMERIS_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+)
+
+def invalidate_neo_caches():
+    """Drop every cached response derived from the NEO collection"""
+    neo_response_cache.invalidate()
+    ephemeris_cache.invalidate()
+
+def encode_ephemeris(neos: List[Dict[str, Any]], grid: np.ndarray, include_earth: bool, requested: Optional[List[str]]) -> bytes:
+    """Ephemeris body: uint32 LE header length, JSON header (space padded to 4 bytes), float32 LE positions.
+
+    Positions are laid out [object][epoch][x, y, z] in AU (heliocentric ecliptic,
+    J2000), so clients can view them as one Float32Array without parsing.
+    """
+    elements, valid = orbit_propagation.elements_from_neos(neos)
+    ids = [neo.get("id") for neo, has_orbit in zip(neos, valid) if has_orbit]
+    rows = len(ids) + (1 if include_earth else 0)
+    values = np.empty((rows, len(grid), 3), dtype="<f4")
+    orbit_propagation.positions_into(orbit_propagation.take_elements(elements, valid), grid, values[:len(ids)])
+    if include_earth:
+        values[-1] = orbit_propagation.earth_positions(grid)
+        ids.append("earth")
+
+    header = orjson.dumps({
+        "ids": ids,
+        "missing": sorted(set(requested) - set(ids)) if requested else [],
+        "start": str(orbit_propagation.dates_from_days(grid[:1])[0]) + "Z",
+        "step_days": float(grid[1] - grid[0]) if len(grid) > 1 else 0.0,
+        "shape": list(values.shape),
+        "dtype": "float32",
+        "byte_order": "little",
+        "units": "AU",
+        "frame": "heliocentric ecliptic J2000",
+    })
+    header += b" " * (-len(header) % 4)
+    return struct.pack("<I", len(header)) + header + values.tobytes()
+
+@api_router.get("/neo/ephemeris")
+async def get_neo_ephemeris(
+    ids: Optional[str] = None,
+    start: Optional[str] = None,
+    days: float = 365.0,
+    step: float = 1.0,
+    include_earth: bool = True,
+):
+    """Positions of many NEOs over a time window as one binary Float32 buffer (see encode_ephemeris).
+
+    ids: comma-separated NEO ids; all NEOs with orbital elements when omitted.
+    Responses are cached per (NEO set, window, resolution) until the NEO data changes.
+    """
+    requested = sorted({neo_id.strip() for neo_id in ids.split(",") if neo_id.strip()}) if ids else None
+    grid = parse_orbit_window(start, days, step)
+
+    async def compute():
+        neos = await load_orbit_catalogue(requested)
+        if (len(neos) + 1) * len(grid) * 3 > EPHEMERIS_MAX_VALUES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Ephemeris of {len(neos)} NEOs x {len(grid)} epochs exceeds {EPHEMERIS_MAX_VALUES} values",
+            )
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(None, encode_ephemeris, neos, grid, include_earth, requested)
+        return Uncached(body) if is_fallback_neo_data(neos) else body
+
+    key = ("ephemeris", tuple(requested) if requested else None, float(grid[0]), len(grid), step, include_earth)
+    body, hit = await ephemeris_cache.get_or_compute(key, compute)
+    return Response(
+        content=body,
+        media_type="application/octet-stream",
+        headers={"X-Cache": "hit" if hit else "miss"},
+    )
 
 @api_router.post("/impact/simulate-historical/{impact_id}")
 async def simulate_historical_impact(impact_id: str):
     """Simulate impact effects for a historical impact event"""
+    trace = instrumentation.RequestTrace("/impact/simulate-historical")
     try:
         # Get historical impact data
         historical_impacts = []
@@ -849,52 +1764,49 @@ async def simulate_historical_impact(impact_id: str):
         )
         
         # Calculate impact effects
-        mass = calculate_asteroid_mass(diameter, density)
-        kinetic_energy = calculate_kinetic_energy(mass, velocity)
-        tnt_equivalent = kinetic_energy / TNT_EQUIVALENT
-        
-        print(f"DEBUG: Input parameters - diameter: {diameter}, velocity: {velocity}, density: {density}")
-        print(f"DEBUG: Calculated mass: {mass} kg")
-        print(f"DEBUG: Calculated kinetic energy: {kinetic_energy} J")
-        print(f"DEBUG: TNT equivalent: {tnt_equivalent} kg")
-        
-        crater_diameter, crater_depth = calculate_crater_size(
-            kinetic_energy,
-            target_density=2500,
-            projectile_diameter=diameter,
-            projectile_density=density,
-            velocity=velocity,
-            impact_angle_deg=45,
-        )
+        with trace.stage("physics"):
+            mass = calculate_asteroid_mass(diameter, density)
+            kinetic_energy = calculate_kinetic_energy(mass, velocity)
+            tnt_equivalent = kinetic_energy / TNT_EQUIVALENT
+            
+            # The entry integration takes tens of milliseconds; keep it off the event loop
+            loop = asyncio.get_running_loop()
+            entry = await loop.run_in_executor(None, calculate_atmospheric_entry, diameter, velocity, density, 45)
+            crater_diameter, crater_depth, seismic_magnitude, tsunami_risk = calculate_ground_effects(
+                entry, density, 45, latitude, longitude
+            )
+            environmental_effects = calculate_environmental_effects(kinetic_energy, crater_diameter)
         
-        seismic_magnitude = calculate_seismic_magnitude(kinetic_energy)
-        tsunami_risk = assess_tsunami_risk(latitude, longitude, kinetic_energy)
-        environmental_effects = calculate_environmental_effects(kinetic_energy, crater_diameter)
+        trace.debug(diameter=diameter, velocity=velocity, density=density, mass_kg=mass,
+                    kinetic_energy_j=kinetic_energy, tnt_equivalent_kg=tnt_equivalent)
         
         # Create comprehensive impact results
-        impact_results = ImpactResults(
-            parameters=asteroid_params,
-            kinetic_energy=kinetic_energy,
-            tnt_equivalent=tnt_equivalent,
-            crater_diameter=crater_diameter,
-            crater_depth=crater_depth,
-            seismic_magnitude=seismic_magnitude,
-            tsunami_risk=tsunami_risk,
-            environmental_effects=environmental_effects
-        )
+        with trace.stage("validation"):
+            impact_results = ImpactResults(
+                parameters=asteroid_params,
+                kinetic_energy=kinetic_energy,
+                tnt_equivalent=tnt_equivalent,
+                crater_diameter=crater_diameter,
+                crater_depth=crater_depth,
+                seismic_magnitude=seismic_magnitude,
+                tsunami_risk=tsunami_risk,
+                environmental_effects=environmental_effects,
+                atmospheric_entry=entry
+            )
         
         # Add historical context
-        simulation_data = {
-            "historical_event": impact_event,
-            "simulation_results": impact_results.dict(),
-            "comparison": {
-                "actual_energy_mt": impact_event["energy_release"],
-                "calculated_energy_mt": tnt_equivalent / 1000000,  # Convert to megatons
-                "actual_crater_diameter": impact_event.get("crater_diameter"),
-                "calculated_crater_diameter": crater_diameter,
-                "accuracy_note": "Simulation uses estimated parameters based on historical records"
+        with trace.stage("serialization"):
+            simulation_data = {
+                "historical_event": impact_event,
+                "simulation_results": impact_results.dict(),
+                "comparison": {
+                    "actual_energy_mt": impact_event["energy_release"],
+                    "calculated_energy_mt": tnt_equivalent / 1000000,  # Convert to megatons
+                    "actual_crater_diameter": impact_event.get("crater_diameter"),
+                    "calculated_crater_diameter": crater_diameter,
+                    "accuracy_note": "Simulation uses estimated parameters based on historical records"
+                }
             }
-        }
         
         return simulation_data
         
@@ -903,6 +1815,8 @@ async def simulate_historical_impact(impact_id: str):
     except Exception as e:
         logger.error(f"Error simulating historical impact: {e}")
         raise HTTPException(status_code=500, detail=f"Simulation failed: {str(e)}")
+    finally:
+        trace.emit()
 
 async def get_fallback_neo_data():
     """Return fallback NEO data when NASA API is unavailable"""
@@ -949,60 +1863,301 @@ async def get_fallback_neo_data():
     ]
     return fallback_data
 
+def is_fallback_neo_data(neos: List[Any]) -> bool:
+    """Whether a NEO list came from get_fallback_neo_data rather than stored data"""
+    return any(
+        (neo.get("source") if isinstance(neo, dict) else getattr(neo, "source", None)) == "fallback"
+        for neo in neos
+    )
+
 @api_router.post("/impact/calculate", response_model=ImpactResults)
 async def calculate_impact_scenario(parameters: AsteroidParameters):
     """Calculate impact scenario for given asteroid parameters"""
+    trace = instrumentation.RequestTrace("/impact/calculate")
     try:
         # Calculate impact effects
-        mass = calculate_asteroid_mass(parameters.diameter, parameters.density)
-        kinetic_energy = calculate_kinetic_energy(mass, parameters.velocity)
-        tnt_equivalent = kinetic_energy / TNT_EQUIVALENT
-        
-        print(f"DEBUG: Input parameters - diameter: {parameters.diameter}, velocity: {parameters.velocity}, density: {parameters.density}")
-        print(f"DEBUG: Calculated mass: {mass} kg")
-        print(f"DEBUG: Calculated kinetic energy: {kinetic_energy} J")
-        print(f"DEBUG: TNT equivalent: {tnt_equivalent} kg")
+        with trace.stage("physics"):
+            mass = calculate_asteroid_mass(parameters.diameter, parameters.density)
+            kinetic_energy = calculate_kinetic_energy(mass, parameters.velocity)
+            tnt_equivalent = kinetic_energy / TNT_EQUIVALENT
+            
+            # The entry integration takes tens of milliseconds; keep it off the event loop
+            loop = asyncio.get_running_loop()
+            entry = await loop.run_in_executor(
+                None, calculate_atmospheric_entry,
+                parameters.diameter, parameters.velocity, parameters.density, parameters.angle,
+            )
+            crater_diameter, crater_depth, seismic_magnitude, tsunami_risk = calculate_ground_effects(
+                entry, parameters.density, parameters.angle, parameters.latitude, parameters.longitude
+            )
+            environmental_effects = calculate_environmental_effects(kinetic_energy, crater_diameter)
         
-        crater_diameter, crater_depth = calculate_crater_size(
-            kinetic_energy,
-            target_density=2500,
-            projectile_diameter=parameters.diameter,
-            projectile_density=parameters.density,
-            velocity=parameters.velocity,
-            impact_angle_deg=parameters.angle,
-        )
-        seismic_magnitude = calculate_seismic_magnitude(kinetic_energy)
-        tsunami_risk = assess_tsunami_risk(parameters.latitude, parameters.longitude, kinetic_energy)
-        environmental_effects = calculate_environmental_effects(kinetic_energy, crater_diameter)
+        trace.debug(diameter=parameters.diameter, velocity=parameters.velocity, density=parameters.density,
+                    mass_kg=mass, kinetic_energy_j=kinetic_energy, tnt_equivalent_kg=tnt_equivalent)
         
         # Create impact results
-        impact_results = ImpactResults(
-            parameters=parameters,
-            kinetic_energy=kinetic_energy,
-            tnt_equivalent=tnt_equivalent,
-            crater_diameter=crater_diameter,
-            crater_depth=crater_depth,
-            seismic_magnitude=seismic_magnitude,
-            tsunami_risk=tsunami_risk,
-            environmental_effects=environmental_effects
-        )
+        with trace.stage("validation"):
+            impact_results = ImpactResults(
+                parameters=parameters,
+                kinetic_energy=kinetic_energy,
+                tnt_equivalent=tnt_equivalent,
+                crater_diameter=crater_diameter,
+                crater_depth=crater_depth,
+                seismic_magnitude=seismic_magnitude,
+                tsunami_risk=tsunami_risk,
+                environmental_effects=environmental_effects,
+                atmospheric_entry=entry
+            )
         
-        # Store in database (if available) with a very short timeout to avoid blocking when MongoDB is down
+        # Queue for the write-behind buffer (if a database is configured); the insert happens off the request path
         if db is not None:
             try:
-                result_dict = impact_results.dict()
-                result_dict['timestamp'] = result_dict['timestamp'].isoformat()
-                try:
-                    await asyncio.wait_for(db.impact_results.insert_one(result_dict), timeout=0.5)
-                except asyncio.TimeoutError:
-                    print("Database insertion skipped: timed out (MongoDB likely not running)")
+                with trace.stage("serialization"):
+                    result_dict = impact_results.dict()
+                    result_dict['timestamp'] = result_dict['timestamp'].isoformat()
+                with trace.stage("db_enqueue"):
+                    if not impact_results_writer.enqueue(result_dict):
+                        logger.warning("Impact result not persisted: write-behind buffer is full")
             except Exception as e:
-                print(f"Database insertion failed: {e}")
+                logger.error(f"Database insertion failed: {e}")
         
         return impact_results
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating impact: {str(e)}")
+    finally:
+        trace.emit()
+
+def _batch_column(values: Optional[List[float]], default: Optional[float], count: int) -> np.ndarray:
+    """Convert a batch column to a float array, filling optional missing columns with a default"""
+    if values is None:
+        if default is None:
+            raise ValueError("missing required column")
+        return np.full(count, default, dtype=np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+def _build_batch_documents(batch_id: str, columns: Dict[str, np.ndarray], results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Expand columnar batch results into impact_results documents (same shape as ImpactResults)"""
+    timestamp = datetime.now(timezone.utc).isoformat()
+    params = {name: column.tolist() for name, column in columns.items()}
+    scalars = {
+        name: results[name].tolist()
+        for name in ("kinetic_energy", "tnt_equivalent", "crater_diameter", "crater_depth", "seismic_magnitude", "tsunami_risk")
+    }
+    effects = {name: values.tolist() for name, values in results["environmental_effects"].items()}
+    # NaN (no breakup / no burst) is stored as null
+    entry = {
+        name: [None if value != value else value for value in values.tolist()] if values.dtype.kind == "f" else values.tolist()
+        for name, values in results.get("atmospheric_entry", {}).items()
+    }
+
+    documents = []
+    for i in range(len(params["diameter"])):
+        doc = {
+            "id": f"{batch_id}-{i}",
+            "batch_id": batch_id,
+            "parameters": {name: values[i] for name, values in params.items()},
+            "environmental_effects": {name: values[i] for name, values in effects.items()},
+            "timestamp": timestamp,
+        }
+        if entry:
+            doc["atmospheric_entry"] = {name: values[i] for name, values in entry.items()}
+        for name, values in scalars.items():
+            doc[name] = values[i]
+        documents.append(doc)
+    return documents
+
+async def store_impact_batch(batch_id: str, columns: Dict[str, np.ndarray], results: Dict[str, Any]):
+    """Bulk insert a batch of impact results, building the documents off the event loop"""
+    if db is None:
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+        documents = await loop.run_in_executor(None, _build_batch_documents, batch_id, columns, results)
+        for start in range(0, len(documents), BATCH_INSERT_CHUNK_SIZE):
+            await db.impact_results.insert_many(
+                documents[start:start + BATCH_INSERT_CHUNK_SIZE],
+                ordered=False
+            )
+        logger.info(f"Stored {len(documents)} batch impact results for batch {batch_id}")
+    except Exception as e:
+        logger.error(f"Batch impact insertion failed for batch {batch_id}: {e}")
+
+@api_router.post(
+    "/impact/calculate/batch",
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": BatchAsteroidParameters.model_json_schema()}},
+    }},
+)
+async def calculate_impact_batch(request: Request, background_tasks: BackgroundTasks):
+    """Calculate many impact scenarios at once from columnar parameter arrays.
+
+    The body follows BatchAsteroidParameters but is decoded straight into NumPy arrays
+    instead of going through per-element pydantic validation. The response is columnar
+    as well: one list per ImpactResults field, in input order. Stored documents get ids
+    of the form "<batch_id>-<index>".
+    """
+    trace = instrumentation.RequestTrace("/impact/calculate/batch")
+    try:
+        with trace.stage("validation"):
+            try:
+                payload = orjson.loads(await request.body())
+                if not isinstance(payload, dict):
+                    raise ValueError("body must be a JSON object")
+                count = len(payload.get("diameter") or [])
+                columns = {
+                    "diameter": _batch_column(payload.get("diameter"), None, count),
+                    "velocity": _batch_column(payload.get("velocity"), None, count),
+                    "density": _batch_column(payload.get("density"), 3000, count),
+                    "angle": _batch_column(payload.get("angle"), 45, count),
+                    "latitude": _batch_column(payload.get("latitude"), None, count),
+                    "longitude": _batch_column(payload.get("longitude"), None, count),
+                }
+                persist = bool(payload.get("persist", True))
+                simulate_atmosphere = bool(payload.get("atmospheric_entry", False))
+            except (orjson.JSONDecodeError, ValueError, TypeError) as e:
+                raise HTTPException(status_code=400, detail=f"Invalid batch payload: {str(e)}")
+
+            if count == 0:
+                raise HTTPException(status_code=400, detail="Batch must contain at least one scenario")
+            if count > MAX_BATCH_SCENARIOS:
+                raise HTTPException(status_code=413, detail=f"Batch size {count} exceeds limit of {MAX_BATCH_SCENARIOS}")
+            for name, column in columns.items():
+                if column.shape != (count,):
+                    raise HTTPException(status_code=400, detail=f"Column '{name}' has {column.size} values, expected {count}")
+                if not np.all(np.isfinite(column)):
+                    raise HTTPException(status_code=400, detail=f"Column '{name}' contains non-finite values")
+            for name in ("diameter", "velocity", "density"):
+                if np.any(columns[name] <= 0):
+                    raise HTTPException(status_code=400, detail=f"Column '{name}' must be strictly positive")
+
+        try:
+            with trace.stage("physics"):
+                loop = asyncio.get_running_loop()
+                entry = None
+                if simulate_atmosphere and count >= ENTRY_PROCESS_POOL_MIN_SCENARIOS and monte_carlo.worker_count() > 1:
+                    # The entry integration dominates; spread it over the process pool
+                    executor = monte_carlo.get_executor()
+                    chunks = await asyncio.gather(*(
+                        loop.run_in_executor(
+                            executor, atmospheric_entry.simulate_entry,
+                            *(columns[name][start:start + ENTRY_CHUNK_SIZE] for name in ("diameter", "velocity", "density", "angle"))
+                        )
+                        for start in range(0, count, ENTRY_CHUNK_SIZE)
+                    ))
+                    entry = atmospheric_entry.merge_chunks(chunks)
+                results = await loop.run_in_executor(
+                    None, lambda: vectorized_physics.calculate_impact_batch(
+                        **columns, entry=entry, simulate_atmosphere=simulate_atmosphere
+                    )
+                )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error calculating impact batch: {str(e)}")
+
+        batch_id = str(uuid.uuid4())
+        if persist and db is not None:
+            background_tasks.add_task(store_impact_batch, batch_id, columns, results)
+
+        # Numeric columns are serialized straight from the arrays by orjson; only the
+        # categorical (string) effect columns need tolist().
+        with trace.stage("serialization"):
+            effects = {
+                name: values.tolist() if values.dtype.kind == "U" else values
+                for name, values in results["environmental_effects"].items()
+            }
+            response = ORJSONResponse({
+                "batch_id": batch_id,
+                "count": count,
+                "kinetic_energy": results["kinetic_energy"],
+                "tnt_equivalent": results["tnt_equivalent"],
+                "crater_diameter": results["crater_diameter"],
+                "crater_depth": results["crater_depth"],
+                "seismic_magnitude": results["seismic_magnitude"],
+                "tsunami_risk": results["tsunami_risk"],
+                "environmental_effects": effects,
+                "atmospheric_entry": {
+                    name: values.tolist() if values.dtype.kind == "U" else values
+                    for name, values in results["atmospheric_entry"].items()
+                } if simulate_atmosphere else None,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }, background=background_tasks)
+
+        trace.debug(batch_id=batch_id, count=count, persist=persist, atmospheric_entry=simulate_atmosphere)
+        return response
+    finally:
+        trace.emit()
+
+async def resolve_monte_carlo_distributions(request: MonteCarloRequest) -> Dict[str, Dict[str, Any]]:
+    """Fill in missing distributions (from the NEO record when neo_id is given) and validate them"""
+    defaults: Dict[str, Dict[str, Any]] = {
+        "density": {"distribution": "triangular", "low": 1500, "mode": 3000, "high": 8000},
+        "angle": {"distribution": "impact_angle"},
+    }
+    if request.neo_id:
+        neo = await neo_collection.find_one({"id": request.neo_id}) if neo_collection is not None else None
+        if not neo:
+            raise HTTPException(status_code=404, detail="NEO not found")
+        defaults["diameter"] = {"distribution": "uniform", "low": neo["diameter_min"], "high": neo["diameter_max"]}
+        defaults["velocity"] = {"distribution": "normal", "mean": neo["velocity"], "std": 0.05 * neo["velocity"]}
+
+    distributions = {}
+    for name in ("diameter", "velocity", "density", "angle"):
+        spec = getattr(request, name)
+        spec = spec.dict() if spec is not None else defaults.get(name)
+        if spec is None:
+            raise HTTPException(status_code=400, detail=f"A '{name}' distribution (or neo_id) is required")
+        try:
+            distributions[name] = monte_carlo.validate_distribution(name, spec)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return distributions
+
+@api_router.post("/impact/monte-carlo")
+async def monte_carlo_impact(request: MonteCarloRequest):
+    """Propagate parameter uncertainty through the impact model by Monte Carlo sampling.
+
+    Samples are evaluated in fixed-size chunks on a process pool; only per-chunk
+    histograms travel back, so memory stays bounded up to MAX_MONTE_CARLO_SAMPLES.
+    """
+    if not 1 <= request.samples <= MAX_MONTE_CARLO_SAMPLES:
+        raise HTTPException(status_code=400, detail=f"samples must be between 1 and {MAX_MONTE_CARLO_SAMPLES}")
+    if not 1 <= request.bins <= 1000:
+        raise HTTPException(status_code=400, detail="bins must be between 1 and 1000")
+    if any(not 0 <= p <= 100 for p in request.percentiles):
+        raise HTTPException(status_code=400, detail="percentiles must be between 0 and 100")
+
+    distributions = await resolve_monte_carlo_distributions(request)
+    seed = request.seed if request.seed is not None else int(np.random.SeedSequence().entropy % (2 ** 63))
+
+    try:
+        loop = asyncio.get_running_loop()
+        executor = monte_carlo.get_executor()
+        inflight = asyncio.Semaphore(MONTE_CARLO_MAX_INFLIGHT_CHUNKS)
+
+        async def run(size, seed_sequence):
+            async with inflight:
+                return await loop.run_in_executor(
+                    executor, monte_carlo.run_chunk,
+                    distributions, size, seed_sequence, request.latitude, request.longitude,
+                    request.atmospheric_entry,
+                )
+
+        chunks = await asyncio.gather(*(run(size, seq) for size, seq in monte_carlo.plan_chunks(request.samples, seed)))
+        summary = monte_carlo.summarize(monte_carlo.merge_chunks(chunks), request.percentiles, request.bins)
+    except Exception as e:
+        logger.error(f"Monte Carlo simulation failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Monte Carlo simulation failed: {str(e)}")
+
+    return {
+        "seed": seed,
+        "distributions": distributions,
+        # Which impact model the samples went through; intact_body skips breakup and airburst
+        "impact_model": "atmospheric_entry" if request.atmospheric_entry else "intact_body",
+        **summary,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
 
 @api_router.post("/mitigation/strategies")
 async def get_mitigation_strategies(parameters: AsteroidParameters, lead_time: float = 10.0):
@@ -1013,33 +2168,252 @@ async def get_mitigation_strategies(parameters: AsteroidParameters, lead_time: f
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating mitigation strategies: {str(e)}")
 
+@api_router.post("/mitigation/optimize")
+async def optimize_mitigation(request: MitigationTradeRequest):
+    """Pareto frontier of mitigation options over cost, miss distance and success probability.
+
+    Every strategy x lead time x spacecraft mass x spacecraft count point is
+    evaluated as one vectorized batch against a collision-course orbit built
+    from the parameters; grids of TRADE_PROCESS_POOL_MIN_POINTS or more are
+    split across the process pool when it has more than one worker.
+    """
+    dimensions = [request.strategies, request.lead_times, request.spacecraft_masses, request.spacecraft_counts]
+    if not all(dimensions):
+        raise HTTPException(status_code=400, detail="strategies, lead_times, spacecraft_masses and spacecraft_counts must not be empty")
+    if any(value <= 0 for value in request.lead_times) or any(value <= 0 for value in request.spacecraft_masses):
+        raise HTTPException(status_code=400, detail="Lead times and spacecraft masses must be positive")
+    if any(not 1 <= value <= MAX_TRADE_SPACECRAFT for value in request.spacecraft_counts):
+        raise HTTPException(status_code=400, detail=f"Spacecraft counts must be between 1 and {MAX_TRADE_SPACECRAFT}")
+    if request.parameters.diameter <= 0 or request.parameters.density <= 0:
+        raise HTTPException(status_code=400, detail="Diameter and density must be positive")
+    points = math.prod(len(values) for values in dimensions)
+    if points > MAX_TRADE_POINTS:
+        raise HTTPException(status_code=413, detail=f"Grid has {points} points; the limit is {MAX_TRADE_POINTS}")
+    try:
+        grid = mitigation_trade.build_grid(*dimensions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    epoch = float(orbit_propagation.days_since_j2000([now.replace(tzinfo=None).isoformat()])[0])
+    r_encounter, v_encounter = deflection.impactor_state(epoch, request.parameters.velocity)
+    scenario = {
+        "r": r_encounter,
+        "v": v_encounter,
+        "epoch": epoch,
+        "body_mass": calculate_asteroid_mass(request.parameters.diameter, request.parameters.density),
+        "body_diameter": request.parameters.diameter,
+    }
+    columns = ("strategy", "lead_time", "spacecraft_mass", "spacecraft_count")
+
+    try:
+        loop = asyncio.get_running_loop()
+        if points >= TRADE_PROCESS_POOL_MIN_POINTS and monte_carlo.worker_count() > 1:
+            executor = monte_carlo.get_executor()
+            bounds = range(0, points, mitigation_trade.TRADE_CHUNK_SIZE)
+            chunks = await asyncio.gather(*(
+                loop.run_in_executor(
+                    executor, mitigation_trade.evaluate_chunk, scenario,
+                    *(grid[name][start:start + mitigation_trade.TRADE_CHUNK_SIZE] for name in columns)
+                )
+                for start in bounds
+            ))
+            results = mitigation_trade.merge_chunks(chunks)
+            pooled = True
+        else:
+            results = await loop.run_in_executor(
+                None, mitigation_trade.evaluate_grid, scenario, *(grid[name] for name in columns)
+            )
+            pooled = False
+
+        candidates = np.flatnonzero(results["feasible"])
+        if request.require_miss:
+            candidates = candidates[results["miss_distance"][candidates] > results["capture_radius"][candidates]]
+        front = candidates[mitigation_trade.pareto_front(
+            results["cost"][candidates], results["miss_distance"][candidates], results["success_probability"][candidates]
+        )]
+    except Exception as e:
+        logger.error(f"Mitigation optimization failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Mitigation optimization failed: {str(e)}")
+
+    front = front[np.argsort(results["cost"][front], kind="stable")]
+    frontier = [
+        {
+            "strategy": mitigation_trade.STRATEGIES[int(grid["strategy"][i])],
+            "lead_time": float(grid["lead_time"][i]),
+            "spacecraft_mass": float(grid["spacecraft_mass"][i]),
+            "spacecraft_count": int(grid["spacecraft_count"][i]),
+            "delta_v": float(results["delta_v"][i]),
+            "cost": float(results["cost"][i]),
+            "miss_distance": float(results["miss_distance"][i]),
+            "success_probability": float(results["success_probability"][i]),
+        }
+        for i in front
+    ]
+    return {
+        "parameters": request.parameters,
+        "evaluated": points,
+        "feasible": int(results["feasible"].sum()),
+        "clears_earth": int((results["miss_distance"] > results["capture_radius"]).sum()),
+        "capture_radius": float(deflection.capture_radius_km(deflection.approach_speed(request.parameters.velocity))),
+        "process_pool": pooled,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        "frontier": frontier,
+        "timestamp": now.isoformat(),
+    }
+
+@api_router.post("/mitigation/score")
+async def score_mitigation_strategies(parameters: AsteroidParameters, lead_time: float = 10.0):
+    """Rule-based defense analysis in the same schema as the AI defense analysis.
+
+    Scores kinetic impactor, gravity tractor and nuclear device from the diameter
+    band x warning-time rule table, with the feasibility and delta-v of each
+    strategy taken from calculate_mitigation_requirements.
+    """
+    if lead_time <= 0:
+        raise HTTPException(status_code=400, detail="lead_time must be positive")
+    try:
+        strategies = calculate_mitigation_requirements(parameters, lead_time)
+        return defense_scoring.score_scenario(parameters.diameter, lead_time, strategies)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error scoring mitigation strategies: {str(e)}")
+
+def neo_warning_years(close_approach_dates: List[Any], now: datetime) -> np.ndarray:
+    """Years from now to each close approach; unknown dates count as no warning (0)"""
+    today = np.datetime64(now.date(), "D")
+    days = np.zeros(len(close_approach_dates), dtype=np.float64)
+    for i, value in enumerate(close_approach_dates):
+        try:
+            days[i] = (np.datetime64(str(value)[:10], "D") - today).astype(np.float64)
+        except (ValueError, TypeError):
+            days[i] = 0.0
+    return np.maximum(days, 0.0) / 365.25
+
+@api_router.get("/mitigation/score/catalogue")
+@cached_response(neo_response_cache)
+async def score_neo_catalogue(lead_time: Optional[float] = None, hazardous_only: bool = False):
+    """Score every NEO in the catalogue with the rule-based defense scorer.
+
+    The warning time of each NEO is the time left until its close approach
+    unless lead_time (years) is given. Each row names the recommended strategy
+    and its urgency and lists favorability / success range per strategy.
+    """
+    if lead_time is not None and lead_time <= 0:
+        raise HTTPException(status_code=400, detail="lead_time must be positive")
+
+    fields = ("id", "name", "diameter_max", "close_approach_date", "potentially_hazardous")
+    neos = None
+    if neo_collection is not None:
+        query = {"potentially_hazardous": True} if hazardous_only else {}
+        try:
+            neos = await neo_collection.find(query, neo_projection(fields)).to_list(length=None)
+        except Exception as e:
+            logger.error(f"Error loading the NEO catalogue for scoring: {e}")
+    if neos is None:
+        neos = [neo.model_dump() for neo in await get_fallback_neo_data()]
+        if hazardous_only:
+            neos = [neo for neo in neos if neo.get("potentially_hazardous")]
+
+    diameter = np.array([neo.get("diameter_max") or 0.0 for neo in neos], dtype=np.float64)
+    if lead_time is not None:
+        warning = np.full(len(neos), lead_time)
+    else:
+        warning = neo_warning_years([neo.get("close_approach_date") for neo in neos], datetime.now(timezone.utc))
+    scores = defense_scoring.score_batch(diameter, warning)
+
+    recommended = np.asarray(defense_scoring.STRATEGIES)[scores["recommended"]].tolist()
+    urgency = np.asarray(defense_scoring.URGENCY)[scores["urgency"]].tolist()
+    warning_years = scores["warning_years"].round(3).tolist()
+    strategy_columns = {
+        name: (
+            np.asarray(defense_scoring.FAVORABILITY)[columns["favorability"]].tolist(),
+            columns["success_low"].round(1).tolist(),
+            columns["success_high"].round(1).tolist(),
+        )
+        for name, columns in scores["strategies"].items()
+    }
+
+    rows = []
+    for i, neo in enumerate(neos):
+        row = {
+            "id": neo.get("id"),
+            "name": neo.get("name"),
+            "diameter_max": neo.get("diameter_max"),
+            "warning_time_years": warning_years[i],
+            "urgency": urgency[i],
+            "recommended_strategy": recommended[i],
+        }
+        for name, (favorability, low, high) in strategy_columns.items():
+            row[name] = {"favorability": favorability[i], "success_low": low[i], "success_high": high[i]}
+        rows.append(row)
+
+    body = orjson.dumps({
+        "count": len(rows),
+        "lead_time": lead_time,
+        "summary": {
+            "recommended": {name: recommended.count(name) for name in defense_scoring.STRATEGIES},
+            "urgency": {level: urgency.count(level) for level in defense_scoring.URGENCY},
+        },
+        "scores": rows,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    })
+    return Uncached(body) if is_fallback_neo_data(neos) else body
+
 @api_router.post("/mitigation/simulate", response_model=MitigationResults)
-async def simulate_mitigation(impact_id: str, strategy_type: str):
-    """Simulate the outcome of a mitigation strategy"""
+async def simulate_mitigation(impact_id: str, strategy_type: str, lead_time: float = 10.0, sweep: Optional[DeflectionSweep] = None):
+    """Simulate the outcome of a mitigation strategy.
+
+    An optional DeflectionSweep body evaluates every combination of delta-v,
+    direction and lead time against the same scenario in one call.
+    """
     try:
+        if lead_time <= 0:
+            raise HTTPException(status_code=400, detail="lead_time must be positive")
+        if sweep is not None:
+            if not sweep.delta_v or not sweep.lead_times or not sweep.directions:
+                raise HTTPException(status_code=400, detail="A sweep needs delta_v, directions and lead_times")
+            if any(value <= 0 for value in sweep.lead_times):
+                raise HTTPException(status_code=400, detail="Sweep lead times must be positive")
+            options = len(sweep.delta_v) * len(sweep.directions) * len(sweep.lead_times)
+            if options > MAX_DEFLECTION_OPTIONS:
+                raise HTTPException(status_code=413, detail=f"Sweep has {options} options; the limit is {MAX_DEFLECTION_OPTIONS}")
+            try:
+                deflection.direction_vectors(sweep.directions)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
         # Fetch impact results from database
-        impact_doc = await db.impact_results.find_one({"id": impact_id})
+        impact_doc = impact_results_writer.find_pending("id", impact_id)
+        if impact_doc is None:
+            impact_doc = await db.impact_results.find_one({"id": impact_id})
         if not impact_doc:
             raise HTTPException(status_code=404, detail="Impact scenario not found")
         
         # Reconstruct impact results
+        impact_doc = dict(impact_doc)
         impact_doc['timestamp'] = datetime.fromisoformat(impact_doc['timestamp'])
         impact_results = ImpactResults(**impact_doc)
         
         # Get mitigation strategies
-        strategies = calculate_mitigation_requirements(impact_results.parameters, 10.0)
+        strategies = calculate_mitigation_requirements(impact_results.parameters, lead_time)
         
         if strategy_type not in strategies:
             raise HTTPException(status_code=400, detail=f"Strategy {strategy_type} not available")
         
         strategy = strategies[strategy_type]
-        mitigation_results = calculate_deflection_outcome(impact_results, strategy)
+        loop = asyncio.get_running_loop()
+        mitigation_results = await loop.run_in_executor(
+            None, calculate_deflection_outcome, impact_results, strategy, sweep
+        )
         
-        # Store results
+        # Store results (sweep columns stay out of the document)
         result_dict = mitigation_results.dict()
+        if result_dict['sweep'] is not None:
+            result_dict['sweep'] = {k: v for k, v in result_dict['sweep'].items() if k != 'options'}
         result_dict['timestamp'] = result_dict['timestamp'].isoformat()
         result_dict['original_impact']['timestamp'] = result_dict['original_impact']['timestamp'].isoformat()
-        await db.mitigation_results.insert_one(result_dict)
+        mitigation_results_writer.enqueue(result_dict)
         
         return mitigation_results
         
@@ -1097,6 +2471,73 @@ async def get_scenario_history():
         logger.error(f"Error fetching scenarios: {str(e)}")
         return []  # Return empty list instead of error to prevent UI breaking
 
+# ------------------------------
+# NEO realtime cache + SSE stream
+# ------------------------------
+NEO_STREAM_KEEPALIVE_SECONDS = 30
+
+# With several uvicorn workers, one holds the sync lock and announces finished
+# syncs on the cluster bus; the others apply its snapshot and drop their caches
+neo_sync_lock = cluster.LeaderLock(lambda: db.cluster_locks, "neo_sync")
+cluster_bus = cluster.MongoPubSub(lambda: db)
+
+async def announce_neo_sync():
+    """Tell the other workers that a sync finished and which snapshot it produced"""
+    await cluster_bus.publish("neo_synced", {
+        "version": neo_broadcaster.version,
+        "neos": neo_broadcaster.snapshot,
+    })
+
+# Owns the periodic sync and the in-memory NEO snapshot behind /neo/current and /neo/stream
+neo_data_service = NEODataService(
+    neo_broadcaster,
+    sync=lambda mode=None: fetch_and_store_neo_data(mode),
+    load_snapshot=lambda: load_neo_snapshot(),
+    get_collection=lambda: neo_collection,
+    sync_interval=NEO_SYNC_INTERVAL,
+    on_change=lambda: invalidate_neo_caches(),
+    # Without coordination every worker syncs; with it only the lock holder does, even before it joins
+    is_leader=lambda: neo_sync_lock.is_leader or not cluster.CLUSTER_COORDINATION,
+    on_sync=announce_neo_sync,
+)
+
+async def on_remote_neo_sync(payload: Dict[str, Any]):
+    """Another worker finished a sync: refresh caches and fan the snapshot out to our subscribers"""
+    invalidate_neo_caches()
+    await rebuild_designation_index()
+    neo_data_service.apply_snapshot(payload.get("neos", []), payload.get("version", 0))
+
+async def on_remote_sync_request(payload: Dict[str, Any]):
+    """A manual sync was requested on another worker; only the lock holder runs it"""
+    if neo_sync_lock.is_leader:
+        asyncio.create_task(neo_data_service.run_sync(payload.get("mode")))
+
+cluster_bus.subscribe("neo_synced", on_remote_neo_sync)
+cluster_bus.subscribe("neo_sync_requested", on_remote_sync_request)
+
+@api_router.get("/neo/stream")
+async def neo_sse_stream(request: Request, last_event_id: Optional[str] = None):
+    """Server-Sent Events stream of NEO updates.
+
+    New clients get a full snapshot ("neo_update"), then "neo_delta" events with
+    the added, changed and removed NEOs. Reconnecting clients that send
+    Last-Event-ID (or ?last_event_id=) receive only the deltas they missed.
+    """
+    subscriber = neo_broadcaster.subscribe(request.headers.get("last-event-id") or last_event_id)
+
+    async def event_generator():
+        try:
+            while True:
+                frame = await subscriber.next_frame(NEO_STREAM_KEEPALIVE_SECONDS)
+                # heartbeat comment to keep connection open
+                yield frame if frame is not None else b": keep-alive\n\n"
+        finally:
+            # Remove subscriber on disconnect
+            neo_broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -1106,20 +2547,135 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers hide response headers from scripts unless they are exposed; search paging needs this one
+    expose_headers=["X-Next-Cursor"],
 )
 
+def api_query_shapes() -> List[Dict[str, Any]]:
+    """Representative instances of every query the API issues, for the explain() checks"""
+    def search(**filters):
+        return build_neo_search_query(NEOSearchFilters(**filters))
+
+    search_projection = neo_projection(NEO_LIST_FIELDS)
+    return [
+        {"name": "neo/search", "collection": neo_collection, "filter": search(),
+         "projection": search_projection, "sort": NEO_SEARCH_SORT, "limit": 50},
+        {"name": "neo/search date range", "collection": neo_collection,
+         "filter": search(date_from="2025-01-01", date_to="2025-12-31"),
+         "projection": search_projection, "sort": NEO_SEARCH_SORT, "limit": 50},
+        {"name": "neo/search hazardous ranges", "collection": neo_collection,
+         "filter": search(potentially_hazardous_only=True, min_diameter=50, max_diameter=1000,
+                          max_miss_distance=7500000, date_from="2025-01-01"),
+         "projection": search_projection, "sort": NEO_SEARCH_SORT, "limit": 50},
+        {"name": "neo/search next page", "collection": neo_collection,
+         "filter": build_neo_search_query(NEOSearchFilters(), encode_search_cursor({"close_approach_date": "2025-06-01", "id": "esa_2025AB"})),
+         "projection": search_projection, "sort": NEO_SEARCH_SORT, "limit": 50},
+        # Prefix matches are few, so sorting them in memory is expected
+        {"name": "neo/search designation prefix", "collection": neo_collection,
+         "filter": search(search_term="2023 AB"), "projection": search_projection,
+         "sort": NEO_SEARCH_SORT, "limit": 50, "allow": ("SORT",)},
+        {"name": "neo/close-approaches", "collection": neo_collection,
+         "filter": {"miss_distance": {"$gte": 0, "$lte": 1000000}},
+         "projection": neo_projection(NEO_LIST_FIELDS), "sort": [("miss_distance", 1)], "limit": 50},
+        # Unfiltered, limited reads of the first documents
+        {"name": "neo/current", "collection": neo_collection, "filter": {},
+         "projection": neo_projection(NEO_LIST_FIELDS), "limit": 20, "allow": ("COLLSCAN",)},
+        {"name": "neo sync content hashes", "collection": neo_collection,
+         "filter": {"id": {"$in": ["esa_2025AB", "esa_2025AC"]}}, "projection": {"_id": 0, "id": 1, "content_hash": 1, "close_approach_date": 1}},
+        {"name": "neo by id", "collection": neo_collection, "filter": {"id": "esa_2025AB"}},
+        {"name": "neo_cache by type", "collection": neo_cache_collection, "filter": {"type": "current_neo"}, "limit": 1},
+        {"name": "neo/historical", "collection": historical_impacts_collection, "filter": {},
+         "sort": [("date", -1)], "limit": 20},
+        {"name": "impact_results by id", "collection": db.impact_results, "filter": {"id": "impact"}, "limit": 1},
+        {"name": "scenarios/history", "collection": db.impact_results, "filter": {},
+         "sort": [("timestamp", -1)], "limit": 10},
+    ]
+
+async def run_query_plan_check():
+    """Explain the API's query shapes and report COLLSCAN / in-memory SORT plans"""
+    if index_check.QUERY_PLAN_CHECK == "off":
+        return
+    problems = index_check.log_reports(await index_check.check_query_plans(api_query_shapes()))
+    if problems and index_check.QUERY_PLAN_CHECK == "strict":
+        raise RuntimeError(f"{problems} query shapes are not index-backed (QUERY_PLAN_CHECK=strict)")
+
+async def database_reachable() -> bool:
+    """Ping MongoDB once, so an unreachable server costs a single server-selection timeout"""
+    if db is None:
+        return False
+    try:
+        await db.command("ping")
+        return True
+    except Exception as e:
+        logger.warning(f"MongoDB is not reachable: {e}")
+        return False
+
+async def prepare_database():
+    """Indexes, query plan check and search fields"""
+    await create_database_indexes()
+    await run_query_plan_check()
+    await backfill_search_fields()
+    await rebuild_designation_index()
+
+async def start_database_services(prepared: bool = False):
+    """Prepare MongoDB, join the cluster and start the NEO data service.
+
+    While MongoDB is unreachable the ping is retried every DATABASE_RETRY_SECONDS,
+    so a worker started during an outage still creates its indexes, backfills
+    the search fields and joins the cluster once the database is back. Until then
+    (and afterwards, until it holds the sync lock) the worker does not sync.
+    prepared=True skips the preparation when startup already ran it.
+    """
+    if not prepared:
+        while not await database_reachable():
+            logger.warning(
+                "Index creation, query plan check, search field backfill and cluster coordination "
+                f"wait for MongoDB; retrying in {DATABASE_RETRY_SECONDS:g} s"
+            )
+            await asyncio.sleep(DATABASE_RETRY_SECONDS)
+        await prepare_database()
+    # Coordinate with other workers: one syncs, all share snapshots and invalidations
+    if cluster.CLUSTER_COORDINATION:
+        await neo_sync_lock.start()
+        await cluster_bus.start()
+    # Start background sync task; it also publishes the NEO snapshot
+    neo_data_service.start(run_sync=True, watch_changes=not cluster_bus.enabled)
+    logger.info("Background NEO sync task started")
+    # The lock renews itself; keep trying the bus, which carries the leader's snapshots
+    while cluster.CLUSTER_COORDINATION and not cluster_bus.enabled:
+        await asyncio.sleep(DATABASE_RETRY_SECONDS)
+        await cluster_bus.start()
+
+# Runs start_database_services() in the background; cancelled on shutdown if still running
+database_startup: Optional[asyncio.Task] = None
+
 # Startup event to initialize background tasks
 @app.on_event("startup")
 async def startup_event():
     """Initialize background tasks on startup"""
+    global database_startup
     if db is not None:  # Only start background tasks if database is available
-        # Create database indexes
-        await create_database_indexes()
-        # Start background sync task
-        asyncio.create_task(periodic_neo_sync())
-        logger.info("Background NEO sync task started")
+        prepared = False
+        if index_check.QUERY_PLAN_CHECK == "strict" and await database_reachable():
+            # Strict mode is a deployment gate: refuse to start with unindexed query shapes
+            await prepare_database()
+            prepared = True
+        database_startup = asyncio.create_task(start_database_services(prepared))
     else:
         logger.warning("Database not available, skipping background tasks")
+        neo_data_service.start(run_sync=False)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush buffered writes and release worker processes on shutdown"""
+    if database_startup is not None and not database_startup.done():
+        database_startup.cancel()
+    await neo_data_service.stop()
+    await neo_sync_lock.stop()
+    await cluster_bus.stop()
+    await impact_results_writer.drain()
+    await mitigation_results_writer.drain()
+    monte_carlo.shutdown_executor()
 
 # Configure logging
 logging.basicConfig(
@@ -1127,81 +2683,6 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-# ------------------------------
-# NEO realtime cache + SSE stream
-# ------------------------------
-NEO_CACHE: List[Dict[str, Any]] = []
-NEO_LAST_REFRESH: Optional[datetime] = None
-NEO_SUBSCRIBERS: "List[asyncio.Queue]" = []
-NEO_REFRESH_INTERVAL_SECONDS = int(os.environ.get("NEO_REFRESH_INTERVAL_SECONDS", "60"))
-
-async def refresh_neo_cache_periodic():
-    """Background task to periodically refresh NEO cache and notify subscribers."""
-    global NEO_CACHE, NEO_LAST_REFRESH
-    while True:
-        try:
-            neo_list = await get_current_neo_data()
-            if isinstance(neo_list, list):
-                NEO_CACHE = [neo.dict() if hasattr(neo, 'dict') else neo for neo in neo_list]
-                NEO_LAST_REFRESH = datetime.now(timezone.utc)
-                # notify all subscribers with latest snapshot
-                for q in list(NEO_SUBSCRIBERS):
-                    try:
-                        q.put_nowait({
-                            "type": "neo_update",
-                            "timestamp": NEO_LAST_REFRESH.isoformat(),
-                            "data": NEO_CACHE,
-                        })
-                    except Exception:
-                        continue
-        except Exception as e:
-            logger.warning(f"NEO cache refresh failed: {e}")
-        await asyncio.sleep(NEO_REFRESH_INTERVAL_SECONDS)
-
-@api_router.get("/neo/stream")
-async def neo_sse_stream():
-    """Server-Sent Events stream of NEO snapshots. Sends initial cache and subsequent updates."""
-    from starlette.responses import StreamingResponse
-
-    queue: asyncio.Queue = asyncio.Queue()
-    NEO_SUBSCRIBERS.append(queue)
-
-    async def event_generator():
-        try:
-            # Send initial snapshot if present
-            if NEO_CACHE:
-                init_payload = {
-                    "type": "neo_update",
-                    "timestamp": (NEO_LAST_REFRESH.isoformat() if NEO_LAST_REFRESH else datetime.now(timezone.utc).isoformat()),
-                    "data": NEO_CACHE,
-                }
-                yield f"data: {json.dumps(init_payload)}\n\n"
-
-            # Keep-alive loop
-            while True:
-                try:
-                    msg = await asyncio.wait_for(queue.get(), timeout=30)
-                    yield f"data: {json.dumps(msg)}\n\n"
-                except asyncio.TimeoutError:
-                    # heartbeat comment to keep connection open
-                    yield ": keep-alive\n\n"
-        finally:
-            # Remove subscriber on disconnect
-            try:
-                NEO_SUBSCRIBERS.remove(queue)
-            except ValueError:
-                pass
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
-
-
-# Start background task to refresh NEO cache
-@app.on_event("startup")
-async def startup_tasks():
-    try:
-        asyncio.create_task(refresh_neo_cache_periodic())
-    except Exception as e:
-        logger.warning(f"Failed to start NEO refresh task: {e}")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,145 @@
+"""Array versions of the impact physics functions in server.py.
+
+Every function here mirrors a scalar counterpart in server.py and accepts
+NumPy arrays (or anything np.asarray understands), so a whole batch of
+scenarios is evaluated in a single pass without Python-level loops.
+"""
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+
+import atmospheric_entry
+
+MEGATON_J = 4.184e15  # Joules per megaton TNT
+TNT_EQUIVALENT = 4.184e9  # J/kg for TNT conversion
+
+
+def calculate_asteroid_mass(diameter, density) -> np.ndarray:
+    """Calculate asteroid masses from diameters and densities"""
+    radius = np.asarray(diameter, dtype=np.float64) / 2.0
+    return (4.0 / 3.0) * np.pi * radius ** 3 * np.asarray(density, dtype=np.float64)
+
+
+def calculate_kinetic_energy(mass, velocity) -> np.ndarray:
+    """Calculate kinetic energies of asteroid impacts"""
+    velocity = np.asarray(velocity, dtype=np.float64)
+    return 0.5 * np.asarray(mass, dtype=np.float64) * velocity ** 2
+
+
+def calculate_crater_size(
+    projectile_diameter,
+    projectile_density,
+    velocity,
+    impact_angle_deg,
+    target_density: float = 2500,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Holsapple-style Pi-scaling crater estimate, same constants as the scalar version.
+
+    Returns (diameter_m, depth_m) arrays.
+    """
+    a = np.maximum(0.01, np.asarray(projectile_diameter, dtype=np.float64) / 2.0)
+    rho_p = np.asarray(projectile_density, dtype=np.float64)
+    g = 9.81
+
+    theta = np.radians(np.clip(np.asarray(impact_angle_deg, dtype=np.float64), 1e-3, 89.9))
+    v_eff = np.maximum(1.0, np.asarray(velocity, dtype=np.float64) * np.sin(theta))
+
+    mu = 0.22
+    K1 = 1.5
+    density_factor = np.cbrt(rho_p / max(1.0, float(target_density)))
+
+    pi2 = (g * a) / v_eff ** 2
+    D_transient = K1 * a * pi2 ** (-mu) * density_factor
+    D_final = 1.3 * D_transient
+    return D_final, D_final / 7.0
+
+
+def calculate_seismic_magnitude(energy) -> np.ndarray:
+    """Estimate seismic magnitudes from impact energies"""
+    energy = np.asarray(energy, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        magnitude = np.log10(energy) - 11.8
+    return np.maximum(0.0, np.nan_to_num(magnitude, nan=0.0, neginf=0.0))
+
+
+def assess_tsunami_risk(lat, lon, energy) -> np.ndarray:
+    """Assess tsunami risk with the same simplified ocean mask as the scalar version"""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    energy_mt = np.asarray(energy, dtype=np.float64) / MEGATON_J
+
+    is_ocean = (
+        (np.abs(lat) < 60) & (lon >= -180) & (lon <= 180)
+        & ~((lat >= 30) & (lat <= 70) & (lon >= -10) & (lon <= 40))
+    )
+    return is_ocean & (energy_mt > 1)
+
+
+def calculate_environmental_effects(energy, crater_diameter) -> Dict[str, np.ndarray]:
+    """Calculate environmental effects for a batch, one array per effect"""
+    energy_mt = np.asarray(energy, dtype=np.float64) / MEGATON_J
+    crater_diameter = np.asarray(crater_diameter, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        climate = np.where(energy_mt > 1, np.maximum(1.0, np.log10(energy_mt)), 0.0)
+
+    return {
+        "ejecta_volume": crater_diameter ** 3 * 0.1,
+        "dust_injection": np.minimum(100.0, energy_mt * 0.1),
+        "thermal_radiation": energy_mt * 1000,
+        "atmospheric_disturbance": np.where(
+            energy_mt > 1000, "global", np.where(energy_mt > 10, "regional", "local")
+        ),
+        "climate_impact_duration": climate,
+        "biodiversity_threat": np.where(
+            energy_mt > 100000, "extinction", np.where(energy_mt > 1000, "severe", "moderate")
+        ),
+    }
+
+
+def calculate_impact_batch(
+    diameter, velocity, density, angle, latitude, longitude,
+    entry: Optional[Dict[str, Any]] = None, simulate_atmosphere: bool = True,
+) -> Dict[str, object]:
+    """Run the full impact pipeline over aligned parameter arrays.
+
+    With simulate_atmosphere, the atmospheric entry stage (computed here unless
+    passed in) decides which bodies crater: craters, seismic shaking and
+    tsunamis come from the energy that reaches the ground, airblast from the
+    energy deposited in the air. Without it every body reaches the ground
+    intact with its full kinetic energy and no atmospheric_entry columns are
+    returned. Returns a columnar dict of arrays keyed like ImpactResults fields.
+    """
+    mass = calculate_asteroid_mass(diameter, density)
+    kinetic_energy = calculate_kinetic_energy(mass, velocity)
+    if not simulate_atmosphere:
+        crater_diameter, crater_depth = calculate_crater_size(diameter, density, velocity, angle)
+        return {
+            "kinetic_energy": kinetic_energy,
+            "tnt_equivalent": kinetic_energy / TNT_EQUIVALENT,
+            "crater_diameter": crater_diameter,
+            "crater_depth": crater_depth,
+            "seismic_magnitude": calculate_seismic_magnitude(kinetic_energy),
+            "tsunami_risk": assess_tsunami_risk(latitude, longitude, kinetic_energy),
+            "environmental_effects": calculate_environmental_effects(kinetic_energy, crater_diameter),
+        }
+
+    if entry is None:
+        entry = atmospheric_entry.simulate_entry(diameter, velocity, density, angle)
+
+    crater_diameter, crater_depth = calculate_crater_size(
+        entry["ground_diameter"], density, entry["ground_velocity"], angle
+    )
+    crater_diameter = np.where(entry["crater"], crater_diameter, 0.0)
+    crater_depth = np.where(entry["crater"], crater_depth, 0.0)
+    ground_energy = entry["ground_energy"]
+
+    return {
+        "kinetic_energy": kinetic_energy,
+        "tnt_equivalent": kinetic_energy / TNT_EQUIVALENT,
+        "crater_diameter": crater_diameter,
+        "crater_depth": crater_depth,
+        "seismic_magnitude": calculate_seismic_magnitude(ground_energy),
+        "tsunami_risk": assess_tsunami_risk(latitude, longitude, ground_energy),
+        "environmental_effects": calculate_environmental_effects(kinetic_energy, crater_diameter),
+        "atmospheric_entry": atmospheric_entry.entry_columns(entry),
+    }
@@ -0,0 +1,192 @@
+"""Write-behind buffering for result documents.
+
+Request handlers enqueue documents and return immediately; a background task
+flushes them with insert_many once a batch fills up or the flush interval
+elapses. The buffer is bounded: when it is full new documents are dropped and
+counted instead of blocking the request.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+import instrumentation
+
+logger = logging.getLogger("server.write_behind")
+
+WRITE_BEHIND_MAX_BATCH = int(os.environ.get("WRITE_BEHIND_MAX_BATCH", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get("WRITE_BEHIND_FLUSH_INTERVAL", "0.25"))
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get("WRITE_BEHIND_MAX_PENDING", "10000"))
+WRITE_BEHIND_MAX_RETRIES = int(os.environ.get("WRITE_BEHIND_MAX_RETRIES", "3"))
+
+DUPLICATE_KEY_ERROR = 11000
+
+flushed_total = instrumentation.register(instrumentation.Counter(
+    "write_behind_flushed_total", "Documents written by the write-behind buffer", ("collection",)
+))
+dropped_total = instrumentation.register(instrumentation.Counter(
+    "write_behind_dropped_total", "Documents dropped by the write-behind buffer", ("collection", "reason")
+))
+retried_total = instrumentation.register(instrumentation.Counter(
+    "write_behind_retried_total", "Documents re-queued after a failed flush", ("collection",)
+))
+pending_gauge = instrumentation.register(instrumentation.Gauge(
+    "write_behind_pending", "Documents waiting in the write-behind buffer", ("collection",)
+))
+
+
+class WriteBehindBuffer:
+    """Bounded queue of documents for one collection, flushed in batches by a background task"""
+
+    def __init__(
+        self,
+        name: str,
+        get_collection: Callable[[], Any],
+        max_batch: int = WRITE_BEHIND_MAX_BATCH,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        max_retries: int = WRITE_BEHIND_MAX_RETRIES,
+    ):
+        self.name = name
+        self.get_collection = get_collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        # Entries are [document, attempts]
+        self._pending: deque = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def enqueue(self, document: Dict[str, Any]) -> bool:
+        """Queue a document for writing; returns False if it was dropped because the buffer is full"""
+        if self._closed or len(self._pending) >= self.max_pending:
+            dropped_total.inc(self.name, "closed" if self._closed else "buffer_full")
+            return False
+
+        self._pending.append([document, 0])
+        pending_gauge.set(self.name, value=len(self._pending))
+        self._ensure_started()
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    def find_pending(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Look up a document that has been accepted but not flushed yet"""
+        for document, _ in reversed(self._pending):
+            if document.get(field) == value:
+                return document
+        return None
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending:
+                full_batch = len(self._pending) >= self.max_batch
+                await self.flush()
+                if not full_batch:
+                    break
+
+    async def flush(self) -> int:
+        """Write up to one batch of pending documents; returns the number written"""
+        if not self._pending:
+            return 0
+        batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+        documents = [entry[0] for entry in batch]
+        failed: List[list] = []
+
+        try:
+            collection = self.get_collection()
+            if collection is None:
+                dropped_total.inc(self.name, "no_database", amount=len(batch))
+                return 0
+            start = time.perf_counter()
+            result = await collection.insert_many(documents, ordered=False)
+            instrumentation.stage_duration.observe(time.perf_counter() - start, f"write_behind/{self.name}", "db_insert")
+            written = len(result.inserted_ids)
+        except asyncio.CancelledError:
+            # Cancelled mid-write: keep the batch for the next flush (duplicates are skipped then)
+            self._pending.extendleft(reversed(batch))
+            pending_gauge.set(self.name, value=len(self._pending))
+            raise
+        except BulkWriteError as e:
+            written = e.details.get("nInserted", 0)
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") == DUPLICATE_KEY_ERROR:
+                    # Already stored by an earlier attempt
+                    written += 1
+                else:
+                    failed.append(batch[error["index"]])
+        except Exception as e:
+            logger.warning(f"Write-behind flush to {self.name} failed: {e}")
+            written = 0
+            failed = batch
+
+        flushed_total.inc(self.name, amount=written)
+        self._requeue(failed)
+        pending_gauge.set(self.name, value=len(self._pending))
+        return written
+
+    def _requeue(self, failed: List[list]):
+        retry = []
+        for entry in failed:
+            entry[1] += 1
+            if entry[1] > self.max_retries:
+                dropped_total.inc(self.name, "retries_exhausted")
+            else:
+                retry.append(entry)
+        room = self.max_pending - len(self._pending)
+        if len(retry) > room:
+            dropped_total.inc(self.name, "buffer_full", amount=len(retry) - max(room, 0))
+            retry = retry[:max(room, 0)]
+        retried_total.inc(self.name, amount=len(retry))
+        # Retries go back to the front so ordering is roughly preserved
+        self._pending.extendleft(reversed(retry))
+
+    async def drain(self, timeout: float = 5.0):
+        """Stop accepting documents and flush everything still pending"""
+        self._closed = True
+        deadline = time.monotonic() + timeout
+        if self._task is not None and not self._task.done():
+            # Let the flush task finish its current write and exit on its own
+            self._wakeup.set()
+            done, _ = await asyncio.wait({self._task}, timeout=timeout)
+            if not done:
+                # flush() puts an interrupted batch back, so it is drained or counted below
+                self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+        async def flush_all():
+            while self._pending:
+                before = len(self._pending)
+                await self.flush()
+                if len(self._pending) >= before:
+                    # Nothing made it out; wait a little before retrying
+                    await asyncio.sleep(0.1)
+
+        try:
+            await asyncio.wait_for(flush_all(), timeout=max(deadline - time.monotonic(), 0.0))
+        except asyncio.TimeoutError:
+            pass
+        if self._pending:
+            dropped_total.inc(self.name, "shutdown", amount=len(self._pending))
+            logger.warning(f"Dropped {len(self._pending)} unflushed {self.name} documents on shutdown")
+            self._pending.clear()
+        pending_gauge.set(self.name, value=0)
@@ -462,8 +462,32 @@ const generateAIExplanation = (impactResults, selectedPosition, metrics) => {
   };
 };
 
-// AI Defense Analysis Function
-const generateAIAnalysis = async (aiConfig, impactResults) => {
+// Read a Server-Sent Events response, calling onEvent(event, data) for each frame
+const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = 'message';
+      let data = '';
+      frame.split('\n').forEach((line) => {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      });
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+};
+
+// AI Defense Analysis Function; onSection(name, value) receives each strategy as soon as it is generated
+const generateAIAnalysis = async (aiConfig, impactResults, onSection = null) => {
   console.log('🤖 Starting AI Analysis...', { aiConfig, impactResults });
   
   if (!aiConfig.enabled || !aiConfig.apiKey || !impactResults) {
@@ -478,6 +502,7 @@ const generateAIAnalysis = async (aiConfig, impactResults) => {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        'Accept': onSection ? 'text/event-stream' : 'application/json',
       },
       body: JSON.stringify({
         provider: aiConfig.provider,
@@ -511,7 +536,17 @@ const generateAIAnalysis = async (aiConfig, impactResults) => {
       throw new Error(`AI API error: ${response.status} - ${errorText}`);
     }
 
-    const result = await response.json();
+    let result = null;
+    if (onSection && (response.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+      await readEventStream(response, (event, data) => {
+        if (event === 'section') onSection(data.name, data.value);
+        else if (event === 'done') result = data;
+        else if (event === 'error') throw new Error(`AI API error: ${data.status} - ${data.error}`);
+      });
+      if (!result) throw new Error('AI API stream ended without a result');
+    } else {
+      result = await response.json();
+    }
     console.log('✅ AI Analysis Success:', result);
     return result;
   } catch (error) {
@@ -1655,6 +1690,14 @@ function EarthDefenseApp() {
           const msg = JSON.parse(e.data);
           if (msg?.type === 'neo_update' && Array.isArray(msg.data)) {
             setNeoData(msg.data);
+          } else if (msg?.type === 'neo_delta') {
+            // Apply added/changed/removed NEOs (by id) to the current list
+            setNeoData((current) => {
+              const byId = new Map((current || []).map((neo) => [neo.id, neo]));
+              (msg.removed || []).forEach((id) => byId.delete(id));
+              [...(msg.changed || []), ...(msg.added || [])].forEach((neo) => byId.set(neo.id, neo));
+              return Array.from(byId.values());
+            });
           }
         } catch {}
       };
@@ -2371,6 +2414,19 @@ function EarthDefenseApp() {
                         <p className="text-white font-bold">{impactResults.seismic_magnitude.toFixed(1)}</p>
                       </div>
                     </div>
+
+                    {impactResults.atmospheric_entry?.airblast && (
+                      <div className="grid grid-cols-2 gap-4 text-sm">
+                        <div>
+                          <p className="text-gray-400">{impactResults.atmospheric_entry.regime === 'both' ? 'Airblast + Crater' : 'Airburst Altitude'}</p>
+                          <p className="text-white font-bold">{((impactResults.atmospheric_entry.burst_altitude || 0) / 1000).toFixed(1)} km</p>
+                        </div>
+                        <div>
+                          <p className="text-gray-400">4 psi Blast Radius</p>
+                          <p className="text-white font-bold">{(impactResults.atmospheric_entry.radius_4psi / 1000).toFixed(1)} km</p>
+                        </div>
+                      </div>
+                    )}
                     
                     {impactResults.tsunami_risk && (
                       <Alert className="border-red-500/50 bg-red-500/10">
@@ -2620,6 +2676,7 @@ function EarthDefenseApp() {
                           onClick={async () => {
                             setAiLoading(true);
                             setAiError(null);
+                            setAiAnalysis(null);
                             try {
                               if (warningTimeValue !== '') {
                                 const v = parseFloat(warningTimeValue);
@@ -2668,7 +2725,8 @@ function EarthDefenseApp() {
                                   _ai_kineticEnergyJ: Number.isFinite(kineticEnergyJoules) ? kineticEnergyJoules : undefined,
                                   _ai_deltaV_mps: Number.isFinite(deltaVRequiredMps) ? deltaVRequiredMps : undefined,
                                   _ai_warningTimeYears: warningTimeValue !== '' ? parseFloat(warningTimeValue) : undefined
-                                }
+                                },
+                                (name, value) => setAiAnalysis((previous) => ({ ...(previous || {}), [name]: value }))
                               );
                               setAiAnalysis(result.analysis);
                               toast.success('🤖 AI analysis generated successfully!');
@@ -0,0 +1,38 @@
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8000';
+
+/**
+ * Decode a /api/neo/ephemeris body: uint32 header length, JSON header, float32 positions.
+ * The positions are a view on the response buffer (no copy), laid out [object][epoch][x, y, z] in AU.
+ */
+export function decodeEphemeris(buffer) {
+  const view = new DataView(buffer);
+  const headerLength = view.getUint32(0, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+  const [count, epochs] = header.shape;
+  const positions = new Float32Array(buffer, 4 + headerLength, count * epochs * 3);
+
+  return {
+    header,
+    positions,
+    // Float32Array of [x, y, z] for one object at one epoch index
+    at: (object, epoch) => positions.subarray((object * epochs + epoch) * 3, (object * epochs + epoch + 1) * 3),
+    // Float32Array of every epoch of one object, ready for a BufferAttribute
+    track: (object) => positions.subarray(object * epochs * 3, (object + 1) * epochs * 3),
+  };
+}
+
+/**
+ * Fetch positions of many NEOs over a time window in one binary request.
+ * ids: optional array of NEO ids (all NEOs with orbits when omitted).
+ */
+export async function fetchEphemeris({ ids, start, days = 365, step = 1, includeEarth = true } = {}) {
+  const params = new URLSearchParams({ days, step, include_earth: includeEarth });
+  if (ids && ids.length) params.set('ids', ids.join(','));
+  if (start) params.set('start', start);
+
+  const response = await fetch(`${BACKEND_URL}/api/neo/ephemeris?${params}`);
+  if (!response.ok) {
+    throw new Error(`Ephemeris request failed: ${response.status} - ${await response.text()}`);
+  }
+  return decodeEphemeris(await response.arrayBuffer());
+}
@@ -0,0 +1,166 @@
+"""AI service against a local fake Gemini backend (GEMINI_API_BASE-style base URL).
+
+The fake serves generateContent per model with a configurable behaviour:
+answer, fail with an upstream error, or stall past the deadline.
+"""
+import asyncio
+import contextlib
+import functools
+import json
+
+import httpx
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import ai_api
+import ai_cache
+
+ANALYSIS = {"recommendation": "kineticImpactor", "kineticImpactor": {"favorability": "high"}}
+# No warning time, so there is no rule-based baseline and Gemini answers alone
+IMPACT_DATA = {"diameter": 120, "velocity": 19000, "density": 3000, "angle": 45}
+
+
+class FakeGemini:
+    def __init__(self):
+        self.behaviour = {}
+        self.calls = []
+        self.app = web.Application()
+        self.app.router.add_post("/v1beta/models/{call}", self.generate)
+
+    async def generate(self, request):
+        model, _, method = request.match_info["call"].partition(":")
+        body = await request.json()
+        self.calls.append({"model": model, "method": method, "key": request.headers.get("x-goog-api-key"), "body": body})
+        behaviour = self.behaviour.get(model, "ok")
+        if behaviour == "error":
+            return web.json_response({"error": {"code": 503, "message": f"{model} is overloaded"}}, status=503)
+        if behaviour == "slow":
+            await asyncio.sleep(5)
+        text = json.dumps(ANALYSIS)
+        return web.json_response({"candidates": [{"content": {"parts": [{"text": text}]}, "index": 0}]})
+
+
+@contextlib.asynccontextmanager
+async def ai_service(monkeypatch, fake, cache=None, fallback_after=0.05, deadline=0.5):
+    """The AI app talking to `fake`, with short fallback/deadline timers"""
+    server = TestServer(fake.app)
+    await server.start_server()
+    client = ai_api.GeminiClient(base_url=str(server.make_url("/v1beta")))
+    monkeypatch.setattr(ai_api, "gemini_client", client)
+    monkeypatch.setattr(ai_api, "analysis_cache", cache or ai_cache.AnalysisCache())
+    monkeypatch.setattr(ai_api, "generate_with_fallback", functools.partial(
+        ai_api.generate_with_fallback, fallback_after=fallback_after, deadline=deadline
+    ))
+    transport = httpx.ASGITransport(app=ai_api.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://ai") as http:
+            yield http
+    finally:
+        await client.close()
+        await server.close()
+
+
+def chat(http, model=ai_api.DEFAULT_MODEL):
+    return http.post("/api/ai-chat", json={
+        "apiKey": "test-key",
+        "model": model,
+        "messages": [{"role": "user", "content": "How do we deflect a 120 m asteroid?"}],
+    })
+
+
+def test_chat_success(monkeypatch):
+    fake = FakeGemini()
+
+    async def run():
+        async with ai_service(monkeypatch, fake) as http:
+            return await chat(http)
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    body = response.json()
+    assert json.loads(body["content"]) == ANALYSIS
+    assert body["model"] == ai_api.DEFAULT_MODEL
+    assert body["usage"]["total_tokens"] > 0
+    assert [(call["model"], call["method"], call["key"]) for call in fake.calls] == [
+        (ai_api.DEFAULT_MODEL, "generateContent", "test-key")
+    ]
+    assert fake.calls[0]["body"]["generationConfig"]["responseMimeType"] == "application/json"
+
+
+def test_upstream_error_falls_back_then_surfaces(monkeypatch):
+    fake = FakeGemini()
+    fake.behaviour[ai_api.DEFAULT_MODEL] = "error"
+
+    async def run():
+        async with ai_service(monkeypatch, fake) as http:
+            recovered = await chat(http)
+            fake.behaviour[ai_api.FALLBACK_MODEL] = "error"
+            failed = await chat(http)
+            return recovered, failed
+
+    recovered, failed = asyncio.run(run())
+    assert recovered.status_code == 200
+    assert recovered.json()["model"] == ai_api.FALLBACK_MODEL
+    assert failed.status_code == 500
+    assert "is overloaded" in failed.json()["error"]
+    assert "Fallback also failed" in failed.json()["error"]
+
+
+def test_timeouts_race_the_fallback_and_hit_the_deadline(monkeypatch):
+    fake = FakeGemini()
+    fake.behaviour[ai_api.DEFAULT_MODEL] = "slow"
+
+    async def run():
+        async with ai_service(monkeypatch, fake) as http:
+            raced = await chat(http)
+            fake.behaviour[ai_api.FALLBACK_MODEL] = "slow"
+            timed_out = await chat(http)
+            return raced, timed_out
+
+    raced, timed_out = asyncio.run(run())
+    assert raced.status_code == 200
+    assert raced.json()["model"] == ai_api.FALLBACK_MODEL
+    assert timed_out.status_code == 504
+    assert "did not answer" in timed_out.json()["error"]
+
+
+def test_defense_analysis_reuses_cache_hits(monkeypatch, tmp_path):
+    fake = FakeGemini()
+    sqlite_path = str(tmp_path / "ai_cache.sqlite")
+    request = {"apiKey": "test-key", "impactData": IMPACT_DATA}
+
+    async def run():
+        async with ai_service(monkeypatch, fake, cache=ai_cache.AnalysisCache(sqlite_path=sqlite_path)) as http:
+            first = await http.post("/api/defense-analysis", json=request)
+            second = await http.post("/api/defense-analysis", json=request)
+            refreshed = await http.post("/api/defense-analysis", json={**request, "cache": "refresh"})
+        # A new process with an empty memory tier still finds the analysis on disk
+        async with ai_service(monkeypatch, fake, cache=ai_cache.AnalysisCache(sqlite_path=sqlite_path)) as http:
+            restarted = await http.post("/api/defense-analysis", json=request)
+        return first, second, refreshed, restarted
+
+    first, second, refreshed, restarted = asyncio.run(run())
+    assert first.json()["analysis"] == ANALYSIS
+    assert first.json()["cache"]["hit"] is False
+    assert second.json()["cache"] == {**first.json()["cache"], "hit": True, "tier": "memory"}
+    assert second.json()["analysis"] == ANALYSIS
+    assert refreshed.json()["cache"]["hit"] is False
+    assert restarted.json()["cache"]["tier"] == "disk"
+    # The first request and the forced refresh reached Gemini; the cache hits did not
+    assert len(fake.calls) == 2
+
+
+@pytest.mark.parametrize("behaviour", ["error", "slow"])
+def test_failed_analyses_are_not_cached(monkeypatch, behaviour):
+    fake = FakeGemini()
+    fake.behaviour = {ai_api.DEFAULT_MODEL: behaviour, ai_api.FALLBACK_MODEL: behaviour}
+    cache = ai_cache.AnalysisCache()
+
+    async def run():
+        async with ai_service(monkeypatch, fake, cache=cache) as http:
+            return await http.post("/api/defense-analysis", json={"apiKey": "test-key", "impactData": IMPACT_DATA})
+
+    response = asyncio.run(run())
+    assert response.status_code == (500 if behaviour == "error" else 504)
+    assert cache.summary()["entries"] == 0
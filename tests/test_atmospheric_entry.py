@@ -0,0 +1,37 @@
+import numpy as np
+
+import atmospheric_entry
+
+
+def test_ground_impact_screen_matches_the_integrator():
+    rng = np.random.default_rng(7)
+    count = 2000
+    diameter = 10 ** rng.uniform(1.0, 3.5, count)
+    velocity = rng.uniform(11e3, 72e3, count)
+    density = rng.choice([1500.0, 3000.0, 7800.0], count)
+    angle = rng.uniform(10.0, 90.0, count)
+
+    fast = atmospheric_entry.simulate_entry(diameter, velocity, density, angle)
+    full = atmospheric_entry.simulate_entry(diameter, velocity, density, angle, fast_path=False)
+    radius = diameter / 2.0
+    quick = atmospheric_entry.ground_impact_screen(
+        radius, 4.0 / 3.0 * np.pi * radius ** 3 * density, velocity, density, np.radians(angle),
+        atmospheric_entry.yield_strength(density), atmospheric_entry.ENTRY_ALTITUDE,
+    )["quick"]
+
+    assert 0 < quick.sum() < count
+    for name in ("regime", "crater", "airblast", "fragmented"):
+        np.testing.assert_array_equal(fast[name], full[name])
+    # Screened bodies really do keep nearly all their energy
+    assert np.all(full["airburst_energy"][quick] <= atmospheric_entry.FAST_PATH_MAX_DEPOSITION * full["entry_energy"][quick])
+    np.testing.assert_allclose(fast["ground_energy"][quick], full["ground_energy"][quick], rtol=0.01)
+    assert np.all(np.abs(fast["airburst_energy"] - full["airburst_energy"]) <= 0.01 * full["entry_energy"])
+
+
+def test_grazing_bodies_that_leave_the_atmosphere_escape():
+    entry = atmospheric_entry.simulate_entry([300.0], [26800.0], [8000.0], [3.0])
+
+    assert entry["escaped"][0] and not entry["crater"][0] and not entry["airblast"][0]
+    assert atmospheric_entry.REGIMES[entry["regime"][0]] == "escape"
+    # It keeps most of its energy instead of depositing all of it in the air
+    assert entry["airburst_energy"][0] < atmospheric_entry.AIRBLAST_MIN_FRACTION * entry["entry_energy"][0]
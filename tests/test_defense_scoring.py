@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+import defense_scoring
+import server
+
+
+@pytest.mark.parametrize("diameter, warning_years", [(50.0, 1.0), (300.0, 2.0), (1000.0, 3.0), (50.0, 4.0)])
+def test_recommendation_is_feasible(diameter, warning_years):
+    requirements = server.calculate_mitigation_requirements(None, warning_years)
+    analysis = defense_scoring.score_scenario(diameter, warning_years, requirements)
+    recommended = analysis["recommendedStrategy"]
+
+    assert analysis[recommended]["requirements"] is not None
+    batch = defense_scoring.score_batch([diameter], [warning_years])
+    assert defense_scoring.STRATEGIES[batch["recommended"][0]] == recommended
+    assert batch["strategies"][recommended]["available"][0]
+
+
+def test_server_strategies_come_from_the_table():
+    lead_times = [0.5, 1.0, 4.0, 5.0, 9.0, 10.0, 30.0]
+    table = defense_scoring.mitigation_requirements(lead_times)
+    for index, lead_time in enumerate(lead_times):
+        strategies = server.calculate_mitigation_requirements(None, lead_time)
+        assert set(strategies) == {key for key, columns in table.items() if columns["available"][index]}
+        for key, strategy in strategies.items():
+            assert strategy.success_probability == table[key]["success_probability"][index]
+            assert strategy.description == defense_scoring.MITIGATION_TABLE[key]["description"]
+    assert np.all(table["nuclear_deflection"]["success_probability"][[2, 3]] == [0.4, 0.7])
@@ -0,0 +1,66 @@
+import numpy as np
+
+import deflection
+import mitigation_trade
+
+
+def brute_force_front(cost, miss_distance, success):
+    """O(N^2) reference: points no other point matches or beats on all three (first duplicate kept)"""
+    front = []
+    for i in range(cost.size):
+        at_least_as_good = (cost <= cost[i]) & (miss_distance >= miss_distance[i]) & (success >= success[i])
+        better = (cost < cost[i]) | (miss_distance > miss_distance[i]) | (success > success[i])
+        duplicate_before = at_least_as_good & ~better & (np.arange(cost.size) < i)
+        if not np.any(at_least_as_good & better) and not np.any(duplicate_before):
+            front.append(i)
+    return front
+
+
+def test_pareto_front_matches_brute_force():
+    rng = np.random.default_rng(11)
+    for size in (1, 2, 10, 300):
+        # Few distinct values, so ties and exact duplicates are common
+        cost = rng.integers(0, 8, size).astype(float)
+        miss_distance = rng.integers(0, 8, size).astype(float)
+        success = rng.integers(0, 4, size) / 4.0
+        front = mitigation_trade.pareto_front(cost, miss_distance, success)
+        assert sorted(front.tolist()) == brute_force_front(cost, miss_distance, success)
+
+
+def scenario(diameter=300.0, density=3000.0, velocity=18000.0, epoch=9000.0):
+    r, v = deflection.impactor_state(epoch, velocity)
+    return {
+        "r": r, "v": v, "epoch": epoch,
+        "body_mass": density * np.pi / 6.0 * diameter ** 3,
+        "body_diameter": diameter,
+    }
+
+
+def test_evaluate_chunk_scales_with_spacecraft_and_rejects_late_launches():
+    grid = mitigation_trade.build_grid(["kinetic_impactor"], [0.5, 10.0], [1000.0], [1, 2, 4])
+    result = mitigation_trade.evaluate_chunk(
+        scenario(), grid["strategy"], grid["lead_time"], grid["spacecraft_mass"], grid["spacecraft_count"]
+    )
+
+    late, early = slice(0, 3), slice(3, 6)
+    # Half a year is shorter than the transit: nothing arrives
+    assert not result["feasible"][late].any()
+    assert np.all(result["delta_v"][late] == 0) and np.all(result["success_probability"][late] == 0)
+
+    assert result["feasible"][early].all()
+    np.testing.assert_allclose(result["delta_v"][early], result["delta_v"][3] * np.array([1, 2, 4]))
+    assert np.all(np.diff(result["cost"][early]) > 0)
+    assert np.all(np.diff(result["miss_distance"][early]) > 0)
+    assert np.all(np.diff(result["success_probability"][early]) >= 0)
+    assert np.all((0 <= result["success_probability"]) & (result["success_probability"] <= 1))
+
+
+def test_chunked_grid_matches_one_chunk(monkeypatch):
+    grid = mitigation_trade.build_grid(list(mitigation_trade.STRATEGIES), [2.0, 8.0, 15.0], [500.0, 5000.0], [1, 3])
+    columns = [grid[name] for name in ("strategy", "lead_time", "spacecraft_mass", "spacecraft_count")]
+    whole = mitigation_trade.evaluate_chunk(scenario(), *columns)
+
+    monkeypatch.setattr(mitigation_trade, "TRADE_CHUNK_SIZE", 5)
+    chunked = mitigation_trade.evaluate_grid(scenario(), *columns)
+    for name, values in whole.items():
+        np.testing.assert_allclose(chunked[name], values, err_msg=name)
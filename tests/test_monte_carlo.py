@@ -0,0 +1,39 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+import monte_carlo
+import server
+
+# A 20 m stony body bursts in the air: /impact/calculate reports no crater
+STONY_20M = {"diameter": 20.0, "velocity": 19000.0, "density": 3300.0, "angle": 45.0}
+
+
+def fixed(values):
+    return {name: {"distribution": "fixed", "value": value} for name, value in values.items()}
+
+
+def test_entry_sampling_agrees_with_the_scalar_endpoint():
+    scalar = TestClient(server.app).post("/api/impact/calculate", json={**STONY_20M, "latitude": 0, "longitude": 0})
+    assert scalar.json()["crater_diameter"] == 0.0
+
+    seed = np.random.SeedSequence(1)
+    entry = monte_carlo.run_chunk(fixed(STONY_20M), 10, seed, None, None)
+    intact = monte_carlo.run_chunk(fixed(STONY_20M), 10, seed, None, None, simulate_atmosphere=False)
+
+    assert intact["numeric"]["crater_diameter"]["zeros"] == 0
+    assert "regime" not in intact["categories"]
+    assert entry["numeric"]["crater_diameter"]["zeros"] == 10
+    assert entry["categories"]["regime"]["airburst"] == 10
+
+
+def test_response_names_the_impact_model():
+    client = TestClient(server.app)
+    request = {"samples": 200, "seed": 3, **fixed(STONY_20M)}
+
+    entry = client.post("/api/impact/monte-carlo", json=request).json()
+    intact = client.post("/api/impact/monte-carlo", json={**request, "atmospheric_entry": False}).json()
+
+    assert intact["impact_model"] == "intact_body"
+    assert entry["impact_model"] == "atmospheric_entry"
+    assert entry["categories"]["regime"] == {"crater": 0.0, "airburst": 1.0, "both": 0.0, "escape": 0.0}
+    assert entry["metrics"]["crater_diameter"]["max"] == 0.0
@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import server
+
+
+def test_search_limit_is_bounded(monkeypatch):
+    monkeypatch.setattr(server, "neo_collection", None)
+    client = TestClient(server.app)
+
+    for limit in (0, -1, server.NEO_SEARCH_MAX_LIMIT + 1):
+        assert client.post(f"/api/neo/search?limit={limit}", json={}).status_code == 422
+    assert client.post("/api/neo/search?limit=5", json={}).status_code == 200
+
+
+def test_next_cursor_header_is_exposed_to_browsers(monkeypatch):
+    monkeypatch.setattr(server, "neo_collection", None)
+    response = TestClient(server.app).post(
+        "/api/neo/search?limit=5", json={}, headers={"Origin": "https://example.org"}
+    )
+
+    assert "x-next-cursor" in response.headers["access-control-expose-headers"].lower()
+
+
+def test_hazardous_search_filters_are_index_keys(monkeypatch):
+    indexes = []
+
+    class RecordingCollection:
+        async def create_index(self, keys, **options):
+            indexes.append(keys)
+
+    recorder = RecordingCollection()
+    for name in ("neo_collection", "historical_impacts_collection", "neo_cache_collection"):
+        monkeypatch.setattr(server, name, recorder)
+    monkeypatch.setattr(server, "db", SimpleNamespace(impact_results=recorder))
+    asyncio.run(server.create_database_indexes())
+
+    query = server.build_neo_search_query(server.NEOSearchFilters(
+        potentially_hazardous_only=True, min_diameter=50, max_diameter=1000, max_miss_distance=7500000,
+    ))
+    compound = next(keys for keys in indexes if isinstance(keys, list) and keys[0][0] == "potentially_hazardous")
+    assert set(query) <= {field for field, _ in compound}
@@ -0,0 +1,256 @@
+"""NEO sync pipeline against a local stub of the ESA NEOCC and NASA NeoWs APIs.
+
+The stub serves the designation lists with HTTP validators; MongoDB is
+replaced by small in-memory collections that record every bulk_write.
+"""
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import server
+
+DESIGNATIONS = [f"2024 AA{index}" for index in range(25)]
+UPDATED = DESIGNATIONS[:5]
+
+
+class FakeCursor:
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.documents = documents
+
+    def limit(self, count: int) -> "FakeCursor":
+        return FakeCursor(self.documents[:count] if count else self.documents)
+
+    async def to_list(self, length=None):
+        return list(self.documents if length is None else self.documents[:length])
+
+    def __aiter__(self):
+        async def iterate():
+            for document in self.documents:
+                yield document
+        return iterate()
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for the sync path"""
+
+    def __init__(self):
+        self.documents: Dict[Any, Dict[str, Any]] = {}
+        self.bulk_writes: List[int] = []
+
+    @staticmethod
+    def _key(filter_: Dict[str, Any]):
+        return filter_.get("id", filter_.get("type"))
+
+    @staticmethod
+    def _project(document: Dict[str, Any], projection: Dict[str, int]) -> Dict[str, Any]:
+        included = [name for name, flag in (projection or {}).items() if flag and name != "_id"]
+        if not included:
+            return {name: value for name, value in document.items() if name != "_id"}
+        return {name: document[name] for name in included if name in document}
+
+    def find(self, query=None, projection=None):
+        query = query or {}
+        ids = query.get("id", {}).get("$in") if isinstance(query.get("id"), dict) else None
+        documents = [
+            self._project(document, projection)
+            for key, document in self.documents.items()
+            if ids is None or key in ids
+        ]
+        return FakeCursor(documents)
+
+    async def find_one(self, filter_):
+        document = self.documents.get(self._key(filter_))
+        return dict(document) if document else None
+
+    async def replace_one(self, filter_, document, upsert=False):
+        self.documents[self._key(filter_)] = dict(document)
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            self.documents[self._key(operation._filter)] = dict(operation._doc)
+        self.bulk_writes.append(len(operations))
+
+
+class StubAPI:
+    """aiohttp app standing in for neo.ssa.esa.int and api.nasa.gov"""
+
+    def __init__(self):
+        self.lists = {"allneo.lst": DESIGNATIONS, "updated_nea.lst": UPDATED}
+        self.etags = {"allneo.lst": '"all-v1"', "updated_nea.lst": '"updated-v1"'}
+        self.esa_status = 200
+        self.list_requests: List[str] = []
+        self.app = web.Application()
+        self.app.router.add_get("/esa/PSDB-portlet/download", self.download)
+        self.app.router.add_get("/nasa/feed", self.feed)
+
+    async def download(self, request):
+        name = request.query["file"]
+        self.list_requests.append(name)
+        if self.esa_status != 200:
+            return web.Response(status=self.esa_status)
+        body = "# ESA NEOCC designation list\n" + "\n".join(self.lists[name]) + "\n"
+        return web.Response(text=body, headers={"ETag": self.etags[name]})
+
+    async def feed(self, request):
+        neo = {
+            "id": "3542519",
+            "name": "(2010 PK9)",
+            "estimated_diameter": {"meters": {"estimated_diameter_min": 120.0, "estimated_diameter_max": 270.0}},
+            "close_approach_data": [{
+                "close_approach_date": "2024-07-01",
+                "miss_distance": {"kilometers": "4500000.5"},
+                "relative_velocity": {"kilometers_per_second": "17.5"},
+            }],
+            "is_potentially_hazardous_asteroid": True,
+            "absolute_magnitude_h": 21.3,
+        }
+        return web.json_response({"near_earth_objects": {"2024-07-01": [neo]}})
+
+
+@pytest.fixture
+def sync_env(monkeypatch):
+    """Point the sync at a fresh stub server and in-memory collections"""
+    loop = asyncio.new_event_loop()
+    stub = StubAPI()
+    stub_server = TestServer(stub.app, loop=loop)
+    loop.run_until_complete(stub_server.start_server())
+    esa_base = str(stub_server.make_url("/esa"))
+
+    neos, cache = FakeCollection(), FakeCollection()
+    monkeypatch.setattr(server, "neo_collection", neos)
+    monkeypatch.setattr(server, "neo_cache_collection", cache)
+    monkeypatch.setattr(server, "NEO_STATS_MATERIALIZED", False)
+    monkeypatch.setattr(server, "ESA_NEOCC_ALL_NEO_URL", f"{esa_base}/PSDB-portlet/download?file=allneo.lst")
+    monkeypatch.setattr(server, "ESA_NEOCC_UPDATED_NEA_URL", f"{esa_base}/PSDB-portlet/download?file=updated_nea.lst")
+    monkeypatch.setattr(server, "NASA_NEO_API_BASE", str(stub_server.make_url("/nasa")))
+    monkeypatch.setattr(server, "NEO_SYNC_LIMIT", 0)
+    monkeypatch.setattr(server, "NEO_SYNC_BATCH", 10)
+    monkeypatch.setattr(server, "NEO_SYNC_WRITE_CHUNK", 4)
+
+    yield loop, stub, neos, cache
+
+    loop.run_until_complete(stub_server.close())
+    loop.close()
+
+
+def test_full_sync_upserts_every_designation_in_bulk_chunks(sync_env):
+    loop, stub, neos, cache = sync_env
+    snapshot = loop.run_until_complete(server.fetch_and_store_neo_data("full"))
+
+    assert stub.list_requests == ["allneo.lst"]
+    assert sorted(neos.documents) == sorted(f"esa_{neo_id}" for neo_id in DESIGNATIONS)
+    assert all(document["content_hash"] and document["designation_keys"] for document in neos.documents.values())
+    # Batches of 10 designations, written in chunks of at most 4 upserts
+    assert sum(neos.bulk_writes) == len(DESIGNATIONS)
+    assert max(neos.bulk_writes) <= 4
+    assert len(snapshot) == len(DESIGNATIONS)
+
+    watermark = cache.documents["sync_watermark_full"]
+    assert watermark["completed"] and watermark["position"] == len(DESIGNATIONS)
+    assert '"all-v1"' in watermark["list_version"]
+    assert server.NEO_SYNC_STATS["write"]["items"] == len(DESIGNATIONS)
+
+
+def test_detail_fetches_run_concurrently_up_to_the_limit(sync_env, monkeypatch):
+    loop, stub, neos, cache = sync_env
+    monkeypatch.setattr(server, "NEO_SYNC_CONCURRENCY", 4)
+    monkeypatch.setattr(server, "NEO_SYNC_BATCH", 100)
+    fetch_details = server.fetch_esa_neocc_details
+    in_flight = peak = 0
+
+    async def slow_fetch(session, neo_id):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return await fetch_details(session, neo_id)
+
+    monkeypatch.setattr(server, "fetch_esa_neocc_details", slow_fetch)
+    loop.run_until_complete(server.fetch_and_store_neo_data("full"))
+
+    assert peak == 4
+    assert len(neos.documents) == len(DESIGNATIONS)
+
+
+def test_unchanged_list_version_skips_incremental_sync(sync_env):
+    loop, stub, neos, cache = sync_env
+    loop.run_until_complete(server.fetch_and_store_neo_data("full"))
+    loop.run_until_complete(server.fetch_and_store_neo_data("incremental"))
+    writes_after_first_incremental = len(neos.bulk_writes)
+
+    # Same ETag on updated_nea.lst: the watermark says it was already processed
+    loop.run_until_complete(server.fetch_and_store_neo_data("incremental"))
+    assert stub.list_requests == ["allneo.lst", "updated_nea.lst", "updated_nea.lst"]
+    assert len(neos.bulk_writes) == writes_after_first_incremental
+    assert server.NEO_SYNC_STATS["fetch"]["items"] == 0
+
+    # A new list version is processed again, but unchanged content hashes are not rewritten
+    stub.etags["updated_nea.lst"] = '"updated-v2"'
+    loop.run_until_complete(server.fetch_and_store_neo_data("incremental"))
+    assert server.NEO_SYNC_STATS["fetch"]["items"] == len(UPDATED)
+    assert server.NEO_SYNC_STATS["write"]["skipped"] == len(UPDATED)
+    assert len(neos.bulk_writes) == writes_after_first_incremental
+
+
+def test_interrupted_sync_resumes_from_the_watermark(sync_env):
+    loop, stub, neos, cache = sync_env
+    loop.run_until_complete(server.fetch_and_store_neo_data("full"))
+    # Pretend the run stopped after two batches of the same list version
+    cache.documents["sync_watermark_full"].update(position=20, completed=False)
+    neos.documents.clear()
+    loop.run_until_complete(server.fetch_and_store_neo_data("full"))
+
+    assert server.NEO_SYNC_STATS["resumed_from"] == 20
+    assert sorted(neos.documents) == sorted(f"esa_{neo_id}" for neo_id in DESIGNATIONS[20:])
+    assert cache.documents["sync_watermark_full"]["completed"]
+
+
+def test_esa_failure_falls_back_to_nasa_feed(sync_env):
+    loop, stub, neos, cache = sync_env
+    stub.esa_status = 503
+    neo_objects = loop.run_until_complete(server.fetch_and_store_neo_data("full"))
+
+    assert [neo["id"] for neo in neo_objects] == ["nasa_3542519"]
+    assert neo_objects[0]["velocity"] == pytest.approx(17500.0)
+    assert neo_objects[0]["miss_distance"] == pytest.approx(4500000.5)
+    assert neos.bulk_writes == []
+
+
+def test_content_hash_is_stable_across_days(monkeypatch):
+    real_datetime = server.datetime
+
+    class Tomorrow(real_datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return real_datetime.now(tz) + server.timedelta(days=1)
+
+    today = asyncio.run(server.fetch_esa_neocc_details(None, "2024 AA1"))
+    monkeypatch.setattr(server, "datetime", Tomorrow)
+    tomorrow = asyncio.run(server.fetch_esa_neocc_details(None, "2024 AA1"))
+
+    # The approach moves with the sync date; the hash does not
+    day = server.timedelta(days=1)
+    assert real_datetime.strptime(tomorrow["close_approach_date"], "%Y-%m-%d") - day == real_datetime.strptime(
+        today["close_approach_date"], "%Y-%m-%d"
+    )
+    assert server.compute_neo_content_hash(today) == server.compute_neo_content_hash(tomorrow)
+
+
+def test_stale_close_approaches_are_rewritten(sync_env):
+    loop, stub, neos, cache = sync_env
+    loop.run_until_complete(server.fetch_and_store_neo_data("full"))
+    writes = sum(neos.bulk_writes)
+    stale = "esa_" + DESIGNATIONS[0]
+    neos.documents[stale]["close_approach_date"] = "2001-01-01"
+
+    stub.etags["allneo.lst"] = '"all-v2"'
+    loop.run_until_complete(server.fetch_and_store_neo_data("full"))
+
+    # Only the document whose approach left the window is written again
+    assert sum(neos.bulk_writes) == writes + 1
+    oldest = server.datetime.now() - server.timedelta(days=server.NEO_SYNTHETIC_APPROACH_WINDOW)
+    assert neos.documents[stale]["close_approach_date"] >= oldest.strftime("%Y-%m-%d")
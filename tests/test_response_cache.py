@@ -0,0 +1,82 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import server
+from response_cache import ResponseCache, Uncached, cached_response
+
+
+def test_uncached_results_are_returned_but_not_stored():
+    cache = ResponseCache(ttl=60)
+    calls = []
+
+    @cached_response(cache)
+    async def endpoint(degraded: bool = False):
+        calls.append(degraded)
+        payload = {"calls": len(calls)}
+        return Uncached(payload) if degraded else payload
+
+    async def run():
+        first = await endpoint(degraded=True)
+        second = await endpoint(degraded=True)
+        third = await endpoint()
+        fourth = await endpoint()
+        return first, second, third, fourth
+
+    first, second, third, fourth = asyncio.run(run())
+    assert (first.body, second.body) == (b'{"calls":1}', b'{"calls":2}')
+    assert third.body == fourth.body == b'{"calls":3}'
+    assert len(calls) == 3
+
+
+def test_fallback_neo_data_is_not_cached(monkeypatch):
+    monkeypatch.setattr(server, "neo_collection", None)
+    monkeypatch.setattr(server, "neo_cache_collection", None)
+    server.neo_response_cache.invalidate()
+    client = TestClient(server.app)
+
+    for path in ("/api/neo/current", "/api/neo/close-approaches"):
+        response = client.get(path)
+        assert response.status_code == 200
+        assert {neo["id"] for neo in response.json()} == {"fallback_1", "fallback_2", "fallback_3"}
+    for path in ("/api/neo/orbits/close-approaches?days=30", "/api/mitigation/score/catalogue"):
+        assert client.get(path).status_code == 200
+    assert not server.neo_response_cache._entries
+
+    server.ephemeris_cache.invalidate()
+    response = client.get("/api/neo/ephemeris?days=30")
+    assert response.status_code == 200
+    assert not server.ephemeris_cache._entries
+
+
+def test_neo_statistics_errors_are_not_cached(monkeypatch):
+    class FailingCollection:
+        async def find_one(self, *args, **kwargs):
+            raise RuntimeError("server selection timeout")
+
+    monkeypatch.setattr(server, "neo_collection", FailingCollection())
+    monkeypatch.setattr(server, "neo_cache_collection", FailingCollection())
+    monkeypatch.setattr(server, "NEO_STATS_MATERIALIZED", True)
+    server.neo_response_cache.invalidate()
+
+    response = TestClient(server.app).get("/api/neo/stats")
+    assert response.json() == {"error": "server selection timeout", "total": 0}
+    assert not server.neo_response_cache._entries
+
+
+def test_fresh_neo_statistics_are_not_cached(monkeypatch):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"total": len(calls)}
+
+    monkeypatch.setattr(server, "neo_collection", object())
+    monkeypatch.setattr(server, "compute_neo_statistics", compute)
+    monkeypatch.setattr(server, "NEO_STATS_MATERIALIZED", False)
+    server.neo_response_cache.invalidate()
+    client = TestClient(server.app)
+
+    assert client.get("/api/neo/stats?fresh=true").json() == {"total": 1}
+    assert client.get("/api/neo/stats?fresh=true").json() == {"total": 2}
+    assert not server.neo_response_cache._entries
@@ -0,0 +1,54 @@
+"""Startup against a MongoDB that is down at first: preparation and the cluster join are retried"""
+import asyncio
+
+import cluster
+import server
+
+
+def test_database_services_retry_until_mongodb_answers(monkeypatch):
+    pings = iter([False, False, True])
+    bus_starts = iter([False, True])
+    calls = []
+
+    async def reachable():
+        return next(pings)
+
+    async def prepare():
+        calls.append("prepare")
+
+    async def lock_start():
+        calls.append("lock")
+
+    async def bus_start():
+        calls.append("bus")
+        started = next(bus_starts)
+        server.cluster_bus.enabled = started
+        return started
+
+    monkeypatch.setattr(server, "DATABASE_RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(server, "database_reachable", reachable)
+    monkeypatch.setattr(server, "prepare_database", prepare)
+    monkeypatch.setattr(cluster, "CLUSTER_COORDINATION", True)
+    monkeypatch.setattr(server.neo_sync_lock, "start", lock_start)
+    monkeypatch.setattr(server.cluster_bus, "start", bus_start)
+    monkeypatch.setattr(server.cluster_bus, "enabled", False)
+    monkeypatch.setattr(server.neo_data_service, "start", lambda **options: calls.append(("service", options)))
+
+    asyncio.run(server.start_database_services())
+
+    assert calls == ["prepare", "lock", "bus", ("service", {"run_sync": True, "watch_changes": True}), "bus"]
+    assert server.cluster_bus.enabled
+
+
+def test_unjoined_workers_do_not_sync(monkeypatch):
+    monkeypatch.setattr(server.cluster_bus, "enabled", False)
+    monkeypatch.setattr(server.neo_sync_lock, "is_leader", False)
+
+    monkeypatch.setattr(cluster, "CLUSTER_COORDINATION", True)
+    assert not server.neo_data_service.is_leader()
+    monkeypatch.setattr(server.neo_sync_lock, "is_leader", True)
+    assert server.neo_data_service.is_leader()
+
+    monkeypatch.setattr(server.neo_sync_lock, "is_leader", False)
+    monkeypatch.setattr(cluster, "CLUSTER_COORDINATION", False)
+    assert server.neo_data_service.is_leader()
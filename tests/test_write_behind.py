@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+import write_behind
+
+
+class SlowCollection:
+    """insert_many that takes `delay` seconds and records what it stored"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.stored = []
+
+    async def insert_many(self, documents, ordered=True):
+        await asyncio.sleep(self.delay)
+        self.stored.extend(documents)
+        return SimpleNamespace(inserted_ids=[document["id"] for document in documents])
+
+
+def test_drain_waits_for_the_write_in_flight():
+    collection = SlowCollection(delay=0.2)
+    buffer = write_behind.WriteBehindBuffer("drain_test", lambda: collection, max_batch=2, flush_interval=0.01)
+
+    async def run():
+        for index in range(5):
+            buffer.enqueue({"id": index})
+        # Let the background task start writing the first batch
+        await asyncio.sleep(0.05)
+        await buffer.drain(timeout=5.0)
+
+    asyncio.run(run())
+    assert sorted(document["id"] for document in collection.stored) == list(range(5))
+    assert write_behind.dropped_total.value("drain_test", "shutdown") == 0
+
+
+def test_batches_cut_off_by_the_drain_timeout_are_counted():
+    collection = SlowCollection(delay=10.0)
+    buffer = write_behind.WriteBehindBuffer("timeout_test", lambda: collection, max_batch=2, flush_interval=0.01)
+
+    async def run():
+        for index in range(3):
+            buffer.enqueue({"id": index})
+        await asyncio.sleep(0.05)
+        await buffer.drain(timeout=0.1)
+
+    asyncio.run(run())
+    assert collection.stored == []
+    assert write_behind.dropped_total.value("timeout_test", "shutdown") == 3